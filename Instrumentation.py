@@ -0,0 +1,107 @@
+import cProfile
+import json
+import sys
+import time
+import timeit
+import tracemalloc
+from contextlib import contextmanager
+
+
+class Instrumentation:
+    """Measurements of each finished stage, in the order they were run"""
+    stages: dict[str, dict[str, float]]
+
+    def __init__(self, enabled=True, trace_memory=False, profile_file=None):
+        """Measure wall time, cpu time, peak memory and counters of each stage of a run
+        :type enabled: bool
+        :param enabled: Disabled instrumentation measures nothing and costs next to nothing
+        :type trace_memory: bool
+        :param trace_memory: Measure the peak memory of each stage with tracemalloc, this slows everything down. The
+            peak includes memory still held from earlier stages
+        :type profile_file: Path | str | None
+        :param profile_file: Profile the whole run with cProfile and dump the statistics to this file"""
+        self._enabled: bool = enabled
+        self._trace_memory: bool = enabled and trace_memory
+        self._profile_file = profile_file if enabled else None
+        self._profiler: cProfile.Profile | None = None
+        self._run_start: float | None = None
+        self.stages = {}
+
+    def _start_run(self):
+        """Start tracing and profiling with the first stage"""
+        self._run_start = timeit.default_timer()
+        if self._trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self._profile_file is not None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    @contextmanager
+    def stage(self, stage_name, rate_key_list=()):
+        """Measure a stage, stages should not be nested
+        :type stage_name: str
+        :param stage_name: The stages name, a stage run again adds to its measurements
+        :type rate_key_list: tuple[str, ...]
+        :param rate_key_list: Counters to also report per second
+        :return Iterator[dict[str, int]]: Counters to fill while the stage runs"""
+        counters: dict[str, int] = {}
+        if not self._enabled:
+            yield counters
+            return
+        if self._run_start is None:
+            self._start_run()
+        if self._trace_memory:
+            tracemalloc.reset_peak()
+        timer_start: float = timeit.default_timer()
+        cpu_start: float = time.process_time()
+        try:
+            yield counters
+        finally:
+            measurement = self.stages.setdefault(stage_name, {'seconds': 0, 'cpu_seconds': 0})
+            measurement['seconds'] += timeit.default_timer() - timer_start
+            measurement['cpu_seconds'] += time.process_time() - cpu_start
+            if self._trace_memory:
+                measurement['peak_mib'] = max(measurement.get('peak_mib', 0),
+                                              tracemalloc.get_traced_memory()[1] / 2 ** 20)
+            for key, value in counters.items():
+                measurement[key] = measurement.get(key, 0) + value
+            for key in rate_key_list:
+                measurement[key + '_per_second'] = measurement.get(key, 0) / max(measurement['seconds'], 1e-9)
+
+    def is_enabled(self):
+        """Check if anything is measured
+        :return bool: Whether the instrumentation is enabled"""
+        return self._enabled
+
+    def finish(self):
+        """Stop tracing and profiling, dumping the profile statistics if requested
+        :return dict: The report, see get_report()"""
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self._profile_file)
+            self._profiler = None
+        if self._trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        return self.get_report()
+
+    def get_report(self):
+        """Get all measurements
+        :return dict: Total seconds and the rounded measurements of each stage"""
+        total_seconds: float = 0 if self._run_start is None else timeit.default_timer() - self._run_start
+        return {
+            'total_seconds': round(total_seconds, 4),
+            'stages': {stage_name: {key: round(value, 4) if isinstance(value, float) else value
+                                    for key, value in measurement.items()}
+                       for stage_name, measurement in self.stages.items()},
+        }
+
+    def write_log_line(self, log_file=None):
+        """Write the report as a single JSON line
+        :type log_file: TextIO | None
+        :param log_file: The file to write to, defaults to stderr"""
+        print(json.dumps(self.get_report()), file=log_file or sys.stderr)
+
+    def print_report(self):
+        """Print the measurements of each stage in a readable way"""
+        for stage_name, measurement in self.get_report()['stages'].items():
+            print(stage_name + ':', ', '.join(key + ' ' + str(value) for key, value in measurement.items()))
@@ -1,23 +1,35 @@
-from PySide6.QtCore import Signal
-from six import itervalues
+from contextlib import contextmanager
+from threading import RLock
+from time import monotonic
 
 from Song import Song
 from Subscribable import Subscribable
 
 
 class LoadedSongs(Subscribable):
-    """Available subscription types"""
+    """Available subscription types. ADDED_BATCH gets a song_list instead of a song, DELETED_BATCH a song_dict of the
+    songs by their file path, because unloaded songs can not tell their path anymore"""
     DELETED = 1
     UPDATED = 2
     ADDED = 3
+    ADDED_BATCH = 4
+    DELETED_BATCH = 5
     """All currently loaded song objects"""
     _loadedSongs: dict[str: Song]
 
-    def __init__(self):
-        """Init variables"""
-        super().__init__((self.DELETED, self.UPDATED, self.ADDED))
+    def __init__(self, flush_interval=0.2):
+        """Init variables
+        :type flush_interval: float
+        :param flush_interval: Seconds between batch events while songs are added or removed in a batch"""
+        super().__init__((self.DELETED, self.UPDATED, self.ADDED, self.ADDED_BATCH, self.DELETED_BATCH))
         self._loadedSongs = {}
-        self.songAdded = Signal(Song)
+        self._flush_interval: float = flush_interval
+        # Songs added during a batch by their object id and deleted ones by their key, which were not announced yet
+        self._lock: RLock = RLock()
+        self._batch_depth: int = 0
+        self._pending_added_dict: dict[int, Song] = {}
+        self._pending_deleted_dict: dict[str, Song] = {}
+        self._last_flush: float = 0
 
     def __iter__(self):
         """Iterate over all currently loaded songs
@@ -34,8 +46,94 @@ class LoadedSongs(Subscribable):
             song.subscribe(song.DELETED, self._song_deleted)
             song.subscribe(song.UPDATED, self._song_updated)
             # Trigger own subscriptions
+            if self._queue_added(song):
+                self._flush(False)
+                return
             self._trigger_subscriptions(self.ADDED, song=song)
 
+    def add_many(self, song_list, progress_callback=None):
+        """Add new songs, they are announced as ADDED_BATCH events at most every flush interval
+        :type song_list: Iterable[Song]
+        :param song_list: The songs to add
+        :type progress_callback: callable | None
+        :param progress_callback: Called with the number of songs handled so far after each song"""
+        song_num: int = 0
+        with self.batch():
+            for song in song_list:
+                self.add(song)
+                song_num += 1
+                if progress_callback is not None:
+                    progress_callback(song_num)
+
+    def remove_many(self, song_list):
+        """Unload songs, they are announced as DELETED_BATCH events at most every flush interval
+        :type song_list: Iterable[Song]
+        :param song_list: The songs to unload"""
+        with self.batch():
+            for song in list(song_list):
+                song.unload()
+
+    @contextmanager
+    def batch(self):
+        """Announce all songs added or deleted inside this context as batch events instead of one event per song.
+        Songs added and deleted again within the same batch are not announced at all"""
+        with self._lock:
+            self._batch_depth += 1
+            if 1 == self._batch_depth:
+                self._last_flush = monotonic()
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                is_done: bool = 0 == self._batch_depth
+            if is_done:
+                self._flush(True)
+
+    def _queue_added(self, song):
+        """Remember an added song for the next batch event
+        :type song: Song
+        :param song: The added song
+        :return bool: Whether the song is announced in a batch"""
+        with self._lock:
+            if 0 == self._batch_depth:
+                return False
+            self._pending_added_dict[id(song)] = song
+            return True
+
+    def _queue_deleted(self, song):
+        """Remember a deleted song for the next batch event
+        :type song: Song
+        :param song: The deleted song
+        :return bool: Whether the song is announced in a batch"""
+        with self._lock:
+            if 0 == self._batch_depth:
+                return False
+            # A song that was never announced does not have to be announced as deleted either
+            if self._pending_added_dict.pop(id(song), None) is None:
+                self._pending_deleted_dict[self._get_song_key(song)] = song
+            return True
+
+    def _flush(self, force):
+        """Announce the pending songs once the flush interval passed
+        :type force: bool
+        :param force: Announce them regardless of the flush interval
+        :return bool: Whether the pending songs were announced"""
+        with self._lock:
+            if not force and monotonic() - self._last_flush < self._flush_interval:
+                return False
+            added_song_list: list[Song] = list(self._pending_added_dict.values())
+            deleted_song_dict: dict[str, Song] = self._pending_deleted_dict
+            self._pending_added_dict = {}
+            self._pending_deleted_dict = {}
+            self._last_flush = monotonic()
+        # Subscribers run outside the lock, so they may add or delete songs themselves
+        if added_song_list:
+            self._trigger_subscriptions(self.ADDED_BATCH, song_list=added_song_list)
+        if deleted_song_dict:
+            self._trigger_subscriptions(self.DELETED_BATCH, song_dict=deleted_song_dict)
+        return True
+
     @staticmethod
     def _get_song_key(song):
         """Get a songs key for the internal list
@@ -48,6 +146,9 @@ class LoadedSongs(Subscribable):
         :type song: Song
         :param song: The song to delete"""
         self._loadedSongs.pop(self._get_song_key(song))
+        if self._queue_deleted(song):
+            self._flush(False)
+            return
         self._trigger_subscriptions(self.DELETED, song=song)
 
     def _song_updated(self, song):
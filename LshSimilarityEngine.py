@@ -0,0 +1,173 @@
+import timeit
+import zlib
+
+import numpy as np
+
+from SimilarityEngine import TiledSimilarityEngine
+
+
+class LshSimilarityEngine:
+    """Hashes are taken from the upper bits of 64 bit multiply-shift hashing"""
+    _hash_shift = np.uint64(32)
+    """Signature value for songs without shingles"""
+    _empty_signature_value = np.iinfo(np.uint32).max
+    """Multiplier combining word hashes into shingle hashes"""
+    _shingle_hash_prime = np.uint64(1099511628211)
+    """How many candidate pairs the last run scored"""
+    candidate_count: int
+
+    def __init__(self, text_list, bands=32, rows=4, shingle_size=1, pair_chunk_size=100000, seed=0):
+        """Approximately find similar songs. MinHash signatures over word shingles are bucketed with locality
+        sensitive hashing and only songs sharing a bucket are compared exactly
+        :type text_list: list[str]
+        :param text_list: The text of each song, in the same order as the song vectors
+        :type bands: int
+        :param bands: How many bands each signature is split into, more bands find more candidates
+        :type rows: int
+        :param rows: How many signature values each band has, more rows find less candidates
+        :type shingle_size: int
+        :param shingle_size: How many words each shingle has
+        :type pair_chunk_size: int
+        :param pair_chunk_size: How many candidate pairs are scored at once
+        :type seed: int
+        :param seed: Seed for the MinHash functions"""
+        self._text_list: list[str] = text_list
+        self._bands: int = max(1, bands)
+        self._rows: int = max(1, rows)
+        self._shingle_size: int = max(1, shingle_size)
+        self._pair_chunk_size: int = max(1, pair_chunk_size)
+        random_generator = np.random.default_rng(seed)
+        hash_count = self._bands * self._rows
+        # Multiply-shift hashing needs odd multipliers
+        self._hash_a = random_generator.integers(0, 2 ** 63, hash_count, dtype=np.uint64) * np.uint64(2) + \
+            np.uint64(1)
+        self._hash_b = random_generator.integers(0, 2 ** 63, hash_count, dtype=np.uint64)
+        self._word_hash_dict: dict[str, int] = {}
+        self.candidate_count = 0
+
+    def _get_shingle_hashes(self, text):
+        """Hash all word shingles of a text
+        :type text: str
+        :param text: The text to get the shingles of
+        :return np.ndarray: The unique shingle hashes"""
+        word_list = text.lower().split()
+        if not word_list:
+            return np.empty(0, dtype=np.uint64)
+        # Hash each distinct word only once across all songs
+        word_hashes = np.empty(len(word_list), dtype=np.uint64)
+        for i, word in enumerate(word_list):
+            word_hash = self._word_hash_dict.get(word)
+            if word_hash is None:
+                word_hash = self._word_hash_dict[word] = zlib.crc32(word.encode())
+            word_hashes[i] = word_hash
+        # Combine the hashes of consecutive words into shingle hashes
+        shingle_count = max(1, len(word_list) - self._shingle_size + 1)
+        shingle_hashes = word_hashes[:shingle_count].copy()
+        for offset in range(1, min(self._shingle_size, len(word_list))):
+            shingle_hashes = (shingle_hashes * self._shingle_hash_prime) ^ word_hashes[offset:offset + shingle_count]
+        return np.unique(shingle_hashes)
+
+    def get_signatures(self):
+        """Calculate the MinHash signature of every song
+        :return np.ndarray: One signature row per song"""
+        shingle_hash_list = [self._get_shingle_hashes(text) for text in self._text_list]
+        shingle_count_list = np.array([len(shingle_hashes) for shingle_hashes in shingle_hash_list])
+        signatures = np.full((len(self._text_list), len(self._hash_a)), self._empty_signature_value, dtype=np.uint32)
+        non_empty = shingle_count_list > 0
+        if not np.any(non_empty):
+            return signatures
+        # Hash all shingles of all songs at once and take the minimum per song
+        all_shingle_hashes = np.concatenate(shingle_hash_list)
+        song_starts = np.concatenate(([0], np.cumsum(shingle_count_list)[:-1]))[non_empty]
+        for hash_num in range(len(self._hash_a)):
+            hashes = (all_shingle_hashes * self._hash_a[hash_num] + self._hash_b[hash_num]) >> self._hash_shift
+            signatures[non_empty, hash_num] = np.minimum.reduceat(hashes, song_starts)
+        return signatures
+
+    def get_candidate_pairs(self, signatures):
+        """Get all song pairs sharing at least one bucket
+        :type signatures: np.ndarray
+        :param signatures: The MinHash signature of every song
+        :return np.ndarray, np.ndarray: Row and column song indices of each candidate pair, row > column"""
+        song_count = signatures.shape[0]
+        # Songs without shingles would all share the same buckets
+        song_indices = np.flatnonzero(signatures[:, 0] != self._empty_signature_value)
+        pair_key_list = []
+        for band_num in range(self._bands):
+            band = np.ascontiguousarray(signatures[song_indices, band_num * self._rows:(band_num + 1) * self._rows])
+            # Give every distinct band value a bucket id
+            _, bucket_ids = np.unique(band.view(np.dtype((np.void, band.dtype.itemsize * self._rows))).ravel(),
+                                      return_inverse=True)
+            order = np.argsort(bucket_ids, kind='stable')
+            sorted_songs = song_indices[order]
+            sorted_bucket_ids = bucket_ids.ravel()[order]
+            # Pair every song with the songs following it in the same bucket
+            offset: int = 1
+            while offset < len(sorted_songs):
+                same_bucket = np.flatnonzero(sorted_bucket_ids[:-offset] == sorted_bucket_ids[offset:])
+                if 0 == len(same_bucket):
+                    break
+                first = sorted_songs[same_bucket]
+                second = sorted_songs[same_bucket + offset]
+                rows = np.maximum(first, second).astype(np.int64)
+                pair_key_list.append(rows * song_count + np.minimum(first, second))
+                offset += 1
+        if not pair_key_list:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        pair_keys = np.unique(np.concatenate(pair_key_list))
+        return pair_keys // song_count, pair_keys % song_count
+
+    def iter_similarities(self, matrix, threshold, start_tile=0):
+        """Calculate the song pairs above the threshold among all candidate pairs
+        :type matrix: scipy.sparse.csr_matrix
+        :param matrix: The l2 normalized song vectors, one row per song
+        :type threshold: float
+        :param threshold: Only similarities above this threshold are kept
+        :type start_tile: int
+        :param start_tile: The first chunk to calculate, earlier ones are skipped
+        :return Iterator[tuple[int, int, np.ndarray, np.ndarray, np.ndarray]]: For each chunk of candidate pairs the
+            chunks number, the total chunk count, row song indices, column song indices and similarity scores"""
+        candidate_rows, candidate_cols = self.get_candidate_pairs(self.get_signatures())
+        self.candidate_count = len(candidate_rows)
+        chunk_count = max(1, -(-len(candidate_rows) // self._pair_chunk_size))
+        for chunk_num in range(start_tile, chunk_count):
+            rows = candidate_rows[chunk_num * self._pair_chunk_size:(chunk_num + 1) * self._pair_chunk_size]
+            cols = candidate_cols[chunk_num * self._pair_chunk_size:(chunk_num + 1) * self._pair_chunk_size]
+            # The vectors are normalized, so their dot product is the cosine similarity
+            scores = np.asarray(matrix[rows].multiply(matrix[cols]).sum(axis=1)).ravel()
+            keep = scores > threshold
+            yield chunk_num, chunk_count, rows[keep], cols[keep], scores[keep]
+
+    def get_recall_report(self, matrix, threshold, tile_size=2048):
+        """Compare the approximately found song pairs with the ones the exact engine finds
+        :type matrix: scipy.sparse.csr_matrix
+        :param matrix: The l2 normalized song vectors, one row per song
+        :type threshold: float
+        :param threshold: Only similarities above this threshold are kept
+        :type tile_size: int
+        :param tile_size: Tile size of the exact engine
+        :return dict[str, float]: Pair counts, recall and run times of both engines"""
+        song_count = matrix.shape[0]
+
+        timer_start: float = timeit.default_timer()
+        approximate_keys = np.concatenate([np.empty(0, dtype=np.int64)] +
+                                          [rows.astype(np.int64) * song_count + cols for _, _, rows, cols, _
+                                           in self.iter_similarities(matrix, threshold)])
+        approximate_time: float = timeit.default_timer() - timer_start
+
+        timer_start = timeit.default_timer()
+        exact_keys = np.concatenate([np.empty(0, dtype=np.int64)] +
+                                    [rows.astype(np.int64) * song_count + cols for _, _, rows, cols, _
+                                     in TiledSimilarityEngine(tile_size).iter_similarities(matrix, threshold)])
+        exact_time: float = timeit.default_timer() - timer_start
+
+        found_count = len(np.intersect1d(approximate_keys, exact_keys))
+        return {
+            'songs': song_count,
+            'candidate_pairs': self.candidate_count,
+            'exact_pairs': len(exact_keys),
+            'approximate_pairs': len(approximate_keys),
+            'recall': found_count / len(exact_keys) if len(exact_keys) else 1.0,
+            'exact_seconds': exact_time,
+            'approximate_seconds': approximate_time,
+        }
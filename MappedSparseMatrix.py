@@ -0,0 +1,38 @@
+import json
+from pathlib import Path
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class MappedSparseMatrix:
+    """The arrays a csr matrix consists of"""
+    _array_name_list = ('data', 'indices', 'indptr')
+    """File holding the matrix shape"""
+    _shape_file_name = 'shape.json'
+
+    @classmethod
+    def save(cls, matrix, directory):
+        """Store a csr matrix so it can be memory mapped by other processes
+        :type matrix: csr_matrix
+        :param matrix: The matrix to store
+        :type directory: Path
+        :param directory: The directory to store the matrix in, it has to exist already"""
+        directory = Path(directory)
+        for array_name in cls._array_name_list:
+            np.save(directory / (array_name + '.npy'), getattr(matrix, array_name))
+        with open(directory / cls._shape_file_name, 'w') as file:
+            json.dump(list(matrix.shape), file)
+
+    @classmethod
+    def load(cls, directory):
+        """Memory map a stored csr matrix without copying it into memory
+        :type directory: Path
+        :param directory: The directory the matrix is stored in
+        :return csr_matrix: The memory mapped matrix"""
+        directory = Path(directory)
+        array_list = [np.load(directory / (array_name + '.npy'), mmap_mode='r')
+                      for array_name in cls._array_name_list]
+        with open(directory / cls._shape_file_name) as file:
+            shape = tuple(json.load(file))
+        return csr_matrix(tuple(array_list), shape=shape, copy=False)
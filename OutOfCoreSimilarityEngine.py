@@ -0,0 +1,82 @@
+import math
+import os
+import tempfile
+
+from MappedSparseMatrix import MappedSparseMatrix
+from PairSpill import PairSpill
+from SimilarityEngine import TiledSimilarityEngine, compute_tile, compute_sparse_tile
+
+
+class OutOfCoreSimilarityEngine(TiledSimilarityEngine):
+    """Bytes each cell of a tile takes at most for each numeric path: the scores and the threshold mask, which is
+    copied on the diagonal. Sparse tiles are only used below the density cutoff, where they take less than dense
+    float32 tiles"""
+    _bytes_per_tile_cell = {TiledSimilarityEngine.DENSE: 10, TiledSimilarityEngine.DENSE_FLOAT32: 6,
+                            TiledSimilarityEngine.SPARSE_FLOAT32: 6}
+    """Share of the memory budget each tile may take"""
+    _tile_budget_share = 0.5
+    """Share of the memory budget for similar pairs waiting to be spilled to disk"""
+    _spill_budget_share = 0.25
+
+    def __init__(self, memory_budget=512, directory=None, numeric_path=TiledSimilarityEngine.DENSE):
+        """Calculate song similarities tile by tile with the song vectors memory mapped from disk. The tile size is
+        chosen so that no tile takes more than its share of the memory budget
+        :type memory_budget: float
+        :param memory_budget: MiB the calculation may use, the vectorizer and the loaded songs are not included
+        :type directory: Path | str | None
+        :param directory: Directory for the temporary song vector files, defaults to the systems temp dir
+        :type numeric_path: str
+        :param numeric_path: How tiles are calculated, see TiledSimilarityEngine"""
+        super().__init__(self.get_tile_size(memory_budget, 1, numeric_path), numeric_path)
+        self._directory = directory
+
+    @classmethod
+    def get_tile_size(cls, memory_budget, workers=1, numeric_path=TiledSimilarityEngine.DENSE):
+        """Get the largest tile size that fits into the memory budget
+        :type memory_budget: float
+        :param memory_budget: MiB the calculation may use
+        :type workers: int | None
+        :param workers: How many tiles are calculated at the same time, None means one per cpu core
+        :type numeric_path: str
+        :param numeric_path: How tiles are calculated, see TiledSimilarityEngine
+        :return int: How many songs each tile spans in each direction"""
+        if workers is None:
+            workers = os.cpu_count() or 1
+        tile_bytes = memory_budget * 2 ** 20 * cls._tile_budget_share / max(1, workers)
+        return max(64, int(math.sqrt(tile_bytes / cls._bytes_per_tile_cell[numeric_path])))
+
+    @classmethod
+    def get_spill_pair_count(cls, memory_budget):
+        """Get how many similar pairs may be kept in memory before they are spilled to disk
+        :type memory_budget: float
+        :param memory_budget: MiB the calculation may use
+        :return int: The number of pairs"""
+        return max(1024, int(memory_budget * 2 ** 20 * cls._spill_budget_share / PairSpill.BYTES_PER_PAIR))
+
+    def iter_similarities(self, matrix, threshold, start_tile=0, first_row=0):
+        """Calculate all song pairs above the threshold. The song vectors are written to disk and memory mapped, so
+        only the rows of the current tile are read into memory
+        :type matrix: scipy.sparse.csr_matrix
+        :param matrix: The l2 normalized song vectors, one row per song
+        :type threshold: float
+        :param threshold: Only similarities above this threshold are kept
+        :type start_tile: int
+        :param start_tile: The first tile to calculate, earlier ones are skipped
+        :type first_row: int
+        :param first_row: Only pairs with at least one song from this one on are calculated, see get_tiles
+        :return Iterator[tuple[int, int, np.ndarray, np.ndarray, np.ndarray]]: For each tile the tiles number, the
+            total tile count, row song indices, column song indices and similarity scores"""
+        tile_list = self.get_tiles(matrix.shape[0], first_row)
+        with tempfile.TemporaryDirectory(prefix='song_vectors_', dir=self._directory,
+                                         ignore_cleanup_errors=True) as matrix_directory:
+            matrix = self._prepare_matrix(matrix)
+            MappedSparseMatrix.save(matrix, matrix_directory)
+            compute = compute_sparse_tile if self._use_sparse_tiles(matrix) else compute_tile
+            # Let the vectors in memory be freed once the caller drops them
+            del matrix
+            mapped_matrix = MappedSparseMatrix.load(matrix_directory)
+            for tile_num in range(start_tile, len(tile_list)):
+                # Slicing rows of a csr matrix only copies the data of these rows
+                rows, cols, scores = compute(mapped_matrix, *tile_list[tile_num], threshold)
+                yield tile_num, len(tile_list), rows, cols, scores
+            del mapped_matrix
@@ -0,0 +1,135 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from SimilarityPairs import SimilarityPairs
+from Song import Song
+
+
+class PairSpill:
+    """Bytes each buffered pair takes, including the temporaries of sorting a run"""
+    BYTES_PER_PAIR = 48
+    """How many pairs have been added"""
+    pair_count: int
+
+    def __init__(self, song_count, max_buffered_pairs=1000000, directory=None):
+        """Collect similar song pairs on disk instead of in memory. Buffered pairs are written as sorted runs,
+        which are merged into one sorted, memory mapped pair list at the end
+        :type song_count: int
+        :param song_count: How many songs the pair indices refer to
+        :type max_buffered_pairs: int
+        :param max_buffered_pairs: How many pairs are kept in memory before they are written as a run
+        :type directory: Path | str | None
+        :param directory: Directory to create the temporary spill directory in, defaults to the systems temp dir"""
+        self._song_count: int = max(1, song_count)
+        self._max_buffered_pairs: int = max(1, max_buffered_pairs)
+        # Mapped files can not be deleted on Windows, so cleaning up must not fail while they are still in use
+        self._temporary_directory = tempfile.TemporaryDirectory(prefix='song_pairs_', dir=directory,
+                                                                ignore_cleanup_errors=True)
+        self._directory: Path = Path(self._temporary_directory.name)
+        self._key_list: list[np.ndarray] = []
+        self._score_list: list[np.ndarray] = []
+        self._buffered_pairs: int = 0
+        self._run_list: list[tuple[Path, Path]] = []
+        self.pair_count = 0
+
+    def add(self, rows, cols, scores):
+        """Add song pairs, writing a run once the buffer is full
+        :type rows: np.ndarray
+        :param rows: First song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second song index of each pair
+        :type scores: np.ndarray
+        :param scores: Similarity score of each pair"""
+        if 0 == len(scores):
+            return
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        # The same pair keys SimilarityPairs sorts by, the song indices can be recovered from them
+        self._key_list.append(np.maximum(rows, cols) * self._song_count + np.minimum(rows, cols))
+        self._score_list.append(np.asarray(scores, dtype=np.float32))
+        self._buffered_pairs += len(scores)
+        self.pair_count += len(scores)
+        if self._max_buffered_pairs <= self._buffered_pairs:
+            self._write_run()
+
+    def _write_run(self):
+        """Sort the buffered pairs and write them to disk"""
+        if 0 == self._buffered_pairs:
+            return
+        keys = np.concatenate(self._key_list)
+        scores = np.concatenate(self._score_list)
+        self._key_list = []
+        self._score_list = []
+        self._buffered_pairs = 0
+        order = np.argsort(keys, kind='stable')
+        run_num = len(self._run_list)
+        key_file = self._directory / ('run_' + str(run_num) + '_keys.npy')
+        score_file = self._directory / ('run_' + str(run_num) + '_scores.npy')
+        np.save(key_file, keys[order])
+        np.save(score_file, scores[order])
+        self._run_list.append((key_file, score_file))
+
+    def get_run_count(self):
+        """Get how many sorted runs have been written so far
+        :return int: The number of runs"""
+        return len(self._run_list)
+
+    def merge(self, song_list):
+        """Merge all runs into one sorted pair list stored in memory mapped files
+        :type song_list: list[Song]
+        :param song_list: All songs the pair indices refer to
+        :return SimilarityPairs: All pairs, backed by the spill files"""
+        self._write_run()
+        run_key_list = [np.load(key_file, mmap_mode='r') for key_file, _ in self._run_list]
+        run_score_list = [np.load(score_file, mmap_mode='r') for _, score_file in self._run_list]
+        pair_count = sum(len(run_keys) for run_keys in run_key_list)
+        merged_arrays = {name: np.lib.format.open_memmap(self._directory / (name + '.npy'), mode='w+', dtype=dtype,
+                                                         shape=(pair_count,))
+                         for name, dtype in (('keys', np.int64), ('rows', np.int32), ('cols', np.int32),
+                                             ('scores', np.float32))}
+        # Each run contributes a chunk per step, so the merge buffer stays as small as a single run
+        chunk_size = max(1024, self._max_buffered_pairs // max(1, len(run_key_list)))
+        positions = [0] * len(run_key_list)
+        chunk_key_list: list[np.ndarray] = []
+        step_key_list: list[np.ndarray] = []
+        step_score_list: list[np.ndarray] = []
+        merged_count = 0
+        while merged_count < pair_count:
+            chunk_key_list = [run_keys[position:position + chunk_size]
+                              for run_keys, position in zip(run_key_list, positions)]
+            # Keys up to the smallest last key of all runs with more keys left are complete in this step
+            bound = min((chunk_keys[-1] for chunk_keys, run_keys, position in
+                         zip(chunk_key_list, run_key_list, positions) if position + chunk_size < len(run_keys)),
+                        default=np.iinfo(np.int64).max)
+            step_key_list = []
+            step_score_list = []
+            for run_num, chunk_keys in enumerate(chunk_key_list):
+                take = int(np.searchsorted(chunk_keys, bound, side='right'))
+                step_key_list.append(chunk_keys[:take])
+                step_score_list.append(run_score_list[run_num][positions[run_num]:positions[run_num] + take])
+                positions[run_num] += take
+            keys = np.concatenate(step_key_list)
+            order = np.argsort(keys, kind='stable')
+            keys = keys[order]
+            step_end = merged_count + len(keys)
+            merged_arrays['keys'][merged_count:step_end] = keys
+            merged_arrays['rows'][merged_count:step_end] = keys // self._song_count
+            merged_arrays['cols'][merged_count:step_end] = keys % self._song_count
+            merged_arrays['scores'][merged_count:step_end] = np.concatenate(step_score_list)[order]
+            merged_count = step_end
+        for merged_array in merged_arrays.values():
+            merged_array.flush()
+        # The runs are not needed anymore
+        del run_key_list, run_score_list, chunk_key_list, step_key_list, step_score_list
+        for key_file, score_file in self._run_list:
+            key_file.unlink(missing_ok=True)
+            score_file.unlink(missing_ok=True)
+        self._run_list = []
+        return SimilarityPairs.from_sorted(song_list, merged_arrays['keys'], merged_arrays['rows'],
+                                           merged_arrays['cols'], merged_arrays['scores'])
+
+    def close(self):
+        """Delete all spill files, pairs merged from them must not be used anymore"""
+        self._temporary_directory.cleanup()
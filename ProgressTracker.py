@@ -0,0 +1,108 @@
+import timeit
+
+
+class ProgressTracker:
+    def __init__(self, stage_weights, progress_callback, min_interval=0.1):
+        """Combine the progress of several stages into one percentage with an estimated remaining time
+        :type stage_weights: dict[str, float]
+        :param stage_weights: Each stages share of the total work, in the order the stages run
+        :type progress_callback: callable
+        :param progress_callback: Called with the percentage done, the seconds elapsed and the estimated seconds
+            remaining, None if there is no estimate yet
+        :type min_interval: float
+        :param min_interval: Minimum seconds between two progress updates, stage changes are always reported"""
+        weight_sum: float = sum(stage_weights.values()) or 1
+        self._stage_weights: dict[str, float] = {stage_name: weight / weight_sum
+                                                 for stage_name, weight in stage_weights.items()}
+        self._progress_callback: callable = progress_callback
+        self._min_interval: float = min_interval
+        self._timer_start: float = timeit.default_timer()
+        self._last_update: float = 0
+        # Progress of finished stages and the stage currently running
+        self._finished_weight: float = 0
+        self._stage_name: str | None = None
+        self._stage_total: int | None = 0
+        self._stage_done: int = 0
+        self._stage_start: float = self._timer_start
+
+    def start_stage(self, stage_name, total):
+        """Start the next stage, the previous one is finished
+        :type stage_name: str
+        :param stage_name: The stages name, as given in the stage weights
+        :type total: int | None
+        :param total: How many units of work the stage has, None if it is only known once the stage reports it"""
+        if self._stage_name is not None:
+            self._finished_weight += self._stage_weights.get(self._stage_name, 0)
+        self._stage_name = stage_name
+        self._stage_total = total
+        self._stage_done = 0
+        self._stage_start = timeit.default_timer()
+        self._report(True)
+
+    def update(self, done, total=None):
+        """Set how much work of the current stage is done, updates are rate limited
+        :type done: int
+        :param done: Units of work done in the current stage
+        :type total: int | None
+        :param total: How many units of work the stage has, if it is only known while the stage runs"""
+        self._stage_done = done
+        if total is not None:
+            self._stage_total = total
+        self._report(False)
+
+    def advance(self, count=1):
+        """Add finished work to the current stage
+        :type count: int
+        :param count: Units of work that were finished"""
+        self.update(self._stage_done + count)
+
+    def finish(self):
+        """All stages are done"""
+        self._finished_weight = 1
+        self._stage_name = None
+        self._progress_callback(100, timeit.default_timer() - self._timer_start, 0)
+
+    def _get_stage_fraction(self):
+        """Get how much of the current stage is done
+        :return float: The done fraction from 0 to 1, stages without work count as done"""
+        # Nothing is done until the stage knows how much work it has
+        if self._stage_total is None:
+            return 0
+        if self._stage_total <= 0:
+            return 1
+        return min(1, self._stage_done / self._stage_total)
+
+    def get_progress(self):
+        """Get the current progress
+        :return float, float, float | None: The percentage done, the seconds elapsed and the estimated seconds
+            remaining"""
+        now: float = timeit.default_timer()
+        stage_weight: float = self._stage_weights.get(self._stage_name, 0)
+        stage_fraction: float = self._get_stage_fraction()
+        fraction_done: float = min(1, self._finished_weight + stage_weight * stage_fraction)
+        seconds_elapsed: float = now - self._timer_start
+
+        # The current stage finishes at its measured throughput, once it has one
+        seconds_remaining: float = 0
+        later_weight: float = 1 - self._finished_weight - stage_weight
+        stage_seconds: float = now - self._stage_start
+        if 0 < stage_fraction < 1 and 0 < stage_seconds:
+            seconds_remaining = stage_seconds / stage_fraction * (1 - stage_fraction)
+        elif stage_fraction < 1:
+            later_weight += stage_weight
+        # Later stages are estimated from the time the work so far took per weight
+        if 0 < later_weight:
+            if 0 == fraction_done:
+                return 0, seconds_elapsed, None
+            seconds_remaining += seconds_elapsed / fraction_done * later_weight
+        return round(fraction_done * 100, 2), seconds_elapsed, seconds_remaining
+
+    def _report(self, force):
+        """Pass the progress to the callback, unless the last update was too recent
+        :type force: bool
+        :param force: Report even if the last update was too recent"""
+        now: float = timeit.default_timer()
+        if not force and now - self._last_update < self._min_interval:
+            return
+        self._last_update = now
+        self._progress_callback(*self.get_progress())
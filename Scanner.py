@@ -0,0 +1,215 @@
+import argparse
+import csv
+import json
+import sys
+from pathlib import Path
+
+from Instrumentation import Instrumentation
+from LoadedSongs import LoadedSongs
+from SimilarityEngine import TiledSimilarityEngine
+from SimilarityFinder import SimilarityFinder
+from SimilarityGrouping import SimilarityGrouping
+from SongLoader import SongLoader
+from SongVectorizer import SongVectorizer
+
+
+class Scanner:
+    """Exit codes, finding similar songs gets a code Python does not use for uncaught errors"""
+    EXIT_NO_SIMILARITIES = 0
+    EXIT_SIMILARITIES_FOUND = 10
+    EXIT_USAGE_ERROR = 2
+    EXIT_NO_SONGS = 3
+    EXIT_OUTPUT_ERROR = 4
+    """Available output formats"""
+    JSONL = 'jsonl'
+    CSV = 'csv'
+
+    def __init__(self, directory, out_file, output_format=None, threshold=0.6, workers=None, approximate=False,
+                 vectorizer=SongVectorizer.TFIDF, grouping_strategy=SimilarityGrouping.COMPONENTS,
+                 instrumentation=None, json_log_file=None, memory_budget=None,
+                 numeric_path=TiledSimilarityEngine.DENSE, checkpoint_directory=None):
+        """Find similar songs without a gui and write the pairs to a file as soon as they are found
+        :type directory: Path
+        :param directory: Directory to load song files from, recursively
+        :type out_file: Path
+        :param out_file: File to write the similar pairs to
+        :type output_format: str | None
+        :param output_format: JSONL or CSV, None picks the format by the files suffix
+        :type threshold: float
+        :param threshold: The threshold of what counts as "similar"
+        :type workers: int | None
+        :param workers: How many processes load song files and calculate similarities, None uses all cpu cores
+        :type approximate: bool
+        :param approximate: Only compare candidate pairs found with MinHash locality sensitive hashing
+        :type vectorizer: str
+        :param vectorizer: How song texts are turned into vectors, see SongVectorizer
+        :type grouping_strategy: str
+        :param grouping_strategy: How similar songs are grouped, see SimilarityGrouping
+        :type instrumentation: Instrumentation | None
+        :param instrumentation: Measures each stage, None measures wall and cpu time only
+        :type json_log_file: Path | None
+        :param json_log_file: File the report is appended to as a JSON line, None writes it to stderr
+        :type memory_budget: float | None
+        :param memory_budget: MiB the similarity calculation may use, pairs are spilled to disk. None keeps
+            everything in memory
+        :type numeric_path: str
+        :param numeric_path: How similarity tiles are calculated, see TiledSimilarityEngine
+        :type checkpoint_directory: Path | None
+        :param checkpoint_directory: Directory to store finished batches in, an interrupted scan of the same songs
+            continues from there. None does not store checkpoints"""
+        self._directory: Path = directory
+        self._out_file: Path = out_file
+        if output_format is None:
+            output_format = self.CSV if '.csv' == out_file.suffix.lower() else self.JSONL
+        self._output_format: str = output_format
+        self._threshold: float = threshold
+        self._workers: int | None = workers
+        self._approximate: bool = approximate
+        self._vectorizer: str = vectorizer
+        self._grouping_strategy: str = grouping_strategy
+        self._pair_count: int = 0
+        self._similarity_finder: SimilarityFinder | None = None
+        self._write_error: OSError | None = None
+        if instrumentation is None:
+            instrumentation = Instrumentation()
+        self._instrumentation: Instrumentation = instrumentation
+        self._json_log_file: Path | None = json_log_file
+        self._memory_budget: float | None = memory_budget
+        self._numeric_path: str = numeric_path
+        self._checkpoint_directory: Path | None = checkpoint_directory
+
+    def scan(self):
+        """Load all songs, find similar pairs and write them
+        :return int: The exit code"""
+        if not self._directory.is_dir():
+            print('Not a directory:', self._directory, file=sys.stderr)
+            return self.EXIT_USAGE_ERROR
+        # An output file that can't be written fails before the long part
+        try:
+            out_file = open(self._out_file, 'w', encoding='utf-8', newline='')
+        except OSError as error:
+            print('Could not write', self._out_file, error, file=sys.stderr)
+            return self.EXIT_OUTPUT_ERROR
+
+        with out_file:
+            # Load songs
+            loaded_songs = LoadedSongs()
+            loaded_songs.add_many(SongLoader(self._workers).load(sorted(self._directory.rglob('*.sng')),
+                                                                 instrumentation=self._instrumentation))
+            song_count: int = len(list(loaded_songs))
+            if 0 == song_count:
+                print('No song files found in', self._directory, file=sys.stderr)
+                return self.EXIT_NO_SONGS
+
+            # Find similarities, pairs are written while the calculation is still running
+            similarity_finder = SimilarityFinder(loaded_songs, similarity_threshold=self._threshold,
+                                                 workers=self._workers, approximate=self._approximate,
+                                                 score_floor=self._threshold, vectorizer=self._vectorizer,
+                                                 grouping_strategy=self._grouping_strategy,
+                                                 pairs_found_callback=self._get_writer(out_file), run_in_thread=False,
+                                                 instrumentation=self._instrumentation,
+                                                 memory_budget=self._memory_budget,
+                                                 numeric_path=self._numeric_path,
+                                                 checkpoint_directory=self._checkpoint_directory)
+            self._similarity_finder = similarity_finder
+            similarity_finder.run()
+        if self._write_error is not None:
+            print('Could not write', self._out_file, self._write_error, file=sys.stderr)
+            return self.EXIT_OUTPUT_ERROR
+        self._report()
+
+        similarities, _ = similarity_finder.get_similarities()
+        print(song_count, 'songs,', self._pair_count, 'similar pairs,', len(similarities), 'groups')
+        return self.EXIT_SIMILARITIES_FOUND if 0 < self._pair_count else self.EXIT_NO_SIMILARITIES
+
+    def _get_writer(self, out_file):
+        """Get a callback writing found pairs to the output file
+        :type out_file: TextIO
+        :param out_file: The opened output file
+        :return callable: The pairs found callback"""
+        csv_writer = None
+        if self.CSV == self._output_format:
+            csv_writer = csv.writer(out_file)
+            csv_writer.writerow(['song', 'similar_song', 'score'])
+
+        def write_pairs(song_list, rows, cols, scores):
+            if self._write_error is not None:
+                return
+            try:
+                for row, col, score in zip(rows.tolist(), cols.tolist(), scores.tolist()):
+                    score = round(score, 4)
+                    if csv_writer is None:
+                        out_file.write(json.dumps({'song': str(song_list[row]), 'similar_song': str(song_list[col]),
+                                                   'score': score}) + '\n')
+                    else:
+                        csv_writer.writerow([str(song_list[row]), str(song_list[col]), score])
+                out_file.flush()
+            except OSError as error:
+                # Nothing more can be written, so the calculation stops
+                self._write_error = error
+                self._similarity_finder.cancel()
+                return
+            self._pair_count += len(scores)
+
+        return write_pairs
+
+    def _report(self):
+        """Print the stage measurements and log them as a JSON line"""
+        self._instrumentation.finish()
+        self._instrumentation.print_report()
+        if self._json_log_file is None:
+            self._instrumentation.write_log_line()
+            return
+        try:
+            with open(self._json_log_file, 'a', encoding='utf-8') as json_log_file:
+                self._instrumentation.write_log_line(json_log_file)
+        except OSError as error:
+            print('Could not write', self._json_log_file, error, file=sys.stderr)
+
+
+def main(argument_list=None):
+    """Run the command line interface
+    :type argument_list: list[str] | None
+    :param argument_list: The command line arguments, None uses sys.argv
+    :return int: The exit code"""
+    parser = argparse.ArgumentParser(description='Find similar SongBeamer songs without a gui')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    scan_parser = subparsers.add_parser('scan', help='Write all similar song pairs in a directory to a file',
+                                        description='Exit codes: 0 no similar songs, 10 similar songs found, '
+                                                    '2 usage error, 3 no songs found, 4 output not writable')
+    scan_parser.add_argument('directory', type=Path, help='Directory to load song files from, recursively')
+    scan_parser.add_argument('--threshold', type=float, default=0.6, help='Similarity threshold')
+    scan_parser.add_argument('--workers', type=int, default=None, help='Worker processes, all cpu cores by default')
+    scan_parser.add_argument('--out', type=Path, default=Path('pairs.jsonl'), help='Output file, .jsonl or .csv')
+    scan_parser.add_argument('--format', choices=(Scanner.JSONL, Scanner.CSV), default=None,
+                             help='Output format, picked by the output files suffix by default')
+    scan_parser.add_argument('--approximate', action='store_true', help='Only compare MinHash LSH candidates')
+    scan_parser.add_argument('--vectorizer', choices=SongVectorizer.BACKENDS, default=SongVectorizer.TFIDF,
+                             help='How song texts are turned into vectors')
+    scan_parser.add_argument('--grouping', default=SimilarityGrouping.COMPONENTS,
+                             choices=(SimilarityGrouping.COMPONENTS, SimilarityGrouping.GREEDY,
+                                      SimilarityGrouping.CLIQUES), help='How similar songs are grouped')
+    scan_parser.add_argument('--trace-memory', action='store_true',
+                             help='Measure the peak memory of each stage, this slows the scan down')
+    scan_parser.add_argument('--profile', type=Path, default=None, help='Dump cProfile statistics to this file')
+    scan_parser.add_argument('--json-log', type=Path, default=None,
+                             help='Append the stage report as a JSON line to this file instead of stderr')
+    scan_parser.add_argument('--memory-budget', type=float, default=None,
+                             help='MiB the similarity calculation may use, similar pairs are spilled to disk')
+    scan_parser.add_argument('--numeric', choices=TiledSimilarityEngine.NUMERIC_PATHS,
+                             default=TiledSimilarityEngine.DENSE,
+                             help='Calculate similarities with dense float64, dense float32 or sparse float32 tiles. '
+                                  'Sparse tiles are only used if few songs share words, dense float32 ones otherwise')
+    scan_parser.add_argument('--checkpoint', type=Path, default=None,
+                             help='Store finished batches in this directory, an interrupted scan continues from there')
+    args = parser.parse_args(argument_list)
+
+    instrumentation = Instrumentation(trace_memory=args.trace_memory, profile_file=args.profile)
+    scanner = Scanner(args.directory, args.out, args.format, args.threshold, args.workers, args.approximate,
+                      args.vectorizer, args.grouping, instrumentation, args.json_log, args.memory_budget,
+                      args.numeric, args.checkpoint)
+    return scanner.scan()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
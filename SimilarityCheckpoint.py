@@ -0,0 +1,111 @@
+import hashlib
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+class SimilarityCheckpoint:
+    """The default checkpoint directories name"""
+    default_directory_name = '.similarity_checkpoint'
+    """File name pattern of the batch files"""
+    _batch_file_pattern = 'batch_{:06d}.npz'
+
+    def __init__(self, directory, key):
+        """Store the pairs of each finished batch of a similarity calculation, so an interrupted calculation can
+        continue from the last finished batch. Batches of a calculation with another key are ignored and replaced
+        :type directory: Path | str
+        :param directory: The directory to store the batches in, it is created if needed
+        :type key: str
+        :param key: Identifies the songs and settings of the calculation, see get_key"""
+        self._directory: Path = Path(directory)
+        self._key: str = key
+
+    @staticmethod
+    def get_key(part_list):
+        """Build a checkpoint key from everything the calculated pairs depend on
+        :type part_list: Iterable[str | bytes]
+        :param part_list: The song names and texts and the calculation settings, in a fixed order
+        :return str: The key"""
+        key_hash = hashlib.blake2b(digest_size=16)
+        for part in part_list:
+            key_hash.update(part if isinstance(part, bytes) else part.encode())
+            # Separate the parts, so moving text from one part to the next changes the key
+            key_hash.update(b'\0')
+        return key_hash.hexdigest()
+
+    def with_key_parts(self, part_list):
+        """Get a checkpoint in the same directory for a calculation that also depends on more parts
+        :type part_list: Iterable[str | bytes]
+        :param part_list: The additional parts, see get_key
+        :return SimilarityCheckpoint: The checkpoint"""
+        return SimilarityCheckpoint(self._directory, self.get_key([self._key, *part_list]))
+
+    def _get_batch_file(self, batch_num):
+        """Get the file a batch is stored in
+        :type batch_num: int
+        :param batch_num: The batches number
+        :return Path: The batch file"""
+        return self._directory / self._batch_file_pattern.format(batch_num)
+
+    def get_batch_count(self):
+        """Count the finished batches of this calculation, batches of other calculations are removed
+        :return int: How many batches in a row, starting from the first one, are stored"""
+        batch_count: int = 0
+        while self._get_batch_file(batch_count).is_file():
+            try:
+                with np.load(self._get_batch_file(batch_count), allow_pickle=False) as batch_data:
+                    if str(batch_data['key']) != self._key:
+                        break
+            except (OSError, KeyError, ValueError):
+                break
+            batch_count += 1
+        self._remove_batches(batch_count)
+        return batch_count
+
+    def iter_batches(self, batch_count):
+        """Read the stored batches one by one
+        :type batch_count: int
+        :param batch_count: How many batches to read, see get_batch_count
+        :return Iterator[tuple[np.ndarray, np.ndarray, np.ndarray]]: The song indices and scores of each batch"""
+        for batch_num in range(batch_count):
+            with np.load(self._get_batch_file(batch_num), allow_pickle=False) as batch_data:
+                yield batch_data['rows'], batch_data['cols'], batch_data['scores']
+
+    def save_batch(self, batch_num, rows, cols, scores):
+        """Store a finished batch, batches have to be stored in order
+        :type batch_num: int
+        :param batch_num: The batches number
+        :type rows: np.ndarray
+        :param rows: First song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second song index of each pair
+        :type scores: np.ndarray
+        :param scores: Similarity score of each pair"""
+        batch_file: Path = self._get_batch_file(batch_num)
+        temp_file: Path = batch_file.with_name(batch_file.name + '.tmp')
+        try:
+            self._directory.mkdir(parents=True, exist_ok=True)
+            with open(temp_file, 'wb') as file:
+                np.savez(file, key=np.array(self._key), rows=rows, cols=cols, scores=scores)
+            # A batch only counts once it is complete
+            os.replace(temp_file, batch_file)
+        except OSError as error:
+            print("Error writing similarity checkpoint", batch_file, error)
+
+    def _remove_batches(self, first_batch_num=0):
+        """Remove stored batches
+        :type first_batch_num: int
+        :param first_batch_num: The first batch to remove, all later ones are removed as well"""
+        if not self._directory.is_dir():
+            return
+        for batch_file in self._directory.glob('batch_*.npz*'):
+            try:
+                if int(batch_file.name[len('batch_'):].split('.')[0]) >= first_batch_num:
+                    batch_file.unlink()
+            except (ValueError, OSError):
+                continue
+
+    def remove(self):
+        """Remove all stored batches, once the calculation is done"""
+        self._remove_batches()
@@ -0,0 +1,235 @@
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.utils.extmath import safe_sparse_dot
+
+from MappedSparseMatrix import MappedSparseMatrix
+
+# The song vectors memory mapped by a worker process
+_worker_matrix = None
+
+
+def compute_tile(matrix, row_start, row_end, col_start, col_end, threshold):
+    """Calculate the similarities of one tile of the lower triangle of the similarity matrix
+    :type matrix: scipy.sparse.csr_matrix
+    :param matrix: The l2 normalized song vectors, one row per song
+    :type row_start: int
+    :param row_start: The first song of the tiles rows
+    :type row_end: int
+    :param row_end: The song after the last song of the tiles rows
+    :type col_start: int
+    :param col_start: The first song of the tiles columns
+    :type col_end: int
+    :param col_end: The song after the last song of the tiles columns
+    :type threshold: float
+    :param threshold: Only similarities above this threshold are kept
+    :return np.ndarray, np.ndarray, np.ndarray: Row song indices, column song indices and similarity scores"""
+    # The vectors are normalized, so their dot product is the cosine similarity
+    tile = safe_sparse_dot(matrix[row_start:row_end], matrix[col_start:col_end].T, dense_output=True)
+    above_threshold = tile > threshold
+    # Tiles on the diagonal contain each pair twice and every song paired with itself. Cutting the boolean mask is
+    # cheaper than copying the scores
+    if row_start == col_start:
+        above_threshold = np.tril(above_threshold, -1)
+    rows, cols = np.nonzero(above_threshold)
+    return rows + row_start, cols + col_start, tile[rows, cols]
+
+
+def compute_sparse_tile(matrix, row_start, row_end, col_start, col_end, threshold):
+    """Calculate the similarities of one tile with a sparse matrix product, so no dense tile is created. Only songs
+    sharing at least one word get a score, which are then thresholded in place
+    :type matrix: scipy.sparse.csr_matrix
+    :param matrix: The l2 normalized song vectors, one row per song
+    :type row_start: int
+    :param row_start: The first song of the tiles rows
+    :type row_end: int
+    :param row_end: The song after the last song of the tiles rows
+    :type col_start: int
+    :param col_start: The first song of the tiles columns
+    :type col_end: int
+    :param col_end: The song after the last song of the tiles columns
+    :type threshold: float
+    :param threshold: Only similarities above this threshold are kept
+    :return np.ndarray, np.ndarray, np.ndarray: Row song indices, column song indices and similarity scores"""
+    tile = (matrix[row_start:row_end] @ matrix[col_start:col_end].T).tocsr()
+    rows = np.repeat(np.arange(row_end - row_start, dtype=np.int32), np.diff(tile.indptr))
+    above_threshold = tile.data > threshold
+    if row_start == col_start:
+        above_threshold &= rows > tile.indices
+    return rows[above_threshold] + row_start, tile.indices[above_threshold] + col_start, tile.data[above_threshold]
+
+
+def _init_worker(matrix_directory):
+    """Memory map the shared song vectors once per worker process
+    :type matrix_directory: str
+    :param matrix_directory: The directory the song vectors are stored in"""
+    global _worker_matrix
+    _worker_matrix = MappedSparseMatrix.load(matrix_directory)
+
+
+def _compute_worker_tile(tile, threshold, sparse_output):
+    """Calculate one tile inside a worker process
+    :type tile: tuple[int, int, int, int]
+    :param tile: Row start, row end, column start and column end of the tile
+    :type threshold: float
+    :param threshold: Only similarities above this threshold are kept
+    :type sparse_output: bool
+    :param sparse_output: Whether the tile is calculated with a sparse matrix product
+    :return np.ndarray, np.ndarray, np.ndarray: Row song indices, column song indices and similarity scores"""
+    rows, cols, scores = (compute_sparse_tile if sparse_output else compute_tile)(_worker_matrix, *tile, threshold)
+    # Keep the data sent back to the main process small
+    return rows.astype(np.int32), cols.astype(np.int32), scores
+
+
+class TiledSimilarityEngine:
+    """Available numeric paths: dense float64 tiles, dense float32 tiles and sparse float32 tiles"""
+    DENSE = 'dense'
+    DENSE_FLOAT32 = 'dense32'
+    SPARSE_FLOAT32 = 'sparse32'
+    NUMERIC_PATHS = (DENSE, DENSE_FLOAT32, SPARSE_FLOAT32)
+    """Share of song pairs sharing at least one word, below which SPARSE_FLOAT32 calculates sparse tiles. Sparse
+    products compute every shared word before thresholding, on 2048 song tiles they were 3 times faster and 10 times
+    smaller than dense float32 tiles at 4 %, 1.8 times faster at 12 % and twice as slow at 55 %. Songs sharing common
+    words like "und" or "the" are far above it, so they get dense float32 tiles"""
+    SPARSE_DENSITY_CUTOFF = 0.1
+    """How many evenly spread songs are multiplied with all songs to estimate the density"""
+    _density_sample_size = 64
+    """Were the tiles of the last calculation sparse?"""
+    sparse_tiles: bool
+
+    def __init__(self, tile_size=2048, numeric_path=DENSE):
+        """Calculate song similarities tile by tile, only looking at the lower triangle of the similarity matrix
+        :type tile_size: int
+        :param tile_size: How many songs each tile spans in each direction, this bounds the peak memory per tile
+        :type numeric_path: str
+        :param numeric_path: DENSE calculates float64 tiles, DENSE_FLOAT32 halves their memory and SPARSE_FLOAT32
+            only creates scores of songs sharing words if less than SPARSE_DENSITY_CUTOFF of them do, otherwise it
+            calculates dense float32 tiles"""
+        if numeric_path not in self.NUMERIC_PATHS:
+            raise ValueError('Unknown numeric path ' + str(numeric_path))
+        self._tile_size: int = max(1, tile_size)
+        self._numeric_path: str = numeric_path
+        self.sparse_tiles = False
+
+    @classmethod
+    def get_dtype(cls, numeric_path):
+        """Get the data type song vectors should have for a numeric path
+        :type numeric_path: str
+        :param numeric_path: One of the NUMERIC_PATHS
+        :return type: The numpy data type"""
+        return np.float64 if cls.DENSE == numeric_path else np.float32
+
+    def _prepare_matrix(self, matrix):
+        """Convert the song vectors to the data type of the numeric path, if they do not have it already
+        :type matrix: scipy.sparse.csr_matrix
+        :param matrix: The l2 normalized song vectors
+        :return scipy.sparse.csr_matrix: The song vectors with the right data type"""
+        return matrix.astype(self.get_dtype(self._numeric_path), copy=False)
+
+    def estimate_density(self, matrix):
+        """Estimate the share of song pairs sharing at least one word, which is the share of non zero scores
+        :type matrix: scipy.sparse.csr_matrix
+        :param matrix: The song vectors, one row per song
+        :return float: The estimated share from 0 to 1"""
+        song_count: int = matrix.shape[0]
+        if 0 == song_count:
+            return 0
+        sample_rows = np.unique(np.linspace(0, song_count - 1, min(song_count, self._density_sample_size),
+                                            dtype=np.int64))
+        return (matrix[sample_rows] @ matrix.T).nnz / (len(sample_rows) * song_count)
+
+    def _use_sparse_tiles(self, matrix):
+        """Decide if tiles are calculated with sparse products, which only pays off if few songs share words
+        :type matrix: scipy.sparse.csr_matrix
+        :param matrix: The song vectors, one row per song
+        :return bool: Whether tiles are sparse"""
+        self.sparse_tiles = self.SPARSE_FLOAT32 == self._numeric_path and \
+            self.estimate_density(matrix) < self.SPARSE_DENSITY_CUTOFF
+        return self.sparse_tiles
+
+    def get_tiles(self, song_count, first_row=0):
+        """Get all tiles covering the lower triangle of the similarity matrix, including the diagonal
+        :type song_count: int
+        :param song_count: How many songs are compared
+        :type first_row: int
+        :param first_row: Only songs from this one on are compared with all songs before them and with each other,
+            pairs of earlier songs are left out
+        :return list[tuple[int, int, int, int]]: Row start, row end, column start and column end of each tile"""
+        tile_list = []
+        for row_start in range(first_row, song_count, self._tile_size):
+            row_end = min(row_start + self._tile_size, song_count)
+            # Songs before the first row are only columns, so the diagonal tiles start at the first row
+            for col_start in range(0, first_row, self._tile_size):
+                tile_list.append((row_start, row_end, col_start, min(col_start + self._tile_size, first_row)))
+            for col_start in range(first_row, row_start + 1, self._tile_size):
+                col_end = min(col_start + self._tile_size, song_count)
+                tile_list.append((row_start, row_end, col_start, col_end))
+        return tile_list
+
+    def iter_similarities(self, matrix, threshold, start_tile=0, first_row=0):
+        """Calculate all song pairs above the threshold
+        :type matrix: scipy.sparse.csr_matrix
+        :param matrix: The l2 normalized song vectors, one row per song
+        :type threshold: float
+        :param threshold: Only similarities above this threshold are kept
+        :type start_tile: int
+        :param start_tile: The first tile to calculate, earlier ones are skipped
+        :type first_row: int
+        :param first_row: Only pairs with at least one song from this one on are calculated, see get_tiles
+        :return Iterator[tuple[int, int, np.ndarray, np.ndarray, np.ndarray]]: For each tile the tiles number, the
+            total tile count, row song indices, column song indices and similarity scores"""
+        tile_list = self.get_tiles(matrix.shape[0], first_row)
+        matrix = self._prepare_matrix(matrix)
+        compute = compute_sparse_tile if self._use_sparse_tiles(matrix) else compute_tile
+        for tile_num in range(start_tile, len(tile_list)):
+            rows, cols, scores = compute(matrix, *tile_list[tile_num], threshold)
+            yield tile_num, len(tile_list), rows, cols, scores
+
+
+class ParallelSimilarityEngine(TiledSimilarityEngine):
+    def __init__(self, tile_size=2048, workers=None, numeric_path=TiledSimilarityEngine.DENSE):
+        """Calculate song similarities tile by tile in multiple worker processes.
+        The song vectors are stored in memory mapped files once, which all workers share without copying them
+        :type tile_size: int
+        :param tile_size: How many songs each tile spans in each direction, this bounds the peak memory per tile
+        :type workers: int | None
+        :param workers: The number of worker processes, defaults to the number of cpu cores
+        :type numeric_path: str
+        :param numeric_path: How tiles are calculated, see TiledSimilarityEngine"""
+        super().__init__(tile_size, numeric_path)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self._workers: int = max(1, workers)
+
+    def iter_similarities(self, matrix, threshold, start_tile=0, first_row=0):
+        """Calculate all song pairs above the threshold, the tiles are yielded in the same order as they would be
+        without worker processes
+        :type matrix: scipy.sparse.csr_matrix
+        :param matrix: The l2 normalized song vectors, one row per song
+        :type threshold: float
+        :param threshold: Only similarities above this threshold are kept
+        :type start_tile: int
+        :param start_tile: The first tile to calculate, earlier ones are skipped
+        :type first_row: int
+        :param first_row: Only pairs with at least one song from this one on are calculated, see get_tiles
+        :return Iterator[tuple[int, int, np.ndarray, np.ndarray, np.ndarray]]: For each tile the tiles number, the
+            total tile count, row song indices, column song indices and similarity scores"""
+        tile_list = self.get_tiles(matrix.shape[0], first_row)
+        with tempfile.TemporaryDirectory(prefix='song_vectors_') as matrix_directory:
+            MappedSparseMatrix.save(self._prepare_matrix(matrix), matrix_directory)
+            sparse_output: bool = self._use_sparse_tiles(matrix)
+            with ProcessPoolExecutor(max_workers=self._workers, initializer=_init_worker,
+                                     initargs=(matrix_directory,)) as executor:
+                # Keep every worker busy without queueing up all results at once
+                pending_tiles = deque()
+                next_tile: int = start_tile
+                while next_tile < len(tile_list) or pending_tiles:
+                    while next_tile < len(tile_list) and len(pending_tiles) < self._workers * 2:
+                        pending_tiles.append(executor.submit(_compute_worker_tile, tile_list[next_tile], threshold,
+                                                            sparse_output))
+                        next_tile += 1
+                    rows, cols, scores = pending_tiles.popleft().result()
+                    yield next_tile - len(pending_tiles) - 1, len(tile_list), rows, cols, scores
@@ -1,170 +1,493 @@
-import math
-from threading import Thread
-import networkx as nx
+import hashlib
+from pathlib import Path
+from threading import Thread, Event
 
 import numpy as np
-import pandas as pd
-from PySide6.QtCore import Signal
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
+from Instrumentation import Instrumentation
 from LoadedSongs import LoadedSongs
+from LshSimilarityEngine import LshSimilarityEngine
+from OutOfCoreSimilarityEngine import OutOfCoreSimilarityEngine
+from PairSpill import PairSpill
+from ProgressTracker import ProgressTracker
+from SimilarityCheckpoint import SimilarityCheckpoint
+from SimilarityGrouping import SimilarityGrouping
+from SimilarityIndex import SimilarityIndex
+from SimilarityPairs import SimilarityPairs
+from SimilarityEngine import TiledSimilarityEngine, ParallelSimilarityEngine
+from SimilarityStream import SimilarityStream
 from Song import Song
-from gui.ProgressBar import ProgressBar
+from SongVectorizer import SongVectorizer
 
 
 class SimilarityFinder:
-    def __init__(self, song_list, progress_bar=None, calculations_done_signal=None, similarity_threshold=0.6):
+    """Share of the total calculation time each stage takes"""
+    _stage_weights = {'prepare': 0.05, 'vectorize': 0.15, 'similarities': 0.75, 'grouping': 0.05}
+
+    def __init__(self, song_list, progress_callback=None, done_callback=None, similarity_threshold=0.6,
+                 tile_size=2048, workers=1, approximate=False, lsh_bands=32, lsh_rows=4,
+                 similarity_index=None, grouping_strategy=SimilarityGrouping.CLIQUES, score_floor=0.3,
+                 histogram_bins=20, vectorizer=SongVectorizer.TFIDF, pairs_found_callback=None,
+                 run_in_thread=True, instrumentation=None, memory_budget=None,
+                 numeric_path=TiledSimilarityEngine.DENSE, result_stream=None, checkpoint_directory=None):
         """Find similarities between songs in a directory
         :type song_list: LoadedSongs
         :param song_list: All songs to compare
-        :type progress_bar: ProgressBar
-        :param progress_bar: The progress bar object tracking the calculation progress
-        :type calculations_done_signal: Signal
-        :param calculations_done_signal: The signal to emit to when calculations are done
+        :type progress_callback: callable | None
+        :param progress_callback: Called with the percentage done, the seconds elapsed and the estimated seconds
+            remaining at most ten times a second, None prints the progress to the command line
+        :type done_callback: callable | None
+        :param done_callback: Called without arguments when calculations are done
         :type similarity_threshold: float
         :param similarity_threshold: The threshold of what counts as "similar"
+        :type tile_size: int
+        :param tile_size: How many songs are compared with each other at once, this bounds the peak memory
+        :type workers: int | None
+        :param workers: How many processes calculate similarities, None uses all cpu cores
+        :type approximate: bool
+        :param approximate: Only compare songs that MinHash locality sensitive hashing finds as candidates
+        :type lsh_bands: int
+        :param lsh_bands: How many bands the MinHash signatures are split into in approximate mode
+        :type lsh_rows: int
+        :param lsh_rows: How many values each MinHash band has in approximate mode
+        :type similarity_index: SimilarityIndex | None
+        :param similarity_index: Persistent index to only score new or changed songs with. It calculates all pairs
+            of these songs with the configured workers, memory budget and numeric path, even in approximate mode
+        :type grouping_strategy: str
+        :param grouping_strategy: How similar songs are grouped, see SimilarityGrouping
+        :type score_floor: float
+        :param score_floor: Pairs above this score are kept, so the threshold can be raised without calculating again
+        :type histogram_bins: int
+        :param histogram_bins: How many equally sized bins the score histogram has between 0 and 1
+        :type vectorizer: str
+        :param vectorizer: How song texts are turned into vectors, see SongVectorizer. The similarity index always
+            uses the tfidf backend
+        :type pairs_found_callback: callable | None
+        :param pairs_found_callback: Called with the song list and the song indices and scores of pairs above the
+            threshold as soon as they are found
+        :type run_in_thread: bool
+        :param run_in_thread: Calculate in a background thread, otherwise run() has to be called
+        :type instrumentation: Instrumentation | None
+        :param instrumentation: Measures each calculation stage, None measures nothing
+        :type memory_budget: float | None
+        :param memory_budget: MiB the similarity calculation may use. Song vectors are memory mapped, tiles are sized
+            to fit and all pairs above the score floor are spilled to disk. None keeps everything in memory
+        :type numeric_path: str
+        :param numeric_path: How similarity tiles are calculated, see TiledSimilarityEngine. The float32 paths also
+            vectorize into float32
+        :type result_stream: SimilarityStream | None
+        :param result_stream: Gets the pairs above the threshold of each batch as soon as they are found, so they can
+            be shown in provisional groups while the calculation is still running
+        :type checkpoint_directory: Path | str | None
+        :param checkpoint_directory: Directory to store the pairs of each finished batch in. A calculation of the
+            same songs with the same settings continues after the last stored batch, with a similarity index only if
+            the index did not change in between. None does not store checkpoints
         """
         # Init parameters
-        self._similarities = {}
-        self._song_lookup = {}
-        self._songs = pd.DataFrame(columns=['name', 'text'])
+        self._similarities = []
+        self._similarity_scores = SimilarityPairs([], [], [], [])
+        self._all_similarity_scores = self._similarity_scores
+        self._score_histogram = np.zeros(histogram_bins, dtype=np.int64)
+        self._histogram_edges = np.linspace(0, 1, histogram_bins + 1)
+        self._exact_duplicate_groups = []
+        self._group_starts = np.zeros(0, dtype=np.int64)
+        self._group_sizes = np.zeros(0, dtype=np.int64)
+        self._names: list[str] = []
+        self._texts: list[str] = []
+        self._result_song_list: list[Song] = []
         # Get passed parameters
         self._song_list: LoadedSongs = song_list
-        self._progress_bar: ProgressBar = progress_bar
-        self._calculations_done_signal: Signal = calculations_done_signal
+        self._progress_callback: callable = progress_callback
+        self._done_callback: callable = done_callback
         self._cosine_threshold: float = similarity_threshold
+        self._score_floor: float = min(score_floor, similarity_threshold)
+        self._tile_size: int = tile_size
+        self._workers: int | None = workers
+        self._approximate: bool = approximate
+        self._lsh_bands: int = lsh_bands
+        self._lsh_rows: int = lsh_rows
+        self._similarity_index: SimilarityIndex | None = similarity_index
+        self._grouping: SimilarityGrouping = SimilarityGrouping(grouping_strategy)
+        self._numeric_path: str = numeric_path
+        self._vectorizer_backend: str = vectorizer
+        self._vectorizer: SongVectorizer = SongVectorizer(vectorizer,
+                                                          dtype=TiledSimilarityEngine.get_dtype(numeric_path))
+        self._pairs_found_callback: callable = pairs_found_callback
+        if instrumentation is None:
+            instrumentation = Instrumentation(enabled=False)
+        self._instrumentation: Instrumentation = instrumentation
+        self._memory_budget: float | None = memory_budget
+        self._pair_spill: PairSpill | None = None
+        self._result_stream: SimilarityStream | None = result_stream
+        self._checkpoint_directory: Path | str | None = checkpoint_directory
+        self._cancel_event: Event = Event()
 
         # Run calculations
-        finder_thread = Thread(target=self.run, name="Similarity Finder")
-        finder_thread.start()
+        if run_in_thread:
+            finder_thread = Thread(target=self.run, name="Similarity Finder")
+            finder_thread.start()
 
     def run(self):
-        """Start the calculations"""
-        if None is not self._progress_bar:
-            self._progress_bar.startTimer()
+        """Start the calculations
+        :return bool: Whether the calculations are done, False if they were cancelled"""
+        self._progress_tracker = ProgressTracker(self._get_stage_weights(),
+                                                 self._progress_callback or self._print_progress)
         # Prepare songs
-        self.__prepare_songs()
+        self._progress_tracker.start_stage('prepare', 1)
+        with self._instrumentation.stage('prepare') as counters:
+            self.__prepare_songs()
+            counters['songs'] = len(self._result_song_list)
+            counters['compared_songs'] = len(self._texts)
+        if self._result_stream is not None:
+            self._result_stream.start(self._result_song_list)
         # Do the actual calculations
-        self._collect_similarities()
+        if not self._collect_similarities():
+            return False
+        if self._result_stream is not None:
+            self._result_stream.finish()
 
         # Notify the user that all calculations have been done
-        if self._calculations_done_signal is not None:
-            self._calculations_done_signal.emit()
+        if self._done_callback is not None:
+            self._done_callback()
+        return True
+
+    def cancel(self):
+        """Stop the calculations after the current batch, finished batches stay in the checkpoint"""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        """Check if the calculations were cancelled
+        :return bool: Whether cancel was called"""
+        return self._cancel_event.is_set()
 
     def __prepare_songs(self):
         """Prepare all songs for calculation"""
-        # Init parameters
-        song_dict: dict = {'name': [], 'text': []}
-        # Get the texts from all songs
+        # Exact duplicates are similar anyway, only one song of each group has to be compared
+        self._exact_duplicate_groups = self._group_exact_duplicates(self._song_list)
+        # The songs of each group follow each other in the result song list
+        self._group_sizes = np.fromiter((len(song_group) for song_group in self._exact_duplicate_groups),
+                                        dtype=np.int64, count=len(self._exact_duplicate_groups))
+        self._group_starts = np.cumsum(self._group_sizes) - self._group_sizes
+        self._result_song_list = [song for song_group in self._exact_duplicate_groups for song in song_group]
+        # Get the texts from the first song of each group
+        song_group: list[Song]
+        self._names = [str(song_group[0]) for song_group in self._exact_duplicate_groups]
+        self._texts = [song_group[0].get_text_as_line() for song_group in self._exact_duplicate_groups]
+
+    @staticmethod
+    def _group_exact_duplicates(song_list):
+        """Group songs whose texts are identical, ignoring case and whitespace
+        :type song_list: Iterable[Song]
+        :param song_list: All songs to group
+        :return list[list[Song]]: All song groups, songs without duplicates are in a group of their own"""
+        group_dict: dict[bytes, list[Song]] = {}
+        group_list: list[list[Song]] = []
         song: Song
-        for song in self._song_list:
-            song_dict['name'].append(str(song))
-            song_dict['text'].append(song.get_text_as_line())
-            self._song_lookup[str(song)] = song
-        # Prepare songs with pandas
-        self._songs.name = pd.Series(song_dict['name'])
-        self._songs.text = pd.Series(song_dict['text'])
-
-    def __replace_indices(self, idx):
-        """Replace the indices in all songs
-        :type idx: int
-        :param idx: Indices to replace"""
-        return self._songs['name'].values[idx]
+        for song in song_list:
+            normalized_text: str = ' '.join(song.get_text_as_line().lower().split())
+            # Songs without text are never similar
+            if '' == normalized_text:
+                group_list.append([song])
+                continue
+            text_hash: bytes = hashlib.blake2b(normalized_text.encode(), digest_size=16).digest()
+            if text_hash in group_dict:
+                group_dict[text_hash].append(song)
+            else:
+                group_dict[text_hash] = [song]
+                group_list.append(group_dict[text_hash])
+        return group_list
+
+    def _expand_exact_duplicates(self, rows, cols, scores):
+        """Turn pairs of compared songs into pairs of all songs in their exact duplicate groups
+        :type rows: np.ndarray
+        :param rows: First compared song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second compared song index of each pair
+        :type scores: np.ndarray
+        :param scores: Similarity score of each pair
+        :return np.ndarray, np.ndarray, np.ndarray: Song indices in the result song list and scores of all pairs"""
+        row_sizes = self._group_sizes[rows]
+        col_sizes = self._group_sizes[cols]
+        # Most songs have no exact duplicates
+        if np.all(row_sizes == 1) and np.all(col_sizes == 1):
+            return self._group_starts[rows], self._group_starts[cols], scores
+        # Every song of one group is paired with every song of the other group
+        counts = row_sizes * col_sizes
+        pair_indices = np.repeat(np.arange(len(rows)), counts)
+        offsets = np.arange(len(pair_indices)) - np.repeat(np.cumsum(counts) - counts, counts)
+        pair_col_sizes = col_sizes[pair_indices]
+        return (self._group_starts[rows][pair_indices] + offsets // pair_col_sizes,
+                self._group_starts[cols][pair_indices] + offsets % pair_col_sizes,
+                scores[pair_indices])
+
+    def _iter_similarities(self, start_tile=0, checkpoint=None):
+        """Calculate all song pairs above the score floor with the configured engine
+        :type start_tile: int
+        :param start_tile: The first tile to calculate, earlier ones are skipped. Not used with a similarity index
+        :type checkpoint: SimilarityCheckpoint | None
+        :param checkpoint: The similarity index stores and resumes its tiles with it, as they depend on the index
+        :return Iterator[tuple[int, int, np.ndarray, np.ndarray, np.ndarray]]: For each tile the tiles number, the
+            total tile count, row song indices, column song indices and similarity scores"""
+        # Only score new or changed songs, with the same workers, memory budget and numeric path
+        if self._similarity_index is not None:
+            return self._similarity_index.iter_similarities(self._names, self._texts, self._score_floor,
+                                                            self._get_tiled_engine(), checkpoint)
+
+        # Transform song vectors
+        self._progress_tracker.start_stage('vectorize', 1)
+        with self._instrumentation.stage('vectorize') as counters:
+            tfidf_transform = self._vectorizer.fit_transform(self._texts)
+            counters['features'] = tfidf_transform.shape[1]
+
+        # Only calculate the lower triangle of the similarity matrix, tile by tile or for candidate pairs only
+        engine: TiledSimilarityEngine | LshSimilarityEngine
+        if self._approximate:
+            engine = LshSimilarityEngine(self._texts, self._lsh_bands, self._lsh_rows)
+        else:
+            engine = self._get_tiled_engine()
+        return engine.iter_similarities(tfidf_transform, self._score_floor, start_tile)
+
+    def _get_stage_weights(self):
+        """Get each stages share of the total calculation time for this calculation
+        :return dict[str, float]: The weight of each stage that runs, in order"""
+        if self._similarity_index is None:
+            return self._stage_weights
+        # The similarity index vectorizes while it is iterated, so that time is part of the similarities stage
+        stage_weights = {stage_name: weight for stage_name, weight in self._stage_weights.items()
+                         if 'vectorize' != stage_name}
+        stage_weights['similarities'] += self._stage_weights['vectorize']
+        return stage_weights
+
+    def _get_tiled_engine(self):
+        """Get the engine calculating all pairs tile by tile for the configured workers, memory budget and numeric
+        path
+        :return TiledSimilarityEngine: The engine"""
+        if self._memory_budget is not None and 1 == self._workers:
+            return OutOfCoreSimilarityEngine(self._memory_budget, numeric_path=self._numeric_path)
+        if self._memory_budget is not None:
+            # Workers share the memory mapped song vectors, but each one calculates its own tile
+            tile_size = OutOfCoreSimilarityEngine.get_tile_size(self._memory_budget, self._workers, self._numeric_path)
+            return ParallelSimilarityEngine(tile_size, self._workers, self._numeric_path)
+        if 1 == self._workers:
+            return TiledSimilarityEngine(self._tile_size, self._numeric_path)
+        return ParallelSimilarityEngine(self._tile_size, self._workers, self._numeric_path)
 
     def _collect_similarities(self):
-        """Calculate the similarities between all loaded songs"""
+        """Calculate the similarities between all loaded songs
+        :return bool: Whether the calculations are done, False if they were cancelled"""
         # Prepare for calculations
-        self._similarities = {}
+        self._similarities = []
+        self._score_histogram[:] = 0
+        pair_list: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        # Pairs of an earlier calculation are not needed anymore
+        self._close_pair_spill()
+        if self._memory_budget is not None:
+            self._pair_spill = PairSpill(len(self._result_song_list),
+                                         OutOfCoreSimilarityEngine.get_spill_pair_count(self._memory_budget))
 
-        # Transform song vectors
-        tfidf = TfidfVectorizer()
-        tfidf.fit(self._songs.text)
-        tfidf_transform = tfidf.transform(self._songs.text)
-
-        # Subdivide data into batches and process each batch
-        batch_size = 2048
-        total_batches = math.floor(tfidf_transform.shape[0] / batch_size)
-        batch_num = 0
-        processing_not_finished = True
-
-        collected_similarities = {}
-
-        # Run each bach
-        while processing_not_finished:
-            # Check if this is the last batch
-            start = batch_num * batch_size
-            end = start + batch_size
-            if end + 1 >= tfidf_transform.shape[0]:
-                end = tfidf_transform.shape[0] - 1
-                processing_not_finished = False
-
-            # Get cosine similarity between songs
-            song_vec = tfidf_transform[start:end]
-            similarities = cosine_similarity(tfidf_transform, song_vec)
-            # Only look at lower triangle of matrix
-            similarities = np.tril(similarities, -1)
-
-            if 0 < np.sum(similarities):
-                # Get song indices of matching songs
-                indices = np.argwhere(similarities > self._cosine_threshold)
-
-                # Add start value of batch to column ids for correct ids in dataframe
-                names = indices.copy()
-                names[:, 1] += batch_num * batch_size
-                names = self.__replace_indices(names)
-
-                # Create dict with matching songs
-                for i in range(len(names)):
-                    song_tuple = names[i]
-                    score_index = indices[i]
-                    similarity_score = similarities[score_index[0]][score_index[1]]
-                    #if not 0.999 > similarity_score:
-                    #    continue
-                    song_orig = self._song_lookup[song_tuple[0]]
-                    song_copy = self._song_lookup[song_tuple[1]]
-
-                    collected_similarities[(song_orig, song_copy)] = similarity_score
-
-            # Update progress if not finished
-            if processing_not_finished:
-                # Calculate progress
-                percentage_done = (batch_num + 1) / total_batches
-                percentage_done_nice = round(percentage_done * 100, 2)
-
-                # Command line output
-                if self._progress_bar is None:
-                    print(percentage_done_nice, '%')
-                # Gui progress bar
-                else:
-                    self._progress_bar.set_progress.emit(percentage_done_nice)
-            batch_num += 1
+        # Exact duplicates are known without any calculations, so they are reported before vectorizing
+        duplicate_group_count: int = 0
+        duplicate_pair_list: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        for group_start, group_size in zip(self._group_starts.tolist(), self._group_sizes.tolist()):
+            if 1 < group_size:
+                duplicate_group_count += 1
+                copies, originals = np.tril_indices(group_size, -1)
+                rows, cols, scores = group_start + copies, group_start + originals, np.ones(len(copies),
+                                                                                             dtype=np.float32)
+                self._keep_pairs(pair_list, rows, cols, scores)
+                self._score_histogram[-1] += len(copies)
+                duplicate_pair_list.append((rows, cols, scores))
+        # All exact duplicates are reported as the first batch
+        if duplicate_pair_list:
+            self._report_pairs(*(np.concatenate(pair_arrays) for pair_arrays in zip(*duplicate_pair_list)))
+        if self._progress_callback is None:
+            print(duplicate_group_count, "groups of exact duplicates found")
+
+        # Tiles of an interrupted calculation of the same songs are read instead of being calculated again
+        checkpoint: SimilarityCheckpoint | None = None
+        resumed_tile_count: int = 0
+        if self._checkpoint_directory is not None:
+            checkpoint = SimilarityCheckpoint(self._checkpoint_directory, self._get_checkpoint_key())
+        # The similarity index stores and resumes its own tiles
+        if checkpoint is not None and self._similarity_index is None:
+            resumed_tile_count = checkpoint.get_batch_count()
+            for rows, cols, scores in checkpoint.iter_batches(resumed_tile_count):
+                self._add_tile_pairs(pair_list, rows, cols, scores)
+            if 0 < resumed_tile_count and self._progress_callback is None:
+                print(resumed_tile_count, "tiles resumed from", self._checkpoint_directory)
+        if self.is_cancelled():
+            self._close_pair_spill()
+            return False
+
+        # Vectorizing happens before scoring, unless the similarity index does it on the fly
+        tile_iterator = self._iter_similarities(resumed_tile_count, checkpoint)
+        with self._instrumentation.stage('similarities', ('tiles', 'pairs')) as counters:
+            self._progress_tracker.start_stage('similarities', None)
+            for tile_num, tile_count, rows, cols, scores in tile_iterator:
+                counters['tiles'] = tile_count
+                if checkpoint is not None and self._similarity_index is None:
+                    checkpoint.save_batch(tile_num, rows, cols, scores)
+                self._add_tile_pairs(pair_list, rows, cols, scores)
+                self._progress_tracker.update(tile_num + 1, tile_count)
+                # Finished tiles are kept in the checkpoint, worker processes and temporary files are cleaned up
+                if self.is_cancelled():
+                    tile_iterator.close()
+                    self._close_pair_spill()
+                    return False
+
+            counters['pairs'] = sum(len(scores) for _, _, scores in pair_list)
 
         # Store similarities
-        groups = self._get_similarity_groups(collected_similarities)
-        self._similarities = groups
-        self._similarity_scores = collected_similarities
-
-        # Command line output
-        if self._progress_bar is None:
-            print("100 %")
-        # Gui progress bar
+        with self._instrumentation.stage('store') as counters:
+            if self._pair_spill is not None:
+                counters['pairs'] = self._pair_spill.pair_count
+                counters['spilled_runs'] = self._pair_spill.get_run_count()
+                self._all_similarity_scores = self._pair_spill.merge(self._result_song_list)
+            else:
+                rows = np.concatenate([rows for rows, _, _ in pair_list]) if pair_list else np.zeros(0, dtype=np.int64)
+                cols = np.concatenate([cols for _, cols, _ in pair_list]) if pair_list else np.zeros(0, dtype=np.int64)
+                scores = np.concatenate([scores for _, _, scores in pair_list]) if pair_list else \
+                    np.zeros(0, dtype=np.float32)
+                self._all_similarity_scores = SimilarityPairs(self._result_song_list, rows, cols, scores)
+        self._progress_tracker.start_stage('grouping', 1)
+        self._apply_threshold()
+        if checkpoint is not None:
+            checkpoint.remove()
+        self._progress_tracker.finish()
+        return True
+
+    def _close_pair_spill(self):
+        """Remove the pairs spilled to disk, if there are any"""
+        if self._pair_spill is not None:
+            self._pair_spill.close()
+            self._pair_spill = None
+
+    def _get_checkpoint_key(self):
+        """Get the key of checkpoints of this calculation, it changes with the songs and the settings
+        :return str: The checkpoint key"""
+        setting_list: list = [self._score_floor, self._vectorizer_backend, self._numeric_path, self._tile_size,
+                              self._approximate, self._lsh_bands, self._lsh_rows, self._memory_budget]
+        # With a memory budget, the tile size depends on the number of workers
+        if self._memory_budget is not None:
+            setting_list.append(self._workers)
+        part_list: list[str] = [repr(setting_list)]
+        for song_group, text in zip(self._exact_duplicate_groups, self._texts):
+            part_list.append(str(len(song_group)))
+            part_list.extend(str(song) for song in song_group)
+            part_list.append(text)
+        return SimilarityCheckpoint.get_key(part_list)
+
+    def _add_tile_pairs(self, pair_list, rows, cols, scores):
+        """Keep, count and report the pairs of one calculated tile
+        :type pair_list: list[tuple[np.ndarray, np.ndarray, np.ndarray]]
+        :param pair_list: The pairs kept in memory so far
+        :type rows: np.ndarray
+        :param rows: First compared song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second compared song index of each pair
+        :type scores: np.ndarray
+        :param scores: Similarity score of each pair"""
+        if 0 == len(scores):
+            return
+        # Exact duplicates share their similarities
+        rows, cols, scores = self._expand_exact_duplicates(rows, cols, scores)
+        self._keep_pairs(pair_list, rows, cols, scores.astype(np.float32))
+        self._score_histogram += np.histogram(scores, bins=self._histogram_edges)[0]
+        self._report_pairs(rows, cols, scores)
+
+    def _keep_pairs(self, pair_list, rows, cols, scores):
+        """Keep found pairs in memory, or on disk if there is a memory budget
+        :type pair_list: list[tuple[np.ndarray, np.ndarray, np.ndarray]]
+        :param pair_list: The pairs kept in memory so far
+        :type rows: np.ndarray
+        :param rows: First song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second song index of each pair
+        :type scores: np.ndarray
+        :param scores: Similarity score of each pair"""
+        if self._pair_spill is not None:
+            self._pair_spill.add(rows, cols, scores)
         else:
-            self._progress_bar.set_progress.emit(100)
+            pair_list.append((rows, cols, scores))
 
     @staticmethod
-    def _get_similarity_groups(similarity_pairs_list):
-        """Get all grouped similarities
-        :type similarity_pairs_list: dict[tuple[Song, Song], int]
-        :param similarity_pairs_list: All similarity pairs with songs as indexes
-        :return list[list[Song]]: All similarity groups with songs as indexes"""
-        graph = nx.Graph()
-        graph.add_edges_from(similarity_pairs_list.keys())
-        cliques = nx.find_cliques(graph)
-        groups = list(cliques)
-        return groups
+    def _print_progress(percentage_done, seconds_elapsed, seconds_remaining):
+        """Print the progress to the command line
+        :type percentage_done: float
+        :param percentage_done: The progress from 0 to 100
+        :type seconds_elapsed: float
+        :param seconds_elapsed: How long the calculation has been running
+        :type seconds_remaining: float | None
+        :param seconds_remaining: The estimated time until the calculation is done"""
+        if seconds_remaining is None:
+            print(percentage_done, '%')
+        else:
+            print(percentage_done, '%,', round(seconds_remaining), 's remaining')
+
+    def _report_pairs(self, rows, cols, scores):
+        """Pass newly found pairs above the threshold to the pairs found callback and the result stream
+        :type rows: np.ndarray
+        :param rows: First song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second song index of each pair
+        :type scores: np.ndarray
+        :param scores: Similarity score of each pair"""
+        if self._pairs_found_callback is None and self._result_stream is None:
+            return
+        above_threshold = scores > self._cosine_threshold
+        if not np.any(above_threshold):
+            return
+        rows, cols, scores = rows[above_threshold], cols[above_threshold], scores[above_threshold]
+        if self._pairs_found_callback is not None:
+            self._pairs_found_callback(self._result_song_list, rows, cols, scores)
+        if self._result_stream is not None:
+            self._result_stream.add_pairs(rows, cols, scores)
+
+    def _apply_threshold(self):
+        """Derive the similar pairs and groups for the current threshold from all pairs above the score floor"""
+        with self._instrumentation.stage('grouping') as counters:
+            self._similarity_scores = self._all_similarity_scores.with_threshold(self._cosine_threshold)
+            song_list: list[Song] = self._similarity_scores.get_song_list()
+            rows, cols, scores = self._similarity_scores.get_indices()
+            self._similarities = [[song_list[song_index] for song_index in group]
+                                  for group in self._grouping.get_groups(len(song_list), rows, cols, scores)]
+            counters['groups'] = len(self._similarities)
+
+    def set_threshold(self, similarity_threshold):
+        """Change what counts as "similar" without calculating the similarities again
+        :type similarity_threshold: float
+        :param similarity_threshold: The new threshold, it can not be below the score floor"""
+        if similarity_threshold < self._score_floor:
+            raise ValueError('The threshold can not be below the score floor of ' + str(self._score_floor))
+        self._cosine_threshold = similarity_threshold
+        self._apply_threshold()
+
+    def get_threshold(self):
+        """Get the current threshold of what counts as "similar"
+        :return float: The current threshold"""
+        return self._cosine_threshold
+
+    def get_score_floor(self):
+        """Get the lowest threshold the similarities can be shown for
+        :return float: The score floor"""
+        return self._score_floor
+
+    def get_score_histogram(self):
+        """Get how many song pairs have which similarity score, exact duplicates are in the last bin
+        :return np.ndarray, np.ndarray: The pair count of each bin and the bin edges"""
+        return self._score_histogram, self._histogram_edges
+
+    def get_song_list(self):
+        """Get all compared songs, pair indices refer to this list
+        :return list[Song]: All songs, exact duplicates next to each other"""
+        return self._result_song_list
+
+    def get_exact_duplicates(self):
+        """Get all groups of songs with identical texts
+        :return list[list[Song]]: All groups of exact duplicates"""
+        return [song_group for song_group in self._exact_duplicate_groups if 1 < len(song_group)]
 
     def get_similarities(self):
         """Get a list of all calculated similarities
-        :return list[list[Song]], dict[tuple[Song, Song], int]: All calculated similarities"""
+        :return list[list[Song]], SimilarityPairs: All similarity groups and the scores of all similar song pairs"""
         return self._similarities, self._similarity_scores
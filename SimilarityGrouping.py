@@ -0,0 +1,172 @@
+import timeit
+
+import networkx as nx
+import numpy as np
+
+
+class SimilarityGrouping:
+    """Available grouping strategies"""
+    COMPONENTS = 'components'
+    GREEDY = 'greedy'
+    CLIQUES = 'cliques'
+    """Did the last clique grouping run out of budget for at least one cluster?"""
+    budget_exceeded: bool
+
+    def __init__(self, strategy=CLIQUES, max_group_size=50, max_component_size=40, time_budget=10.0):
+        """Group similar songs by their song indices
+        :type strategy: str
+        :param strategy: COMPONENTS puts all connected songs into one group, GREEDY covers all songs with capped
+            cliques and CLIQUES finds all maximal cliques within the budget
+        :type max_group_size: int
+        :param max_group_size: The maximum size of greedy groups
+        :type max_component_size: int
+        :param max_component_size: Clusters with more songs are grouped greedily instead of finding all cliques
+        :type time_budget: float
+        :param time_budget: Seconds clique finding may take, remaining clusters are grouped greedily"""
+        if strategy not in (self.COMPONENTS, self.GREEDY, self.CLIQUES):
+            raise ValueError('Unknown grouping strategy ' + str(strategy))
+        self._strategy: str = strategy
+        self._max_group_size: int = max(2, max_group_size)
+        self._max_component_size: int = max_component_size
+        self._time_budget: float = time_budget
+        self.budget_exceeded = False
+
+    def get_groups(self, song_count, rows, cols, scores=None):
+        """Group all songs connected by a similarity pair
+        :type song_count: int
+        :param song_count: How many songs there are
+        :type rows: np.ndarray
+        :param rows: First song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second song index of each pair
+        :type scores: np.ndarray | None
+        :param scores: Similarity score of each pair, greedy groups prefer higher scores
+        :return list[list[int]]: All groups of song indices"""
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        if scores is None:
+            scores = np.ones(len(rows))
+        self.budget_exceeded = False
+        if self.COMPONENTS == self._strategy:
+            return self._get_components(song_count, rows, cols)
+        elif self.GREEDY == self._strategy:
+            return self._get_greedy_groups(rows, cols, scores)
+        else:
+            return self._get_cliques(song_count, rows, cols, scores)
+
+    @staticmethod
+    def _get_components(song_count, rows, cols):
+        """Find connected songs with an array based union-find
+        :type song_count: int
+        :param song_count: How many songs there are
+        :type rows: np.ndarray
+        :param rows: First song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second song index of each pair
+        :return list[list[int]]: All groups of connected song indices"""
+        parent: list[int] = list(range(song_count))
+
+        def find(song_index):
+            # Path halving keeps the trees flat
+            while parent[song_index] != song_index:
+                parent[song_index] = parent[parent[song_index]]
+                song_index = parent[song_index]
+            return song_index
+
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            row_root = find(row)
+            col_root = find(col)
+            if row_root != col_root:
+                parent[max(row_root, col_root)] = min(row_root, col_root)
+
+        # Collect the songs of each component, songs without pairs are left out
+        group_dict: dict[int, list[int]] = {}
+        for song_index in np.unique(np.concatenate((rows, cols))).tolist():
+            group_dict.setdefault(find(song_index), []).append(song_index)
+        return list(group_dict.values())
+
+    def _get_greedy_groups(self, rows, cols, scores):
+        """Cover all songs with cliques of limited size. Each song is put into one group only
+        :type rows: np.ndarray
+        :param rows: First song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second song index of each pair
+        :type scores: np.ndarray
+        :param scores: Similarity score of each pair
+        :return list[list[int]]: All groups of song indices"""
+        # Neighbours of each song, most similar first
+        neighbour_dict: dict[int, list[int]] = {}
+        for pair_index in np.argsort(-scores, kind='stable').tolist():
+            row = int(rows[pair_index])
+            col = int(cols[pair_index])
+            neighbour_dict.setdefault(row, []).append(col)
+            neighbour_dict.setdefault(col, []).append(row)
+        neighbour_set_dict: dict[int, set[int]] = {song_index: set(neighbour_list)
+                                                   for song_index, neighbour_list in neighbour_dict.items()}
+
+        groups: list[list[int]] = []
+        grouped_set: set[int] = set()
+        # Start with the best connected songs
+        for song_index in sorted(neighbour_dict, key=lambda index: -len(neighbour_dict[index])):
+            if song_index in grouped_set:
+                continue
+            group: list[int] = [song_index]
+            for neighbour in neighbour_dict[song_index]:
+                if len(group) >= self._max_group_size:
+                    break
+                if neighbour in grouped_set:
+                    continue
+                # Only add songs similar to every song in the group
+                if all(member in neighbour_set_dict[neighbour] for member in group):
+                    group.append(neighbour)
+            grouped_set.update(group)
+            if 1 < len(group):
+                groups.append(group)
+        return groups
+
+    def _get_cliques(self, song_count, rows, cols, scores):
+        """Find all maximal cliques per cluster of connected songs. Clusters that are too large or exceed the time
+        budget are grouped greedily instead
+        :type song_count: int
+        :param song_count: How many songs there are
+        :type rows: np.ndarray
+        :param rows: First song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second song index of each pair
+        :type scores: np.ndarray
+        :param scores: Similarity score of each pair
+        :return list[list[int]]: All groups of song indices"""
+        timer_start: float = timeit.default_timer()
+        groups: list[list[int]] = []
+        # Find the cluster each pair belongs to
+        component_dict: dict[int, int] = {}
+        for component_num, component in enumerate(self._get_components(song_count, rows, cols)):
+            for song_index in component:
+                component_dict[song_index] = component_num
+        pair_components = np.array([component_dict[row] for row in rows.tolist()], dtype=np.int64)
+
+        order = np.argsort(pair_components, kind='stable')
+        bounds = np.flatnonzero(np.diff(np.concatenate(([-1], pair_components[order], [-1]))))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            pair_indices = order[start:end]
+            component_rows = rows[pair_indices]
+            component_cols = cols[pair_indices]
+            component_size: int = len(np.unique(np.concatenate((component_rows, component_cols))))
+            within_budget: bool = (component_size <= self._max_component_size and
+                                   timeit.default_timer() - timer_start < self._time_budget)
+            if within_budget:
+                graph = nx.Graph()
+                graph.add_edges_from(zip(component_rows.tolist(), component_cols.tolist()))
+                cliques: list[list[int]] = []
+                for clique in nx.find_cliques(graph):
+                    cliques.append(clique)
+                    if timeit.default_timer() - timer_start >= self._time_budget:
+                        within_budget = False
+                        break
+                if within_budget:
+                    groups.extend(cliques)
+                    continue
+            # Fall back to capped greedy groups for this cluster
+            self.budget_exceeded = True
+            groups.extend(self._get_greedy_groups(component_rows, component_cols, scores[pair_indices]))
+        return groups
@@ -0,0 +1,78 @@
+import traceback
+from threading import Thread, Lock
+
+
+class SimilarityJob:
+    def __init__(self, cancelled_callback=None, failed_callback=None):
+        """Runs one similarity calculation at a time in a background thread, so it can be cancelled and a second
+        calculation cannot start while the first one is still running
+        :type cancelled_callback: callable | None
+        :param cancelled_callback: Called without arguments from the calculating thread once a cancelled calculation
+            has stopped
+        :type failed_callback: callable | None
+        :param failed_callback: Called with the error message from the calculating thread if a calculation raised an
+            error"""
+        self._cancelled_callback: callable = cancelled_callback
+        self._failed_callback: callable = failed_callback
+        self._lock: Lock = Lock()
+        self._similarity_finder: SimilarityFinder | None = None
+        self._thread: Thread | None = None
+
+    def start(self, similarity_finder):
+        """Start a calculation, unless one is already running
+        :type similarity_finder: SimilarityFinder
+        :param similarity_finder: The calculation, created with run_in_thread=False
+        :return bool: Whether the calculation was started"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._similarity_finder = similarity_finder
+            self._thread = Thread(target=self._run, args=(similarity_finder,), name="Similarity Finder", daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self, similarity_finder):
+        """Run a calculation in the background thread
+        :type similarity_finder: SimilarityFinder
+        :param similarity_finder: The calculation"""
+        try:
+            is_done: bool = similarity_finder.run()
+        except Exception as error:
+            # Nobody would notice the thread ending otherwise
+            traceback.print_exc()
+            if self._failed_callback is not None:
+                self._failed_callback(str(error) or type(error).__name__)
+            return
+        finally:
+            with self._lock:
+                self._similarity_finder = None
+        if not is_done and self._cancelled_callback is not None:
+            self._cancelled_callback()
+
+    def cancel(self):
+        """Stop the running calculation after its current batch, it returns without calling its done callback
+        :return bool: Whether a calculation was running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                return False
+            if self._similarity_finder is not None:
+                self._similarity_finder.cancel()
+        return True
+
+    def is_running(self):
+        """Check if a calculation is running
+        :return bool: Whether a calculation is running"""
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        """Wait for the running calculation to stop
+        :type timeout: float | None
+        :param timeout: Seconds to wait at most, None waits until it stopped
+        :return bool: Whether no calculation is running anymore"""
+        with self._lock:
+            thread: Thread | None = self._thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
@@ -0,0 +1,150 @@
+import numpy as np
+
+from Song import Song
+
+
+class SimilarityPairs:
+    def __init__(self, song_list, rows, cols, scores):
+        """Compact list of similar song pairs, songs are referenced by their index in the song list
+        :type song_list: list[Song]
+        :param song_list: All songs the indices refer to
+        :type rows: np.ndarray
+        :param rows: First song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second song index of each pair
+        :type scores: np.ndarray
+        :param scores: Similarity score of each pair"""
+        self._song_list: list[Song] = song_list
+        self._song_index_dict: dict[Song, int] | None = None
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+        # Store each pair with the higher index first and sorted, so pairs can be looked up with a binary search
+        self._pair_keys = np.maximum(rows, cols) * max(1, len(song_list)) + np.minimum(rows, cols)
+        order = np.argsort(self._pair_keys, kind='stable')
+        self._pair_keys = self._pair_keys[order]
+        self._rows = np.maximum(rows, cols)[order].astype(np.int32)
+        self._cols = np.minimum(rows, cols)[order].astype(np.int32)
+        self._scores = np.asarray(scores, dtype=np.float32)[order]
+        # Pairs ordered by their second song or their score, only sorted when needed
+        self._col_order: np.ndarray | None = None
+        self._score_order: np.ndarray | None = None
+
+    @classmethod
+    def from_sorted(cls, song_list, pair_keys, rows, cols, scores):
+        """Use pairs that are already stored the way SimilarityPairs stores them, without copying them. This allows
+        memory mapped arrays
+        :type song_list: list[Song]
+        :param song_list: All songs the indices refer to
+        :type pair_keys: np.ndarray
+        :param pair_keys: Ascending key of each pair, the higher song index times the song count plus the lower one
+        :type rows: np.ndarray
+        :param rows: Higher song index of each pair, as int32
+        :type cols: np.ndarray
+        :param cols: Lower song index of each pair, as int32
+        :type scores: np.ndarray
+        :param scores: Similarity score of each pair, as float32
+        :return SimilarityPairs: The pairs"""
+        similarity_pairs = cls.__new__(cls)
+        similarity_pairs._song_list = song_list
+        similarity_pairs._song_index_dict = None
+        similarity_pairs._pair_keys = pair_keys
+        similarity_pairs._rows = rows
+        similarity_pairs._cols = cols
+        similarity_pairs._scores = scores
+        similarity_pairs._col_order = None
+        similarity_pairs._score_order = None
+        return similarity_pairs
+
+    def __len__(self):
+        return len(self._scores)
+
+    def get_song_list(self):
+        """Get all songs the pair indices refer to
+        :return list[Song]: All songs"""
+        return self._song_list
+
+    def get_indices(self):
+        """Get the raw pair arrays
+        :return np.ndarray, np.ndarray, np.ndarray: First and second song index and similarity score of each pair"""
+        return self._rows, self._cols, self._scores
+
+    def get_song_index(self, song):
+        """Get the index of a song
+        :type song: Song
+        :param song: The song to look up
+        :return int | None: The songs index, None if it is not part of any pair list"""
+        if self._song_index_dict is None:
+            self._song_index_dict = {song: song_index for song_index, song in enumerate(self._song_list)}
+        return self._song_index_dict.get(song)
+
+    def get_score(self, song_a, song_b):
+        """Get the similarity score of two songs
+        :type song_a: Song
+        :param song_a: The first song
+        :type song_b: Song
+        :param song_b: The second song
+        :return float | None: The similarity score, None if the songs are not a similar pair"""
+        index_a = self.get_song_index(song_a)
+        index_b = self.get_song_index(song_b)
+        if index_a is None or index_b is None:
+            return None
+        pair_key = max(index_a, index_b) * max(1, len(self._song_list)) + min(index_a, index_b)
+        position = int(np.searchsorted(self._pair_keys, pair_key))
+        if position < len(self._pair_keys) and self._pair_keys[position] == pair_key:
+            return float(self._scores[position])
+        return None
+
+    def get_pairs_of_song(self, song):
+        """Get all songs similar to the given song
+        :type song: Song
+        :param song: The song to get the similar songs of
+        :return list[tuple[Song, float]]: Each similar song with its similarity score, most similar first"""
+        song_index = self.get_song_index(song)
+        if song_index is None:
+            return []
+        # Pairs where the song comes first are a continuous range, as are pairs where it comes second
+        row_start, row_end = np.searchsorted(self._rows, [song_index, song_index + 1])
+        if self._col_order is None:
+            self._col_order = np.argsort(self._cols, kind='stable')
+        col_start, col_end = np.searchsorted(self._cols[self._col_order], [song_index, song_index + 1])
+        col_positions = self._col_order[col_start:col_end]
+        other_indices = np.concatenate((self._cols[row_start:row_end], self._rows[col_positions]))
+        other_scores = np.concatenate((self._scores[row_start:row_end], self._scores[col_positions]))
+        order = np.argsort(-other_scores, kind='stable')
+        return [(self._song_list[other_index], float(score))
+                for other_index, score in zip(other_indices[order].tolist(), other_scores[order].tolist())]
+
+    def _get_score_order(self):
+        """Get the pair positions ordered by descending score
+        :return np.ndarray: Pair positions, most similar first"""
+        if self._score_order is None:
+            self._score_order = np.argsort(-self._scores, kind='stable')
+        return self._score_order
+
+    def count_above(self, threshold):
+        """Count the pairs that are more similar than the threshold
+        :type threshold: float
+        :param threshold: The threshold of what counts as "similar"
+        :return int: The number of pairs above the threshold"""
+        descending_scores = self._scores[self._get_score_order()]
+        return int(np.searchsorted(-descending_scores, -np.float32(threshold), side='left'))
+
+    def with_threshold(self, threshold):
+        """Get only the pairs that are more similar than a threshold
+        :type threshold: float
+        :param threshold: The threshold of what counts as "similar"
+        :return SimilarityPairs: The pairs above the threshold, referring to the same song list"""
+        # Keep the pair key order, so the new pairs are already sorted
+        positions = np.flatnonzero(self._scores > np.float32(threshold))
+        return SimilarityPairs.from_sorted(self._song_list, self._pair_keys[positions], self._rows[positions],
+                                           self._cols[positions], self._scores[positions])
+
+    def iter_sorted(self, descending=True):
+        """Iterate over all pairs ordered by their similarity score, songs are only looked up when needed
+        :type descending: bool
+        :param descending: Whether the most similar pairs come first
+        :return Iterator[tuple[Song, Song, float]]: Both songs and the similarity score of each pair"""
+        order = self._get_score_order() if descending else np.argsort(self._scores, kind='stable')
+        for position in order.tolist():
+            yield (self._song_list[self._rows[position]], self._song_list[self._cols[position]],
+                   float(self._scores[position]))
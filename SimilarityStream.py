@@ -0,0 +1,136 @@
+from threading import Lock
+
+import numpy as np
+
+from SimilarityPairs import SimilarityPairs
+from Song import Song
+
+
+class SimilarityStream:
+    def __init__(self, batch_callback=None):
+        """Thread safe stream of the similar pairs a calculation found so far. Connected songs are merged into
+        provisional groups while the pairs arrive, so they can be shown before the final grouping is done
+        :type batch_callback: callable | None
+        :param batch_callback: Called without arguments from the calculating thread after each batch of pairs"""
+        self._batch_callback: callable = batch_callback
+        self._lock: Lock = Lock()
+        self._song_list: list[Song] = []
+        self._finished: bool = False
+        # Streamed pairs, they are only joined when the scores are requested
+        self._pair_list: list[tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._pair_count: int = 0
+        self._similarity_scores: SimilarityPairs | None = None
+        # Union-find over the song indices, with the song indices of each group with more than one song by its root
+        self._parent: dict[int, int] = {}
+        self._member_dict: dict[int, list[int]] = {}
+        # Groups that changed or were merged into others since the last update was taken
+        self._changed_root_set: set[int] = set()
+        self._removed_root_set: set[int] = set()
+
+    def start(self, song_list):
+        """Start a new calculation, all earlier pairs and groups are dropped
+        :type song_list: list[Song]
+        :param song_list: All songs the pair indices refer to"""
+        with self._lock:
+            self._song_list = song_list
+            self._finished = False
+            self._pair_list = []
+            self._pair_count = 0
+            self._similarity_scores = None
+            self._removed_root_set.update(self._member_dict.keys())
+            self._parent = {}
+            self._member_dict = {}
+            self._changed_root_set = set()
+
+    def _find(self, song_index):
+        """Find the root of a songs group
+        :type song_index: int
+        :param song_index: The songs index
+        :return int: The index of the groups root song"""
+        parent: dict[int, int] = self._parent
+        # Only songs that were merged into another group have a parent, path halving keeps the trees flat
+        while song_index in parent:
+            grandparent: int | None = parent.get(parent[song_index])
+            if grandparent is not None:
+                parent[song_index] = grandparent
+            song_index = parent[song_index]
+        return song_index
+
+    def add_pairs(self, rows, cols, scores):
+        """Publish a batch of similar pairs and merge their songs into the provisional groups
+        :type rows: np.ndarray
+        :param rows: First song index of each pair
+        :type cols: np.ndarray
+        :param cols: Second song index of each pair
+        :type scores: np.ndarray
+        :param scores: Similarity score of each pair"""
+        if 0 == len(scores):
+            return
+        with self._lock:
+            self._pair_list.append((np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64),
+                                    np.asarray(scores, dtype=np.float32)))
+            self._pair_count += len(scores)
+            self._similarity_scores = None
+            for row, col in zip(rows.tolist(), cols.tolist()):
+                row_root: int = self._find(row)
+                col_root: int = self._find(col)
+                if row_root == col_root:
+                    continue
+                row_members: list[int] = self._member_dict.pop(row_root, None) or [row_root]
+                col_members: list[int] = self._member_dict.pop(col_root, None) or [col_root]
+                # The smaller group is merged into the larger one
+                if len(row_members) < len(col_members):
+                    row_root, col_root = col_root, row_root
+                    row_members, col_members = col_members, row_members
+                self._parent[col_root] = row_root
+                row_members.extend(col_members)
+                self._member_dict[row_root] = row_members
+                self._changed_root_set.add(row_root)
+                self._changed_root_set.discard(col_root)
+                self._removed_root_set.add(col_root)
+        if self._batch_callback is not None:
+            self._batch_callback()
+
+    def finish(self):
+        """All pairs were published"""
+        with self._lock:
+            self._finished = True
+        if self._batch_callback is not None:
+            self._batch_callback()
+
+    def is_finished(self):
+        """Check if all pairs were published
+        :return bool: Whether the calculation is done"""
+        return self._finished
+
+    def get_pair_count(self):
+        """Get how many pairs were published so far
+        :return int: The number of pairs"""
+        return self._pair_count
+
+    def get_update(self):
+        """Take the changes of the provisional groups since the last call
+        :return list[int], dict[int, list[Song]]: The ids of groups that were merged into others or dropped and the
+            songs of each new or changed group by its id"""
+        with self._lock:
+            removed_group_ids: list[int] = list(self._removed_root_set)
+            changed_group_dict: dict[int, list[Song]] = {
+                root: [self._song_list[song_index] for song_index in self._member_dict[root]]
+                for root in self._changed_root_set}
+            self._removed_root_set = set()
+            self._changed_root_set = set()
+        return removed_group_ids, changed_group_dict
+
+    def get_similarity_scores(self):
+        """Get the scores of all pairs published so far
+        :return SimilarityPairs: The similarity scores for each song pair"""
+        with self._lock:
+            if self._similarity_scores is None:
+                if self._pair_list:
+                    # Join the batches once, so later calls only have to join the new ones
+                    self._pair_list = [tuple(np.concatenate(pair_arrays) for pair_arrays in zip(*self._pair_list))]
+                    rows, cols, scores = self._pair_list[0]
+                else:
+                    rows, cols, scores = [], [], []
+                self._similarity_scores = SimilarityPairs(self._song_list, rows, cols, scores)
+            return self._similarity_scores
@@ -1,12 +1,16 @@
-import os
+import itertools
 import re
+from array import array
 from pathlib import Path
+from threading import Lock
 
 from SongLine import SongLine
 from Subscribable import Subscribable
 
 
 class Song(Subscribable):
+    __slots__ = ('id', 'valid', '_song_file', '_text', '_text_as_line', '_line_offsets', '_marked_for_deleting',
+                 '_marked_for_keeping', '_subscriptions', '__weakref__')
     supported_verse_heading_list = ["Unbekannt", "Unbenannt", "Unknown",
                                     "Intro", "Vers", "Verse", "Strophe",
                                     "Pre-Bridge", "Bridge", "Misc",
@@ -15,48 +19,82 @@ class Song(Subscribable):
                                     "Instrumental", "Interlude", "Coda",
                                     "Ending", "Outro", "Teil", "Part", "Chor",
                                     "Solo"]
+    """Version of the song line extraction, increase it whenever _read_lines extracts different lines, so cached
+    song lines are extracted again"""
+    parser_version = 1
     """Available subscription types"""
     DELETED = 1
     UPDATED = 2
     """This songs file"""
     _song_file: Path
     """Id to uniquely identify each song"""
-    next_id = 0
+    id: int
+    """Hands out the song ids"""
+    _id_counter = itertools.count()
+    _id_lock = Lock()
+    """All song lines joined by line breaks"""
+    _text: str
+    """The songs text as one line, None until it is first requested"""
+    _text_as_line: str | None
+    """Where each song line starts in the songs text"""
+    _line_offsets: array
     """Should this song be deleted?"""
-    _marked_for_deleting: bool = False
+    _marked_for_deleting: bool
     """Should this song be kept?"""
-    _marked_for_keeping: bool = False
+    _marked_for_keeping: bool
 
-    def __init__(self, song_file):
+    def __init__(self, song_file, song_text_list=None):
         """Extract a song from the given file
         :type song_file: Path
-        :param song_file: Path to the file to extract from"""
+        :param song_file: Path to the file to extract from
+        :type song_text_list: list[str] | None
+        :param song_text_list: Already extracted song lines, the file won't be read again if this is given"""
         # Set unique id
-        self.id = self.next_id
-        Song.next_id += 1
+        with Song._id_lock:
+            self.id = next(Song._id_counter)
         # Register subscriptions
         super().__init__((self.DELETED, self.UPDATED))
         # Setup song
         self.valid = False
         self._song_file = song_file
-        self._song_line_list = []
+        self._text = ''
+        self._text_as_line = None
+        self._line_offsets = array('I')
+        self._marked_for_deleting = False
+        self._marked_for_keeping = False
+        # Use already extracted song lines if available
+        if song_text_list is not None:
+            self._add_lines(song_text_list)
+            self.valid = True
+            return
         # Read file line by line and convert them into song lines
         try:
-            with open(song_file, encoding='UTF-8') as file:
-                content = file.readlines()
-            self._read_lines(content)
+            self._add_lines(self.read_song_file(song_file))
             # After
             self.valid = True
         except (UnicodeDecodeError, FileNotFoundError):
             print("Error reading file", song_file)
 
+    @classmethod
+    def read_song_file(cls, song_file):
+        """Read a song file and extract its song lines without creating a song object
+        :type song_file: Path
+        :param song_file: Path to the file to extract from
+        :return list[str]: The extracted song lines
+        :raises UnicodeDecodeError, FileNotFoundError"""
+        with open(song_file, encoding='UTF-8') as file:
+            content = file.readlines()
+        return cls._read_lines(content)
+
     def unload(self):
         """Unload this song from the program"""
         # Trigger subscriptions
         self._trigger_subscriptions(self.DELETED, song=self)
         # Unload this song
         self.valid = False
-        self._song_line_list = []
+        self._text = ''
+        self._text_as_line = None
+        self._line_offsets = array('I')
         self._song_file = Path()
         self.id = -1
 
@@ -90,10 +128,37 @@ class Song(Subscribable):
             # Unload self from program
             self.unload()
 
-    def _read_lines(self, content):
+    def _add_lines(self, song_text_list):
+        """Store extracted song lines in this songs text buffer
+        :type song_text_list: list[str]
+        :param song_text_list: The extracted song lines"""
+        self._text = '\n'.join(song_text_list)
+        self._text_as_line = None
+        # Remember where each line starts
+        line_offsets = array('I')
+        offset: int = 0
+        for line in song_text_list:
+            line_offsets.append(offset)
+            offset += len(line) + 1
+        self._line_offsets = line_offsets
+
+    def get_line_text(self, line_index):
+        """Get the text of a single song line
+        :type line_index: int
+        :param line_index: The lines position in this song
+        :return str: The lines text"""
+        start: int = self._line_offsets[line_index]
+        if line_index + 1 < len(self._line_offsets):
+            return self._text[start:self._line_offsets[line_index + 1] - 1]
+        return self._text[start:]
+
+    @classmethod
+    def _read_lines(cls, content):
         """Parse the given song file content into valid song lines
         :type content: list[str]
-        :param content: All lines of a song file"""
+        :param content: All lines of a song file
+        :return list[str]: The extracted song lines"""
+        song_text_list = []
         header_has_ended = False
         verse_ended_in_last_line = False
 
@@ -133,7 +198,7 @@ class Song(Subscribable):
                     else:
                         heading_number = ""
 
-                    if ((verse_heading in self.supported_verse_heading_list and
+                    if ((verse_heading in cls.supported_verse_heading_list and
                          ("" == heading_number or re.search("^[0-9][0-9]?[a-z]?$", heading_number))) or
                             (("Part" == verse_heading or "Teil" == verse_heading) and
                              re.search("^[A-Z]$", heading_number))):
@@ -148,10 +213,11 @@ class Song(Subscribable):
 
             # Check if the line has passed all tests and can be converted to a song line
             if line_is_song_text:
-                self._song_line_list.append(SongLine(line, self))
+                song_text_list.append(line)
 
             # Reset variables
             verse_ended_in_last_line = False
+        return song_text_list
 
     def get_line_list(self):
         """Get the list of all song lines
@@ -159,7 +225,7 @@ class Song(Subscribable):
         :raises ReferenceError"""
         if not self.valid:
             raise ReferenceError('Song is not valid')
-        return self._song_line_list
+        return [SongLine(self, line_index) for line_index in range(len(self._line_offsets))]
 
     def get_text(self):
         """Get the songs text as a multiline text
@@ -167,7 +233,7 @@ class Song(Subscribable):
         :raises ReferenceError"""
         if not self.valid:
             raise ReferenceError('Song is not valid')
-        return '\n'.join(str(line) for line in self._song_line_list)
+        return self._text
 
     def get_text_as_line(self):
         """Get the songs text as one line
@@ -175,7 +241,10 @@ class Song(Subscribable):
         :raises ReferenceError"""
         if not self.valid:
             raise ReferenceError('Song is not valid')
-        return ' '.join(str(line) for line in self._song_line_list)
+        # Only build the line once, it is requested for every similarity calculation
+        if self._text_as_line is None:
+            self._text_as_line = self._text.replace('\n', ' ')
+        return self._text_as_line
 
     def get_name(self):
         """Get the songs name
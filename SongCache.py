@@ -0,0 +1,153 @@
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+
+from Song import Song
+
+
+class SongCache:
+    """The cache files name inside a song library"""
+    default_file_name = '.songcache.sqlite'
+    """Song lines are stored joined by this separator, song lines never contain it"""
+    _line_separator = '\n'
+    """Version of the cache table, increase it whenever the stored columns change"""
+    _schema_version = 2
+
+    def __init__(self, cache_file, verify_hash=False):
+        """Persistent cache of extracted song lines, validated by file size and modification time
+        :type cache_file: Path
+        :param cache_file: The sqlite file to store the cache in
+        :type verify_hash: bool
+        :param verify_hash: Also compare the song files content hash. This still reads, but doesn't parse the files"""
+        self._cache_file: Path = Path(cache_file)
+        self._verify_hash: bool = verify_hash
+        self._connection = None
+
+    def _get_connection(self):
+        """Open the cache database if necessary
+        :return sqlite3.Connection | None: The open database connection, None if the cache is not available"""
+        if self._connection is None:
+            try:
+                self._connection = sqlite3.connect(self._cache_file)
+                # Entries of an older table layout or song line extraction are extracted again
+                version: int = self._schema_version << 16 | Song.parser_version
+                with self._connection:
+                    if self._connection.execute('PRAGMA user_version').fetchone()[0] != version:
+                        self._connection.execute('DROP TABLE IF EXISTS songs')
+                        self._connection.execute('PRAGMA user_version = ' + str(version))
+                    self._connection.execute('CREATE TABLE IF NOT EXISTS songs (path TEXT PRIMARY KEY, '
+                                             'size INTEGER, mtime_ns INTEGER, content_hash TEXT, lines TEXT)')
+                    # Song files of the current request, so only their entries are read
+                    self._connection.execute('CREATE TEMP TABLE IF NOT EXISTS requested (path TEXT PRIMARY KEY)')
+            except sqlite3.Error as error:
+                print("Song cache not available", self._cache_file, error)
+                self._connection = None
+        return self._connection
+
+    @staticmethod
+    def _get_key(song_file):
+        """Get the key a song file is stored under
+        :type song_file: Path
+        :param song_file: The song file
+        :return str: The song files key"""
+        return str(Path(song_file).absolute())
+
+    @staticmethod
+    def _get_content_hash(song_file):
+        """Hash a song files content
+        :type song_file: Path
+        :param song_file: The song file to hash
+        :return str: The content hash"""
+        with open(song_file, 'rb') as file:
+            return hashlib.sha1(file.read()).hexdigest()
+
+    @staticmethod
+    def _set_requested(connection, key_list):
+        """Fill the temporary table of requested song files
+        :type connection: sqlite3.Connection
+        :param connection: The open database connection
+        :type key_list: list[str]
+        :param key_list: The keys of the requested song files"""
+        connection.execute('DELETE FROM requested')
+        connection.executemany('INSERT OR IGNORE INTO requested VALUES (?)', ((key,) for key in key_list))
+
+    def get_many(self, song_file_list):
+        """Get the cached song lines of all unchanged song files
+        :type song_file_list: list[Path]
+        :param song_file_list: The song files to look up
+        :return dict[Path, list[str]]: The song lines of each song file found in the cache"""
+        connection = self._get_connection()
+        if connection is None:
+            return {}
+        # Load all requested entries at once, this is a lot faster than a query per song file
+        key_list: list[str] = [self._get_key(song_file) for song_file in song_file_list]
+        try:
+            with connection:
+                self._set_requested(connection, key_list)
+                entry_dict = {row[0]: row[1:] for row in connection.execute(
+                    'SELECT path, size, mtime_ns, content_hash, lines FROM songs JOIN requested USING (path)')}
+        except sqlite3.Error as error:
+            print("Error reading song cache", self._cache_file, error)
+            return {}
+
+        song_text_list_dict = {}
+        for song_file, key in zip(song_file_list, key_list):
+            entry = entry_dict.get(key)
+            if entry is None:
+                continue
+            size, mtime_ns, content_hash, lines = entry
+            # Make sure the song file hasn't changed since it was cached
+            try:
+                file_stat = os.stat(song_file)
+                if file_stat.st_size != size or file_stat.st_mtime_ns != mtime_ns:
+                    continue
+                if self._verify_hash and self._get_content_hash(song_file) != content_hash:
+                    continue
+            except OSError:
+                continue
+            song_text_list_dict[song_file] = lines.split(self._line_separator) if '' != lines else []
+        return song_text_list_dict
+
+    def put_many(self, song_text_list_list):
+        """Store the extracted song lines of song files
+        :type song_text_list_list: list[tuple[Path, list[str], os.stat_result]]
+        :param song_text_list_list: Each song file with its extracted song lines and its stat taken before it was read,
+            so a file edited in the meantime doesn't match its entry anymore"""
+        connection = self._get_connection()
+        if connection is None:
+            return
+        row_list = []
+        for song_file, song_text_list, file_stat in song_text_list_list:
+            try:
+                content_hash = self._get_content_hash(song_file) if self._verify_hash else None
+            except OSError:
+                continue
+            row_list.append((self._get_key(song_file), file_stat.st_size, file_stat.st_mtime_ns, content_hash,
+                             self._line_separator.join(song_text_list)))
+        try:
+            with connection:
+                connection.executemany('INSERT OR REPLACE INTO songs VALUES (?, ?, ?, ?, ?)', row_list)
+        except sqlite3.Error as error:
+            print("Error writing song cache", self._cache_file, error)
+
+    def remove_others(self, song_file_list):
+        """Remove the entries of all song files except the given ones, after a whole library was loaded. Entries of
+        deleted or renamed song files are never requested again
+        :type song_file_list: list[Path]
+        :param song_file_list: All song files of the library"""
+        connection = self._get_connection()
+        if connection is None:
+            return
+        try:
+            with connection:
+                self._set_requested(connection, [self._get_key(song_file) for song_file in song_file_list])
+                connection.execute('DELETE FROM songs WHERE path NOT IN (SELECT path FROM requested)')
+        except sqlite3.Error as error:
+            print("Error writing song cache", self._cache_file, error)
+
+    def close(self):
+        """Close the cache database"""
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -0,0 +1,94 @@
+from difflib import SequenceMatcher
+
+from Song import Song
+
+
+class SongDiff:
+    """Kinds of text parts: unchanged, only in the original, changed and only in the similar song"""
+    DEFAULT = 'default'
+    SUB = 'sub'
+    CHG = 'chg'
+    ADD = 'add'
+    """Replaced lines less similar than this are shown as removed and added instead of changed"""
+    _line_pair_cutoff = 0.5
+    """Each row of the diff: original line number, original text parts, similar line number, similar text parts"""
+    rows: list[tuple[int | None, list[tuple[str, str]], int | None, list[tuple[str, str]]]]
+
+    def __init__(self, orig_line_list, similar_line_list):
+        """Compare two songs line by line and changed lines character by character, side by side
+        :type orig_line_list: list[str]
+        :param orig_line_list: The lines of the original song
+        :type similar_line_list: list[str]
+        :param similar_line_list: The lines of the similar song"""
+        self.rows = []
+        line_matcher = SequenceMatcher(None, orig_line_list, similar_line_list, autojunk=False)
+        for tag, orig_start, orig_end, similar_start, similar_end in line_matcher.get_opcodes():
+            if 'equal' == tag:
+                for orig_num, similar_num in zip(range(orig_start, orig_end), range(similar_start, similar_end)):
+                    self.rows.append((orig_num + 1, [(self.DEFAULT, orig_line_list[orig_num])],
+                                      similar_num + 1, [(self.DEFAULT, similar_line_list[similar_num])]))
+                continue
+            # Replaced lines are paired in order, the rest is removed or added
+            pair_count: int = min(orig_end - orig_start, similar_end - similar_start)
+            for offset in range(pair_count):
+                self._add_changed_line(orig_start + offset, orig_line_list[orig_start + offset],
+                                       similar_start + offset, similar_line_list[similar_start + offset])
+            for orig_num in range(orig_start + pair_count, orig_end):
+                self.rows.append((orig_num + 1, [(self.SUB, orig_line_list[orig_num])], None, []))
+            for similar_num in range(similar_start + pair_count, similar_end):
+                self.rows.append((None, [], similar_num + 1, [(self.ADD, similar_line_list[similar_num])]))
+
+    @classmethod
+    def from_songs(cls, song_orig, song_similar):
+        """Compare two songs
+        :type song_orig: Song
+        :param song_orig: The original song
+        :type song_similar: Song
+        :param song_similar: The similar song
+        :return SongDiff: The diff of both songs
+        :raises ReferenceError"""
+        return cls([line.get_text() for line in song_orig.get_line_list()],
+                   [line.get_text() for line in song_similar.get_line_list()])
+
+    def _add_changed_line(self, orig_num, orig_line, similar_num, similar_line):
+        """Add a row for a changed line, marking the changed characters
+        :type orig_num: int
+        :param orig_num: The original lines index
+        :type orig_line: str
+        :param orig_line: The original lines text
+        :type similar_num: int
+        :param similar_num: The similar lines index
+        :type similar_line: str
+        :param similar_line: The similar lines text"""
+        char_matcher = SequenceMatcher(None, orig_line, similar_line, autojunk=False)
+        # Lines with little in common are easier to read as a whole
+        if char_matcher.real_quick_ratio() < self._line_pair_cutoff or \
+                char_matcher.quick_ratio() < self._line_pair_cutoff or char_matcher.ratio() < self._line_pair_cutoff:
+            self.rows.append((orig_num + 1, [(self.SUB, orig_line)], None, []))
+            self.rows.append((None, [], similar_num + 1, [(self.ADD, similar_line)]))
+            return
+        orig_part_list: list[tuple[str, str]] = []
+        similar_part_list: list[tuple[str, str]] = []
+        for tag, orig_start, orig_end, similar_start, similar_end in char_matcher.get_opcodes():
+            if 'equal' == tag:
+                orig_part_list.append((self.DEFAULT, orig_line[orig_start:orig_end]))
+                similar_part_list.append((self.DEFAULT, similar_line[similar_start:similar_end]))
+            elif 'replace' == tag:
+                orig_part_list.append((self.CHG, orig_line[orig_start:orig_end]))
+                similar_part_list.append((self.CHG, similar_line[similar_start:similar_end]))
+            elif 'delete' == tag:
+                orig_part_list.append((self.SUB, orig_line[orig_start:orig_end]))
+            else:
+                similar_part_list.append((self.ADD, similar_line[similar_start:similar_end]))
+        self.rows.append((orig_num + 1, orig_part_list, similar_num + 1, similar_part_list))
+
+    def mirrored(self):
+        """Get the same diff with the original and the similar song swapped
+        :return SongDiff: The mirrored diff"""
+        swapped_kind_dict: dict[str, str] = {self.DEFAULT: self.DEFAULT, self.SUB: self.ADD, self.CHG: self.CHG,
+                                             self.ADD: self.SUB}
+        song_diff = SongDiff.__new__(SongDiff)
+        song_diff.rows = [(similar_num, [(swapped_kind_dict[kind], text) for kind, text in similar_part_list],
+                           orig_num, [(swapped_kind_dict[kind], text) for kind, text in orig_part_list])
+                          for orig_num, orig_part_list, similar_num, similar_part_list in self.rows]
+        return song_diff
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from threading import Thread, Lock
+
+from Song import Song
+from SongDiff import SongDiff
+
+
+class SongDiffCache:
+    def __init__(self, max_size=1000):
+        """Keep the diffs of recently compared song pairs, a diff is calculated again if the text of a song changed
+        :type max_size: int
+        :param max_size: How many diffs are kept, the least recently used ones are dropped first"""
+        self._max_size: int = max(1, max_size)
+        # Diffs by the ids of both songs, lower id first, with the text signatures they were calculated for
+        self._diff_dict: OrderedDict[tuple[int, int], tuple[tuple, SongDiff]] = OrderedDict()
+        self._lock: Lock = Lock()
+        self._precompute_generation: int = 0
+
+    @staticmethod
+    def _get_text_signature(song):
+        """Get what identifies the loaded text of a song, which the diff is calculated from
+        :type song: Song
+        :param song: The song to check
+        :return tuple[int, int]: The texts length and hash, strings keep their hash so this is cheap
+        :raises ReferenceError"""
+        text: str = song.get_text()
+        return len(text), hash(text)
+
+    def get_diff(self, song_orig, song_similar):
+        """Get the diff of two songs, from the cache if neither song text changed since it was calculated
+        :type song_orig: Song
+        :param song_orig: The original song
+        :type song_similar: Song
+        :param song_similar: The similar song
+        :return SongDiff: The diff of both songs
+        :raises ReferenceError"""
+        # Each pair is only stored once, the other direction is mirrored
+        is_mirrored: bool = song_similar.id < song_orig.id
+        if is_mirrored:
+            song_orig, song_similar = song_similar, song_orig
+        key: tuple[int, int] = (song_orig.id, song_similar.id)
+        signature: tuple = (self._get_text_signature(song_orig), self._get_text_signature(song_similar))
+        with self._lock:
+            cached = self._diff_dict.get(key)
+            if cached is not None and cached[0] == signature:
+                self._diff_dict.move_to_end(key)
+                song_diff = cached[1]
+            else:
+                song_diff = None
+        if song_diff is None:
+            song_diff = SongDiff.from_songs(song_orig, song_similar)
+            with self._lock:
+                self._diff_dict[key] = (signature, song_diff)
+                self._diff_dict.move_to_end(key)
+                while self._max_size < len(self._diff_dict):
+                    self._diff_dict.popitem(last=False)
+        return song_diff.mirrored() if is_mirrored else song_diff
+
+    def precompute(self, song_pair_list):
+        """Calculate the diffs of song pairs in a background thread, so they are ready when they are shown. A new call
+        stops the precomputing of an earlier one
+        :type song_pair_list: list[tuple[Song, Song]]
+        :param song_pair_list: The song pairs, the most important first"""
+        with self._lock:
+            self._precompute_generation += 1
+            generation: int = self._precompute_generation
+        precompute_thread = Thread(target=self._precompute, args=(list(song_pair_list), generation),
+                                   name="Song Diff Precompute", daemon=True)
+        precompute_thread.start()
+
+    def _precompute(self, song_pair_list, generation):
+        """Calculate the diffs of song pairs until a newer precompute call starts
+        :type song_pair_list: list[tuple[Song, Song]]
+        :param song_pair_list: The song pairs
+        :type generation: int
+        :param generation: The precompute call this is running for"""
+        for song_orig, song_similar in song_pair_list:
+            if generation != self._precompute_generation:
+                return
+            # Songs may be unloaded in the meantime
+            try:
+                self.get_diff(song_orig, song_similar)
+            except ReferenceError:
+                continue
+
+    def clear(self):
+        """Drop all cached diffs and stop precomputing"""
+        with self._lock:
+            self._precompute_generation += 1
+            self._diff_dict.clear()
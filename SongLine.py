@@ -1,31 +1,32 @@
 class SongLine:
-    # Uniquely ids all song lines
-    next_id = 0
+    __slots__ = ('song', '_line_index')
 
-    def __init__(self, song_text: str, song):
-        """A song line of a song
-        :type song_text: str
-        :param song_text: The lines text
+    def __init__(self, song, line_index):
+        """A song line of a song, its text is stored in the songs text buffer
         :type song: Song.Song
         :param song: The song this line is a part of
+        :type line_index: int
+        :param line_index: The lines position in the song
         """
-        # Set unique id
-        self.id = self.next_id
-        SongLine.next_id += 1
-        # Setup the song line
-        self._text = song_text
         self.song = song
+        self._line_index = line_index
+
+    @property
+    def id(self):
+        """Uniquely identifies this song line
+        :return tuple[int, int]: The songs id and the lines position in the song"""
+        return self.song.id, self._line_index
 
     def get_text(self):
         """Get the lines song text
         :return str: The lines song text"""
-        return self._text
+        return self.song.get_line_text(self._line_index)
 
     def __repr__(self):
-        return self._text
+        return self.get_text()
 
     def __eq__(self, other_line):
         return self.id == other_line.id
 
     def __hash__(self):
-        return self.id
+        return hash(self.id)
@@ -0,0 +1,144 @@
+import os
+import timeit
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from Instrumentation import Instrumentation
+from Song import Song
+
+
+def _read_song_file_chunk(song_file_list):
+    """Extract the song lines of a chunk of song files, this runs inside a worker process
+    :type song_file_list: list[Path]
+    :param song_file_list: The song files to read
+    :return list[tuple[list[str] | None, os.stat_result | None]]: The extracted song lines for each file, None if the
+        file is invalid, and the files stat taken before it was read"""
+    song_entry_list = []
+    for song_file in song_file_list:
+        try:
+            # A file edited while it is read must not be cached with the stat of its new content
+            file_stat = os.stat(song_file)
+            song_entry_list.append((Song.read_song_file(song_file), file_stat))
+        except (UnicodeDecodeError, FileNotFoundError):
+            song_entry_list.append((None, None))
+    return song_entry_list
+
+
+class SongLoader:
+    """Song files are only loaded in parallel if there are at least this many"""
+    min_parallel_song_count = 256
+    """Throughput of the last load call in songs per second"""
+    songs_per_second: float
+    """How many song files the last load call took from the cache"""
+    cached_song_count: int
+
+    def __init__(self, workers=None, chunk_size=64, max_pending_chunks=None):
+        """Load song objects from song files, parsing them in parallel worker processes
+        :type workers: int | None
+        :param workers: The number of worker processes, defaults to the number of cpu cores. 1 loads sequentially
+        :type chunk_size: int
+        :param chunk_size: How many song files each worker parses at once
+        :type max_pending_chunks: int | None
+        :param max_pending_chunks: How many chunks may be queued up at once, defaults to twice the worker count"""
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if max_pending_chunks is None:
+            max_pending_chunks = workers * 2
+        self._workers: int = max(1, workers)
+        self._chunk_size: int = max(1, chunk_size)
+        self._max_pending_chunks: int = max(1, max_pending_chunks)
+        self.songs_per_second = 0
+        self.cached_song_count = 0
+
+    def load(self, song_file_list, progress_callback=None, cache=None, instrumentation=None):
+        """Load song objects for the given list of song files, keeping their order
+        :type song_file_list: list[str | Path]
+        :param song_file_list: The list of song files to load
+        :type progress_callback: (int) -> None
+        :param progress_callback: Called with the number of song files processed so far
+        :type cache: SongCache | None
+        :param cache: Cache to take unchanged song files from, newly parsed song files are added to it
+        :type instrumentation: Instrumentation | None
+        :param instrumentation: Measures the loading as its own stage, None measures nothing
+        :return list[Song]: The list of valid song objects"""
+        if instrumentation is None:
+            instrumentation = Instrumentation(enabled=False)
+        with instrumentation.stage('load', ('songs',)) as counters:
+            song_object_list: list[Song] = self._load(song_file_list, progress_callback, cache)
+            counters['songs'] = len(song_file_list)
+            counters['valid_songs'] = len(song_object_list)
+            counters['cached_songs'] = self.cached_song_count
+        return song_object_list
+
+    def _load(self, song_file_list, progress_callback, cache):
+        """Load song objects for the given list of song files, see load()
+        :return list[Song]: The list of valid song objects"""
+        timer_start: float = timeit.default_timer()
+        song_path_list: list[Path] = [Path(song_file) for song_file in song_file_list]
+
+        # Only parse song files that aren't cached
+        cached_song_text_list_dict: dict[Path, list[str]] = {}
+        if cache is not None:
+            cached_song_text_list_dict = cache.get_many(song_path_list)
+        parsed_song_path_list: list[Path] = [song_path for song_path in song_path_list
+                                             if song_path not in cached_song_text_list_dict]
+        parsed_song_iterator = self._read_song_files(parsed_song_path_list)
+        new_cache_entry_list: list[tuple[Path, list[str], os.stat_result]] = []
+
+        song_object_list: list[Song] = []
+        songs_processed: int = 0
+        for song_path in song_path_list:
+            if song_path in cached_song_text_list_dict:
+                song_text_list = cached_song_text_list_dict[song_path]
+            else:
+                song_path, (song_text_list, file_stat) = next(parsed_song_iterator)
+                if song_text_list is not None:
+                    new_cache_entry_list.append((song_path, song_text_list, file_stat))
+            songs_processed += 1
+            if progress_callback is not None:
+                progress_callback(songs_processed)
+            # Only keep valid song objects
+            if song_text_list is None:
+                print("Error reading file", song_path)
+                continue
+            song_object_list.append(Song(song_path, song_text_list))
+
+        # Remember newly parsed song files
+        if cache is not None and new_cache_entry_list:
+            cache.put_many(new_cache_entry_list)
+
+        # Report throughput
+        time_elapsed: float = timeit.default_timer() - timer_start
+        if 0 < time_elapsed:
+            self.songs_per_second = songs_processed / time_elapsed
+        self.cached_song_count = len(cached_song_text_list_dict)
+        print("Loaded", songs_processed, "song files in", round(time_elapsed, 2), "s (" +
+              str(round(self.songs_per_second, 1)), "songs/s,", self.cached_song_count, "from cache)")
+        return song_object_list
+
+    def _read_song_files(self, song_path_list):
+        """Extract the song lines of all song files in order
+        :type song_path_list: list[Path]
+        :param song_path_list: The song files to read
+        :return Iterator[tuple[Path, tuple[list[str] | None, os.stat_result | None]]]: Each song file with its song
+            lines, None if invalid, and its stat taken before reading it"""
+        # Small lists are not worth starting worker processes for
+        if 1 == self._workers or len(song_path_list) < self.min_parallel_song_count:
+            for song_path in song_path_list:
+                yield song_path, _read_song_file_chunk([song_path])[0]
+            return
+
+        chunk_list = [song_path_list[i:i + self._chunk_size]
+                      for i in range(0, len(song_path_list), self._chunk_size)]
+        with ProcessPoolExecutor(max_workers=self._workers) as executor:
+            # Keep a bounded number of chunks in flight and collect them in submission order
+            pending_chunks = deque()
+            next_chunk: int = 0
+            while next_chunk < len(chunk_list) or pending_chunks:
+                while next_chunk < len(chunk_list) and len(pending_chunks) < self._max_pending_chunks:
+                    chunk = chunk_list[next_chunk]
+                    pending_chunks.append((chunk, executor.submit(_read_song_file_chunk, chunk)))
+                    next_chunk += 1
+                chunk, future = pending_chunks.popleft()
+                yield from zip(chunk, future.result())
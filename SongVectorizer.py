@@ -0,0 +1,103 @@
+import numpy as np
+from scipy.sparse import vstack
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer
+from sklearn.preprocessing import normalize
+
+
+class SongVectorizer:
+    """Available vectorizer backends"""
+    TFIDF = 'tfidf'
+    HASHING = 'hashing'
+    CHAR = 'char'
+    BACKENDS = (TFIDF, HASHING, CHAR)
+
+    def __init__(self, backend=TFIDF, n_features=2 ** 20, char_ngram_range=(3, 4), batch_size=2000,
+                 dtype=np.float64):
+        """Turn song texts into l2 normalized tf-idf vectors, so the dot product of two vectors is their cosine
+        similarity
+        :type backend: str
+        :param backend: TFIDF uses a word vocabulary, HASHING hashes words into a fixed feature space and can be fit
+            in batches and CHAR uses character n-grams, which are more robust against typos
+        :type n_features: int
+        :param n_features: Size of the feature space of the HASHING backend
+        :type char_ngram_range: tuple[int, int]
+        :param char_ngram_range: Smallest and largest character n-gram of the CHAR backend
+        :type batch_size: int
+        :param batch_size: How many texts the HASHING backend hashes at once, this bounds the peak memory
+        :type dtype: type
+        :param dtype: The data type of the vectors, float32 halves their memory"""
+        if backend not in self.BACKENDS:
+            raise ValueError('Unknown vectorizer backend ' + str(backend))
+        self._backend: str = backend
+        self._batch_size: int = batch_size
+        self._dtype = dtype
+        self._vectorizer: TfidfVectorizer | HashingVectorizer
+        if self.HASHING == backend:
+            self._vectorizer = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None,
+                                                 dtype=dtype)
+            self._document_frequencies = np.zeros(n_features, dtype=np.int64)
+            self._document_count: int = 0
+        elif self.CHAR == backend:
+            self._vectorizer = TfidfVectorizer(analyzer='char_wb', ngram_range=char_ngram_range, dtype=dtype)
+        else:
+            self._vectorizer = TfidfVectorizer(dtype=dtype)
+
+    def _iter_batches(self, text_list):
+        """Split texts into batches
+        :type text_list: list[str]
+        :param text_list: All texts
+        :return Iterator[list[str]]: Texts of each batch"""
+        for batch_start in range(0, len(text_list), self._batch_size):
+            yield text_list[batch_start:batch_start + self._batch_size]
+
+    def partial_fit(self, text_list):
+        """Add texts to the document frequencies of the HASHING backend, other backends can only be fit at once
+        :type text_list: list[str]
+        :param text_list: Texts to learn from"""
+        if self.HASHING != self._backend:
+            raise ValueError('Only the ' + self.HASHING + ' backend can be fit in batches')
+        for batch in self._iter_batches(text_list):
+            counts = self._vectorizer.transform(batch)
+            self._document_frequencies += np.bincount(counts.indices, minlength=len(self._document_frequencies))
+            self._document_count += len(batch)
+
+    def fit(self, text_list):
+        """Learn the idf values from all texts
+        :type text_list: list[str]
+        :param text_list: Texts to learn from
+        :return SongVectorizer: This vectorizer"""
+        if self.HASHING == self._backend:
+            self._document_frequencies[:] = 0
+            self._document_count = 0
+            self.partial_fit(text_list)
+        else:
+            self._vectorizer.fit(text_list)
+        return self
+
+    def transform(self, text_list):
+        """Turn texts into vectors
+        :type text_list: list[str]
+        :param text_list: Texts to transform
+        :return csr_matrix: One l2 normalized row per text"""
+        if self.HASHING != self._backend:
+            return self._vectorizer.transform(text_list)
+        # Smoothed idf values, the same way the TfidfVectorizer calculates them
+        idf = np.log((1 + self._document_count) / (1 + self._document_frequencies)) + 1
+        matrix_list = []
+        for batch in self._iter_batches(text_list):
+            counts = self._vectorizer.transform(batch)
+            counts.data = counts.data * idf[counts.indices]
+            matrix_list.append(normalize(counts).astype(self._dtype, copy=False))
+        if not matrix_list:
+            return self._vectorizer.transform([])
+        return vstack(matrix_list, format='csr')
+
+    def fit_transform(self, text_list):
+        """Learn the idf values from all texts and turn them into vectors
+        :type text_list: list[str]
+        :param text_list: Texts to learn from and transform
+        :return csr_matrix: One l2 normalized row per text"""
+        if self.HASHING == self._backend:
+            return self.fit(text_list).transform(text_list)
+        return self._vectorizer.fit_transform(text_list)
+
@@ -1,6 +1,76 @@
+import threading
+from contextlib import contextmanager
+from functools import partial
+from inspect import ismethod
+from weakref import ref
+
+
+class Subscription:
+    __slots__ = ('_subscribable_ref', '_subscription_type', '_object_ref', '_function', '_args', '_kwargs')
+
+    def __init__(self, subscribable, subscription_type, callback, weak=True):
+        """A registered callback, which can be unsubscribed again
+        :type subscribable: Subscribable
+        :param subscribable: The object the callback is subscribed to
+        :type subscription_type: int
+        :param subscription_type: The type of subscription
+        :type callback: callable
+        :param callback: The callback to run
+        :type weak: bool
+        :param weak: Whether a bound method, also wrapped in a partial, only keeps its object alive weakly. Once the
+            object is gone, the subscription ends by itself"""
+        self._subscribable_ref: ref = ref(subscribable)
+        self._subscription_type: int = subscription_type
+        self._args: tuple = ()
+        self._kwargs: dict | None = None
+        if isinstance(callback, partial):
+            self._args = callback.args
+            self._kwargs = callback.keywords or None
+            callback = callback.func
+        # The methods function is kept, the object it is bound to only weakly
+        self._object_ref: ref | None = None
+        if weak and ismethod(callback):
+            self._object_ref = ref(callback.__self__)
+            callback = callback.__func__
+        self._function: callable = callback
+
+    def is_alive(self):
+        """Check if the callback can still be run
+        :return bool: False if the object of a weakly bound method is gone"""
+        return self._object_ref is None or self._object_ref() is not None
+
+    def run(self, args, kwargs):
+        """Run the callback, if it is still alive
+        :type args: tuple
+        :param args: Arguments to pass after the subscribed ones
+        :type kwargs: dict
+        :param kwargs: Named arguments to pass in addition to the subscribed ones
+        :return bool: Whether the callback was run"""
+        if self._kwargs is not None:
+            kwargs = {**self._kwargs, **kwargs}
+        if self._object_ref is None:
+            self._function(*self._args, *args, **kwargs)
+            return True
+        bound_object = self._object_ref()
+        if bound_object is None:
+            return False
+        self._function(bound_object, *self._args, *args, **kwargs)
+        return True
+
+    def unsubscribe(self):
+        """Remove the callback from the object it is subscribed to, this can be called more than once"""
+        subscribable: Subscribable | None = self._subscribable_ref()
+        if subscribable is not None:
+            subscribable.unsubscribe(self._subscription_type, self)
+
+
 class Subscribable:
-    """Registered subscription callbacks"""
-    _subscriptions: dict[int, list[callable]]
+    # Subclasses using __slots__ have to provide _subscriptions and __weakref__ themselves
+    __slots__ = ()
+    """Registered subscriptions"""
+    _subscriptions: dict[int, list[Subscription]]
+    """Events that are held back by coalesced() in the current thread"""
+    _coalescing = threading.local()
 
     def __init__(self, available_subscription_types):
         """Setup subscriptions
@@ -11,15 +81,63 @@ class Subscribable:
         for subscriptionType in available_subscription_types:
             self._subscriptions[subscriptionType] = []
 
-    def subscribe(self, subscription_type, callback):
+    def subscribe(self, subscription_type, callback, weak=True):
         """Register a new subscription
         :type subscription_type: int
         :param subscription_type: The type of subscription
         :type callback: callable
         :param callback: The callback to register for the subscription
+        :type weak: bool
+        :param weak: Whether a bound method, also wrapped in a partial, only keeps its object alive weakly
+        :return Subscription | None: The subscription to unsubscribe with, None for unavailable types
         """
-        if subscription_type in self._subscriptions.keys():
-            self._subscriptions[subscription_type].append(callback)
+        if subscription_type not in self._subscriptions.keys():
+            return None
+        subscription_list: list[Subscription] = self._subscriptions[subscription_type]
+        # Drop callbacks whose object is gone, so objects that are rarely triggered do not collect them
+        subscription_list[:] = [subscription for subscription in subscription_list if subscription.is_alive()]
+        subscription: Subscription = Subscription(self, subscription_type, callback, weak)
+        subscription_list.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription_type, subscription):
+        """Remove a subscription
+        :type subscription_type: int
+        :param subscription_type: The type of subscription
+        :type subscription: Subscription
+        :param subscription: The subscription returned by subscribe"""
+        subscription_list: list[Subscription] | None = self._subscriptions.get(subscription_type)
+        if subscription_list is not None and subscription in subscription_list:
+            subscription_list.remove(subscription)
+
+    def get_subscription_count(self, subscription_type):
+        """Get how many callbacks are subscribed
+        :type subscription_type: int
+        :param subscription_type: The type of subscription
+        :return int: The number of subscribed callbacks whose object is still alive"""
+        return sum(1 for subscription in self._subscriptions.get(subscription_type, ()) if subscription.is_alive())
+
+    @classmethod
+    @contextmanager
+    def coalesced(cls, *subscription_types):
+        """Hold back events of the given types triggered in this thread and run each objects subscriptions only once
+        per type when the outermost context ends, with the arguments of the last event
+        :type subscription_types: int
+        :param subscription_types: The types of subscription to coalesce"""
+        coalescing = cls._coalescing
+        outer_types: frozenset[int] | None = getattr(coalescing, 'types', None)
+        if outer_types is None:
+            coalescing.pending = {}
+        coalescing.types = (outer_types or frozenset()) | frozenset(subscription_types)
+        try:
+            yield
+        finally:
+            coalescing.types = outer_types
+            if outer_types is None:
+                pending: dict = coalescing.pending
+                coalescing.pending = None
+                for subscribable, subscription_type, args, kwargs in pending.values():
+                    subscribable._run_subscriptions(subscription_type, args, kwargs)
 
     def _trigger_subscriptions(self, subscription_type, *args, **kwargs):
         """Run all subscriptions for the given type
@@ -30,10 +148,31 @@ class Subscribable:
         :type kwargs: Any
         :param kwargs: Named arguments to pass to the callback functions
         """
-        if subscription_type in self._subscriptions.keys():
-            # Run every subscribed callback
-            for callback in self._subscriptions[subscription_type]:
-                try:
-                    callback(*args, **kwargs)
-                except AttributeError:
-                    continue
+        coalescing_types: frozenset[int] | None = getattr(self._coalescing, 'types', None)
+        if coalescing_types is not None and subscription_type in coalescing_types:
+            # Later events of the same object replace earlier ones, but keep their position
+            self._coalescing.pending[(id(self), subscription_type)] = (self, subscription_type, args, kwargs)
+            return
+        self._run_subscriptions(subscription_type, args, kwargs)
+
+    def _run_subscriptions(self, subscription_type, args, kwargs):
+        """Run every subscribed callback and drop the ones whose object is gone
+        :type subscription_type: int
+        :param subscription_type: The type of subscription to run
+        :type args: tuple
+        :param args: Arguments to pass to the callback functions
+        :type kwargs: dict
+        :param kwargs: Named arguments to pass to the callback functions"""
+        subscription_list: list[Subscription] | None = self._subscriptions.get(subscription_type)
+        if not subscription_list:
+            return
+        has_dead_subscriptions: bool = False
+        # Callbacks may unsubscribe while running
+        for subscription in tuple(subscription_list):
+            try:
+                if not subscription.run(args, kwargs):
+                    has_dead_subscriptions = True
+            except AttributeError:
+                continue
+        if has_dead_subscriptions:
+            subscription_list[:] = [subscription for subscription in subscription_list if subscription.is_alive()]
@@ -0,0 +1,157 @@
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from LoadedSongs import LoadedSongs
+from SimilarityEngine import TiledSimilarityEngine
+from SimilarityFinder import SimilarityFinder
+from SimilarityGrouping import SimilarityGrouping
+from Song import Song
+from SongLoader import SongLoader
+from SongVectorizer import SongVectorizer
+from benchmarks.CorpusGenerator import CorpusGenerator
+
+
+class BenchmarkRunner:
+    def __init__(self, song_directory, threshold=0.6, tile_size=2048, measure_memory=True):
+        """Time the hot paths of finding similar songs stage by stage
+        :type song_directory: Path
+        :param song_directory: Directory with the song files to benchmark with
+        :type threshold: float
+        :param threshold: The threshold of what counts as "similar"
+        :type tile_size: int
+        :param tile_size: How many songs are compared with each other at once
+        :type measure_memory: bool
+        :param measure_memory: Run each stage a second time with tracemalloc to measure its peak memory"""
+        self._song_directory: Path = song_directory
+        self._threshold: float = threshold
+        self._tile_size: int = tile_size
+        self._measure_memory: bool = measure_memory
+
+    def _measure(self, stage_function):
+        """Measure a single stage
+        :type stage_function: callable
+        :param stage_function: Runs the stage and returns its result
+        :return object, dict[str, float]: The stages result and its measurements"""
+        timer_start: float = timeit.default_timer()
+        result = stage_function()
+        measurement: dict[str, float] = {'seconds': round(timeit.default_timer() - timer_start, 4)}
+        # Tracing allocations slows everything down, so memory is measured in a separate run
+        if self._measure_memory:
+            tracemalloc.start()
+            stage_function()
+            measurement['peak_mib'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+            tracemalloc.stop()
+        return result, measurement
+
+    def run(self):
+        """Run all stages
+        :return dict[str, dict[str, float]]: The measurements of each stage"""
+        stages: dict[str, dict[str, float]] = {}
+        song_file_list: list[Path] = sorted(self._song_directory.rglob('*.sng'))
+
+        _, stages['parse'] = self._measure(lambda: [Song.read_song_file(song_file) for song_file in song_file_list])
+        song_list, stages['load'] = self._measure(lambda: SongLoader(workers=1).load(song_file_list))
+        song_group_list, stages['exact_duplicates'] = self._measure(
+            lambda: SimilarityFinder._group_exact_duplicates(song_list))
+        text_list: list[str] = [song_group[0].get_text_as_line() for song_group in song_group_list]
+        matrix, stages['vectorize'] = self._measure(lambda: SongVectorizer().fit_transform(text_list))
+
+        def score_tiles():
+            tile_result_list = list(TiledSimilarityEngine(self._tile_size).iter_similarities(matrix, self._threshold))
+            return (len(tile_result_list), np.concatenate([tile_result[2] for tile_result in tile_result_list]),
+                    np.concatenate([tile_result[3] for tile_result in tile_result_list]),
+                    np.concatenate([tile_result[4] for tile_result in tile_result_list]))
+        (tile_count, rows, cols, scores), stages['similarities'] = self._measure(score_tiles)
+        stages['similarities']['pairs'] = len(scores)
+        stages['similarities']['tiles_per_second'] = round(tile_count / max(stages['similarities']['seconds'], 1e-9),
+                                                           2)
+        groups, stages['grouping'] = self._measure(
+            lambda: SimilarityGrouping().get_groups(len(text_list), rows, cols, scores))
+        stages['grouping']['groups'] = len(groups)
+
+        def find_similarities():
+            loaded_songs = LoadedSongs()
+            for song in song_list:
+                loaded_songs.add(song)
+            similarity_finder = SimilarityFinder(loaded_songs, lambda *progress: None,
+                                                 similarity_threshold=self._threshold, tile_size=self._tile_size,
+                                                 run_in_thread=False)
+            similarity_finder.run()
+        _, stages['finder_total'] = self._measure(find_similarities)
+        return stages
+
+
+def _get_git_revision():
+    """Get the current git commit, if available
+    :return str: The commit hash or an empty string"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent).stdout.strip()
+    except OSError:
+        return ''
+
+
+def _print_comparison(result, previous_result):
+    """Print how much each stage changed since a previous run
+    :type result: dict
+    :param result: The current benchmark result
+    :type previous_result: dict
+    :param previous_result: An earlier result of the same corpus scale"""
+    print('Compared with', previous_result['revision'] or 'unknown revision', 'from', previous_result['time'])
+    for stage_name, measurement in result['stages'].items():
+        previous_measurement = previous_result['stages'].get(stage_name)
+        if previous_measurement is None:
+            continue
+        change_list: list[str] = []
+        for key in ('seconds', 'peak_mib'):
+            if key in measurement and previous_measurement.get(key):
+                change = (measurement[key] - previous_measurement[key]) / previous_measurement[key] * 100
+                change_list.append(key + ' ' + ('+' if change >= 0 else '') + str(round(change, 1)) + ' %')
+        print(' ', stage_name + ':', ', '.join(change_list))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark all stages on a synthetic song corpus')
+    parser.add_argument('--scale', default='1k', help='Song count or one of ' + ', '.join(CorpusGenerator.SCALES))
+    parser.add_argument('--corpus', type=Path, default=None,
+                        help='Directory with the corpus, it is generated if it is empty. Uses a temporary one by '
+                             'default')
+    parser.add_argument('--threshold', type=float, default=0.6, help='Similarity threshold')
+    parser.add_argument('--skip-memory', action='store_true', help='Only measure times, not peak memory')
+    parser.add_argument('--results', type=Path, default=Path('benchmark_results.jsonl'),
+                        help='File the results are appended to and compared with')
+    args = parser.parse_args()
+
+    song_count: int = CorpusGenerator.SCALES.get(args.scale) or int(args.scale)
+    with tempfile.TemporaryDirectory() as temp_directory:
+        corpus_directory: Path = args.corpus or Path(temp_directory)
+        if not any(corpus_directory.glob('*.sng')):
+            print('Generating', song_count, 'songs in', corpus_directory)
+            print(CorpusGenerator().generate(corpus_directory, song_count))
+        song_count = len(list(corpus_directory.rglob('*.sng')))
+        stages = BenchmarkRunner(corpus_directory, args.threshold, measure_memory=not args.skip_memory).run()
+
+    benchmark_result: dict = {'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'revision': _get_git_revision(),
+                              'songs': song_count, 'threshold': args.threshold, 'stages': stages}
+    for name, stage_measurement in stages.items():
+        print(name + ':', ', '.join(key + ' ' + str(value) for key, value in stage_measurement.items()))
+
+    # Compare with the last run of the same size before storing this one
+    if args.results.exists():
+        with open(args.results, encoding='UTF-8') as results_file:
+            previous_result_list = [json.loads(line) for line in results_file if line.strip()]
+        previous_result_list = [previous_result for previous_result in previous_result_list
+                                if previous_result['songs'] == song_count and
+                                previous_result['threshold'] == args.threshold]
+        if previous_result_list:
+            _print_comparison(benchmark_result, previous_result_list[-1])
+    with open(args.results, 'a', encoding='UTF-8') as results_file:
+        results_file.write(json.dumps(benchmark_result) + '\n')
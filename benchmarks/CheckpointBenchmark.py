@@ -0,0 +1,110 @@
+import argparse
+import shutil
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from LoadedSongs import LoadedSongs
+from SimilarityFinder import SimilarityFinder
+from SimilarityIndex import SimilarityIndex
+from SongLoader import SongLoader
+
+
+def find_similarities(loaded_songs, tile_size, similarity_index=None, checkpoint_directory=None,
+                      cancel_after_tiles=None):
+    """Run a similarity calculation, optionally cancelling it once enough tiles are stored in the checkpoint
+    :type loaded_songs: LoadedSongs
+    :param loaded_songs: All songs to compare
+    :type tile_size: int
+    :param tile_size: How many songs each tile compares
+    :type similarity_index: SimilarityIndex | None
+    :param similarity_index: Index to only score new songs with, None scores all songs
+    :type checkpoint_directory: Path | None
+    :param checkpoint_directory: Directory to store the checkpoint in, None does not store one
+    :type cancel_after_tiles: int | None
+    :param cancel_after_tiles: Cancel once this many tiles are stored, None runs to the end
+    :return SimilarityFinder, bool, float: The finder, whether it finished and how many seconds it ran"""
+    similarity_finder: SimilarityFinder | None = None
+
+    def progress_callback(percentage_done, seconds_elapsed, seconds_remaining):
+        """Cancel the calculation once enough tiles are stored"""
+        if cancel_after_tiles is not None and \
+                cancel_after_tiles <= len(list(checkpoint_directory.glob('batch_*.npz'))):
+            similarity_finder.cancel()
+
+    similarity_finder = SimilarityFinder(loaded_songs, progress_callback, run_in_thread=False, tile_size=tile_size,
+                                         workers=1, similarity_index=similarity_index,
+                                         checkpoint_directory=checkpoint_directory)
+    start: float = timeit.default_timer()
+    is_done: bool = similarity_finder.run()
+    return similarity_finder, is_done, timeit.default_timer() - start
+
+
+def get_result(similarity_finder):
+    """Get a comparable copy of the results
+    :type similarity_finder: SimilarityFinder
+    :param similarity_finder: A finished finder
+    :return list, list: The sorted pairs and groups by song file"""
+    similarities, similarity_scores = similarity_finder.get_similarities()
+    pair_list = sorted((str(song_a), str(song_b), score) for song_a, song_b, score in
+                       similarity_finder._all_similarity_scores.iter_sorted())
+    group_list = sorted(sorted(str(song) for song in group) for group in similarities)
+    return pair_list, group_list
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that a cancelled and resumed similarity calculation finds '
+                                                 'the same pairs and groups as an uninterrupted one')
+    parser.add_argument('directory', type=Path, help='Directory to load song files from, recursively')
+    parser.add_argument('--tile-size', type=int, default=1000, help='How many songs each tile compares')
+    parser.add_argument('--cancel-after', type=float, default=0.5,
+                        help='Share of the tiles after which the first run is cancelled')
+    parser.add_argument('--index', action='store_true', help='Calculate through a similarity index, like the gui')
+    parser.add_argument('--indexed-share', type=float, default=0,
+                        help='Share of the songs already in the index, so only the others are scored')
+    args = parser.parse_args()
+
+    song_list = SongLoader().load(sorted(args.directory.rglob('*.sng')))
+    loaded_songs = LoadedSongs()
+    loaded_songs.add_many(song_list)
+    indexed_count: int = int(len(song_list) * args.indexed_share) if args.index else 0
+    # Rows of already indexed songs are left out
+    row_count: int = -(-(len(song_list) - indexed_count) // args.tile_size)
+    tile_count: int = row_count * (row_count + 1) // 2 + row_count * -(-indexed_count // args.tile_size)
+    cancel_after_tiles: int = max(1, int(tile_count * args.cancel_after))
+
+    with tempfile.TemporaryDirectory() as temp_directory:
+        # Both runs start with the same index
+        index_file = Path(temp_directory) / SimilarityIndex.default_file_name
+        if indexed_count:
+            indexed_songs = LoadedSongs()
+            indexed_songs.add_many(song_list[:indexed_count])
+            find_similarities(indexed_songs, args.tile_size, SimilarityIndex(index_file))
+        full_index_file = Path(temp_directory) / 'full_index.npz'
+        if index_file.exists():
+            shutil.copyfile(index_file, full_index_file)
+        full_finder, _, full_seconds = find_similarities(loaded_songs, args.tile_size,
+                                                         SimilarityIndex(full_index_file) if args.index else None)
+        print('uninterrupted:', round(full_seconds, 2), 's')
+
+        checkpoint_directory = Path(temp_directory) / 'checkpoint'
+        similarity_index = SimilarityIndex(index_file) if args.index else None
+        _, is_done, cancelled_seconds = find_similarities(loaded_songs, args.tile_size, similarity_index,
+                                                          checkpoint_directory, cancel_after_tiles)
+        stored_tile_count: int = len(list(checkpoint_directory.glob('batch_*.npz')))
+        print('cancelled:', round(cancelled_seconds, 2), 's,', stored_tile_count, 'of', tile_count, 'tiles stored',
+              '(finished before cancelling)' if is_done else '')
+        # Like a restarted program, the index is read from disk again
+        similarity_index = SimilarityIndex(index_file) if args.index else None
+        resumed_finder, is_done, resumed_seconds = find_similarities(loaded_songs, args.tile_size, similarity_index,
+                                                                     checkpoint_directory)
+        print('resumed:', round(resumed_seconds, 2), 's,', len(list(checkpoint_directory.glob('*'))),
+              'checkpoint files left')
+        if similarity_index is not None:
+            print('index update was a full refit:', similarity_index.last_update_was_full)
+
+    is_identical: bool = is_done and get_result(full_finder) == get_result(resumed_finder)
+    print('identical results:', is_identical)
+    if not is_identical:
+        sys.exit(1)
@@ -0,0 +1,151 @@
+import argparse
+import itertools
+import random
+from pathlib import Path
+
+from Song import Song
+
+
+class CorpusGenerator:
+    """Song corpus sizes used by the benchmarks"""
+    SCALES = {'1k': 1000, '10k': 10000, '100k': 100000}
+    """Verse headings songs are built from, the same ones the song parser recognizes"""
+    _verse_heading_list = Song.supported_verse_heading_list
+
+    def __init__(self, near_duplicate_rate=0.1, exact_duplicate_rate=0.02, mutation_rate=0.1, vocabulary_size=8000,
+                 seed=0):
+        """Write random but realistic SongBeamer song files
+        :type near_duplicate_rate: float
+        :param near_duplicate_rate: Share of songs that are slightly changed copies of an earlier song
+        :type exact_duplicate_rate: float
+        :param exact_duplicate_rate: Share of songs with the same text as an earlier song, only headers differ
+        :type mutation_rate: float
+        :param mutation_rate: Share of words changed in a near duplicate
+        :type vocabulary_size: int
+        :param vocabulary_size: How many different words the songs use
+        :type seed: int
+        :param seed: Seed for the random generator, the same seed always writes the same corpus"""
+        self._near_duplicate_rate: float = near_duplicate_rate
+        self._exact_duplicate_rate: float = exact_duplicate_rate
+        self._mutation_rate: float = mutation_rate
+        self._random = random.Random(seed)
+        self._word_list: list[str] = self._build_word_list(vocabulary_size)
+        # Words are used with a Zipf like distribution, like in natural language
+        self._word_weights: list[float] = list(itertools.accumulate(1 / rank
+                                                                    for rank in range(1, vocabulary_size + 1)))
+
+    def _build_word_list(self, vocabulary_size):
+        """Build unique pseudo words from syllables
+        :type vocabulary_size: int
+        :param vocabulary_size: How many words to build
+        :return list[str]: The words"""
+        syllable_list = [consonant + vowel for consonant in 'bdfghklmnprstwz' for vowel in ('a', 'e', 'i', 'o', 'u',
+                                                                                             'ei', 'au', 'ie')]
+        word_set: set[str] = set()
+        word_list: list[str] = []
+        while len(word_list) < vocabulary_size:
+            word = ''.join(self._random.choice(syllable_list) for _ in range(self._random.randint(1, 4)))
+            if word not in word_set:
+                word_set.add(word)
+                word_list.append(word)
+        return word_list
+
+    def _build_verses(self):
+        """Build the verses of a new song
+        :return list[tuple[str, list[str]]]: Heading and lines of each verse"""
+        verse_list: list[tuple[str, list[str]]] = []
+        for verse_num in range(self._random.randint(3, 6)):
+            heading = self._random.choice(self._verse_heading_list)
+            if heading in ("Vers", "Verse", "Strophe", "Teil", "Part"):
+                heading += ' ' + str(verse_num + 1)
+            line_list = [' '.join(self._random.choices(self._word_list, cum_weights=self._word_weights,
+                                                       k=self._random.randint(4, 8)))
+                         for _ in range(self._random.randint(4, 8))]
+            verse_list.append((heading, line_list))
+        return verse_list
+
+    def _mutate_verses(self, verse_list):
+        """Build a near duplicate by changing, dropping and misspelling some words
+        :type verse_list: list[tuple[str, list[str]]]
+        :param verse_list: The verses of the original song
+        :return list[tuple[str, list[str]]]: The changed verses"""
+        mutated_verse_list: list[tuple[str, list[str]]] = []
+        for heading, line_list in verse_list:
+            mutated_line_list: list[str] = []
+            for line in line_list:
+                word_list: list[str] = []
+                for word in line.split():
+                    if self._random.random() >= self._mutation_rate:
+                        word_list.append(word)
+                        continue
+                    mutation = self._random.randint(0, 2)
+                    if 0 == mutation:
+                        word_list.append(self._random.choice(self._word_list))
+                    elif 1 == mutation and 1 < len(word):
+                        # Typo, swap two neighbouring letters
+                        position = self._random.randint(0, len(word) - 2)
+                        word_list.append(word[:position] + word[position + 1] + word[position] + word[position + 2:])
+                    # Otherwise the word is left out
+                mutated_line_list.append(' '.join(word_list))
+            mutated_verse_list.append((heading, mutated_line_list))
+        return mutated_verse_list
+
+    def _format_song(self, title, verse_list):
+        """Format a song like SongBeamer stores it
+        :type title: str
+        :param title: The songs title
+        :type verse_list: list[tuple[str, list[str]]]
+        :param verse_list: Heading and lines of each verse
+        :return str: The song files content"""
+        file_line_list: list[str] = ['#LangCount=1', '#Editor=SongBeamer 5.17', '#Version=3', '#Title=' + title,
+                                     '#Author=' + self._random.choice(self._word_list).capitalize(),
+                                     '#CCLI=' + str(self._random.randint(100000, 9999999)), '#(c)=Public Domain']
+        for heading, line_list in verse_list:
+            file_line_list.append('---')
+            file_line_list.append(heading)
+            for line in line_list:
+                # Some lines have chord or language markers the parser has to remove
+                marker = self._random.choices(('', '#C ', '##1 '), weights=(8, 1, 1))[0]
+                file_line_list.append(marker + line)
+        return '\n'.join(file_line_list) + '\n'
+
+    def generate(self, directory, song_count):
+        """Write song files into a directory
+        :type directory: Path
+        :param directory: Directory to write to, it is created if needed
+        :type song_count: int
+        :param song_count: How many song files to write
+        :return dict[str, int]: How many songs, near duplicates and exact duplicates were written"""
+        directory.mkdir(parents=True, exist_ok=True)
+        verse_list_list: list[list[tuple[str, list[str]]]] = []
+        near_duplicate_count: int = 0
+        exact_duplicate_count: int = 0
+        for song_num in range(song_count):
+            choice = self._random.random()
+            if verse_list_list and choice < self._exact_duplicate_rate:
+                verse_list = self._random.choice(verse_list_list)
+                exact_duplicate_count += 1
+            elif verse_list_list and choice < self._exact_duplicate_rate + self._near_duplicate_rate:
+                verse_list = self._mutate_verses(self._random.choice(verse_list_list))
+                near_duplicate_count += 1
+            else:
+                verse_list = self._build_verses()
+            verse_list_list.append(verse_list)
+            title = ' '.join(verse_list[0][1][0].split()[:3]).capitalize()
+            song_file = directory / (str(song_num).zfill(6) + ' ' + title + '.sng')
+            song_file.write_text(self._format_song(title, verse_list), encoding='UTF-8')
+        return {'songs': song_count, 'near_duplicates': near_duplicate_count,
+                'exact_duplicates': exact_duplicate_count}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write a synthetic SongBeamer song corpus')
+    parser.add_argument('directory', type=Path, help='Directory to write the song files to')
+    parser.add_argument('--songs', default='1k', help='Song count or one of ' + ', '.join(CorpusGenerator.SCALES))
+    parser.add_argument('--near-duplicates', type=float, default=0.1, help='Share of near duplicate songs')
+    parser.add_argument('--exact-duplicates', type=float, default=0.02, help='Share of exact duplicate songs')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the random generator')
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(args.near_duplicates, args.exact_duplicates, seed=args.seed)
+    print(generator.generate(args.directory, CorpusGenerator.SCALES.get(args.songs) or int(args.songs)))
@@ -0,0 +1,49 @@
+import argparse
+import timeit
+
+import numpy as np
+
+from SimilarityGrouping import SimilarityGrouping
+
+
+def build_dense_clusters(cluster_count, cluster_size, edge_probability, seed=0):
+    """Build similarity pairs forming dense clusters, like many versions of the same hymn
+    :type cluster_count: int
+    :param cluster_count: How many clusters to build
+    :type cluster_size: int
+    :param cluster_size: How many songs each cluster has
+    :type edge_probability: float
+    :param edge_probability: How likely two songs of the same cluster are similar
+    :type seed: int
+    :param seed: Seed for the random generator
+    :return int, np.ndarray, np.ndarray, np.ndarray: Song count, row and column song indices and scores"""
+    random_generator = np.random.default_rng(seed)
+    first, second = np.triu_indices(cluster_size, 1)
+    row_list = []
+    col_list = []
+    for cluster_num in range(cluster_count):
+        keep = random_generator.random(len(first)) < edge_probability
+        row_list.append(second[keep] + cluster_num * cluster_size)
+        col_list.append(first[keep] + cluster_num * cluster_size)
+    rows = np.concatenate(row_list)
+    cols = np.concatenate(col_list)
+    scores = random_generator.uniform(0.6, 1, len(rows))
+    return cluster_count * cluster_size, rows, cols, scores
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the grouping strategies on dense song clusters')
+    parser.add_argument('--clusters', type=int, default=200, help='How many clusters to build')
+    parser.add_argument('--size', type=int, default=60, help='How many songs each cluster has')
+    parser.add_argument('--density', type=float, default=0.7, help='Edge probability inside a cluster')
+    parser.add_argument('--time-budget', type=float, default=10, help='Time budget of the clique strategy')
+    args = parser.parse_args()
+
+    song_count, rows, cols, scores = build_dense_clusters(args.clusters, args.size, args.density)
+    print('songs:', song_count, 'pairs:', len(rows))
+    for strategy in (SimilarityGrouping.COMPONENTS, SimilarityGrouping.GREEDY, SimilarityGrouping.CLIQUES):
+        grouping = SimilarityGrouping(strategy, time_budget=args.time_budget)
+        timer_start = timeit.default_timer()
+        groups = grouping.get_groups(song_count, rows, cols, scores)
+        print(strategy + ':', len(groups), 'groups in', round(timeit.default_timer() - timer_start, 3), 's',
+              '(budget exceeded)' if grouping.budget_exceeded else '')
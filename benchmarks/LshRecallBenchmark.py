@@ -0,0 +1,24 @@
+import argparse
+from pathlib import Path
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from LshSimilarityEngine import LshSimilarityEngine
+from SongLoader import SongLoader
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare approximate MinHash LSH similarities with exact ones')
+    parser.add_argument('directory', type=Path, help='Directory to load song files from, recursively')
+    parser.add_argument('--threshold', type=float, default=0.6, help='Similarity threshold')
+    parser.add_argument('--bands', type=int, nargs='+', default=[16, 32], help='Band counts to try')
+    parser.add_argument('--rows', type=int, nargs='+', default=[4], help='Rows per band to try')
+    args = parser.parse_args()
+
+    song_list = SongLoader().load(sorted(args.directory.rglob('*.sng')))
+    text_list = [song.get_text_as_line() for song in song_list]
+    matrix = TfidfVectorizer().fit_transform(text_list)
+    for bands in args.bands:
+        for rows in args.rows:
+            report = LshSimilarityEngine(text_list, bands, rows).get_recall_report(matrix, args.threshold)
+            print('bands:', bands, 'rows:', rows, ' '.join(key + ': ' + str(round(value, 3))
+                                                          for key, value in report.items()))
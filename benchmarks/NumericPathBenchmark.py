@@ -0,0 +1,146 @@
+import argparse
+import random
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from SimilarityEngine import TiledSimilarityEngine
+from SongLoader import SongLoader
+from SongVectorizer import SongVectorizer
+
+
+def find_pairs(text_list, numeric_path, threshold, tile_size):
+    """Vectorize the texts and find all pairs above the threshold with one numeric path
+    :type text_list: list[str]
+    :param text_list: The song texts
+    :type numeric_path: str
+    :param numeric_path: One of TiledSimilarityEngine.NUMERIC_PATHS
+    :type threshold: float
+    :param threshold: Only similarities above this threshold are kept
+    :type tile_size: int
+    :param tile_size: How many songs each tile spans in each direction
+    :return np.ndarray, np.ndarray, bool: Sorted pair keys, their scores and whether the tiles were sparse"""
+    matrix = SongVectorizer(dtype=TiledSimilarityEngine.get_dtype(numeric_path)).fit_transform(text_list)
+    engine = TiledSimilarityEngine(tile_size, numeric_path)
+    key_list: list[np.ndarray] = []
+    score_list: list[np.ndarray] = []
+    for _, _, rows, cols, scores in engine.iter_similarities(matrix, threshold):
+        key_list.append(rows.astype(np.int64) * len(text_list) + cols)
+        score_list.append(scores)
+    keys = np.concatenate(key_list) if key_list else np.zeros(0, dtype=np.int64)
+    scores = np.concatenate(score_list) if score_list else np.zeros(0)
+    order = np.argsort(keys)
+    return keys[order], scores[order], engine.sparse_tiles
+
+
+def build_sparse_texts(song_count, words_per_song, vocabulary_size, seed=0):
+    """Build song texts of random words from a large vocabulary, so only few songs share a word. Every tenth text
+    is a copy of the one before with one word changed, so there are similar pairs
+    :type song_count: int
+    :param song_count: How many texts to build
+    :type words_per_song: int
+    :param words_per_song: How many words each text has
+    :type vocabulary_size: int
+    :param vocabulary_size: How many different words there are
+    :type seed: int
+    :param seed: Seed for the random generator
+    :return list[str]: The texts"""
+    random_generator = random.Random(seed)
+    text_list: list[str] = []
+    for song_num in range(song_count):
+        word_list = ['w' + str(random_generator.randrange(vocabulary_size)) for _ in range(words_per_song)]
+        if 0 < song_num and 0 == song_num % 10:
+            word_list = text_list[-1].split()
+            word_list[random_generator.randrange(words_per_song)] = word_list[0] + 'x'
+        text_list.append(' '.join(word_list))
+    return text_list
+
+
+def compare(keys, scores, reference_keys, reference_scores, threshold, tolerance):
+    """Check that pairs are the same as the reference pairs within a float tolerance
+    :type keys: np.ndarray
+    :param keys: Sorted pair keys
+    :type scores: np.ndarray
+    :param scores: Score of each pair
+    :type reference_keys: np.ndarray
+    :param reference_keys: Sorted pair keys of the reference
+    :type reference_scores: np.ndarray
+    :param reference_scores: Score of each reference pair
+    :type threshold: float
+    :param threshold: The threshold both were calculated with
+    :type tolerance: float
+    :param tolerance: The largest allowed score difference
+    :return str | None: What differs, None if nothing does"""
+    # Pairs found by only one path must score so close to the threshold that rounding decides
+    for only_keys, other_keys, other_scores in ((np.setdiff1d(keys, reference_keys), keys, scores),
+                                                 (np.setdiff1d(reference_keys, keys), reference_keys,
+                                                  reference_scores)):
+        only_scores = other_scores[np.searchsorted(other_keys, only_keys)]
+        if np.any(np.abs(only_scores - threshold) > tolerance):
+            return str(len(only_keys)) + ' pairs are only found by one path'
+    common_keys, positions, reference_positions = np.intersect1d(keys, reference_keys, return_indices=True)
+    if 0 == len(common_keys):
+        return None
+    difference = float(np.max(np.abs(scores[positions] - reference_scores[reference_positions])))
+    if difference > tolerance:
+        return 'scores differ by up to ' + str(difference)
+    return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the numeric paths of the similarity calculation')
+    parser.add_argument('directory', type=Path, nargs='?', default=None,
+                        help='Directory to load song files from, recursively. Without one, random texts are built')
+    parser.add_argument('--songs', type=int, default=10000, help='How many random texts are built')
+    parser.add_argument('--words', type=int, default=10, help='How many words each random text has')
+    parser.add_argument('--vocabulary', type=int, default=100000, help='How many words the random texts use')
+    parser.add_argument('--threshold', type=float, default=0.3, help='Similarity threshold')
+    parser.add_argument('--tile-size', type=int, default=2048, help='How many songs each tile spans')
+    parser.add_argument('--tolerance', type=float, default=1e-5, help='Largest allowed score difference')
+    args = parser.parse_args()
+
+    if args.directory is None:
+        text_list = build_sparse_texts(args.songs, args.words, args.vocabulary)
+    else:
+        text_list = [song.get_text_as_line() for song in SongLoader().load(sorted(args.directory.rglob('*.sng')))]
+    matrix = SongVectorizer(dtype=np.float32).fit_transform(text_list)
+    print('density:', round(TiledSimilarityEngine().estimate_density(matrix), 4), 'of all pairs share a word, '
+          'sparse tiles below', TiledSimilarityEngine.SPARSE_DENSITY_CUTOFF)
+    del matrix
+    reference_keys, reference_scores = None, None
+    measurement_dict: dict[str, tuple[float, int]] = {}
+    exit_code = 0
+    for numeric_path in TiledSimilarityEngine.NUMERIC_PATHS:
+        timer_start = timeit.default_timer()
+        keys, scores, sparse_tiles = find_pairs(text_list, numeric_path, args.threshold, args.tile_size)
+        seconds = timeit.default_timer() - timer_start
+        # Tracing allocations slows everything down, so memory is measured in a separate run
+        tracemalloc.start()
+        find_pairs(text_list, numeric_path, args.threshold, args.tile_size)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        measurement_dict[numeric_path] = (seconds, peak_memory)
+        if reference_keys is None:
+            reference_keys, reference_scores = keys, scores
+            difference = None
+        else:
+            difference = compare(keys, scores, reference_keys, reference_scores, args.threshold, args.tolerance)
+        print(numeric_path + ':', round(seconds, 3), 's,', 'peak memory', round(peak_memory / 2 ** 20, 1), 'MiB,',
+              len(keys), 'pairs,', difference or 'same pairs as ' + TiledSimilarityEngine.DENSE,
+              '(sparse tiles)' if sparse_tiles else '')
+        if difference is not None:
+            exit_code = 1
+
+    # Sparse tiles have to pay off, otherwise the dense float32 fallback may only cost the density estimate
+    sparse_seconds, sparse_memory = measurement_dict[TiledSimilarityEngine.SPARSE_FLOAT32]
+    dense_seconds, dense_memory = measurement_dict[TiledSimilarityEngine.DENSE_FLOAT32]
+    if sparse_tiles and (sparse_seconds >= dense_seconds or sparse_memory >= dense_memory):
+        print('Sparse tiles are not faster and smaller than dense float32 tiles', file=sys.stderr)
+        exit_code = 1
+    elif not sparse_tiles and (sparse_seconds > dense_seconds * 1.2 + 0.05 or sparse_memory > dense_memory * 1.1):
+        print('The dense float32 fallback is slower or larger than dense float32 tiles', file=sys.stderr)
+        exit_code = 1
+    sys.exit(exit_code)
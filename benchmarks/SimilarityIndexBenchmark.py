@@ -0,0 +1,81 @@
+import argparse
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+from SimilarityIndex import SimilarityIndex
+from SongLoader import SongLoader
+
+
+def update_index(similarity_index, key_list, text_list, threshold):
+    """Update the index and collect all pairs it yields
+    :type similarity_index: SimilarityIndex
+    :param similarity_index: The index to update
+    :type key_list: list[str]
+    :param key_list: The unique key of each song
+    :type text_list: list[str]
+    :param text_list: The text of each song
+    :type threshold: float
+    :param threshold: Only similarities above this threshold are kept
+    :return set[tuple[str, str, float]], float: The pairs by song key and how many seconds the update took"""
+    start: float = timeit.default_timer()
+    pair_set: set[tuple[str, str, float]] = set()
+    for _, _, rows, cols, scores in similarity_index.iter_similarities(key_list, text_list, threshold):
+        pair_set.update(zip((key_list[row] for row in rows.tolist()), (key_list[col] for col in cols.tolist()),
+                            scores.round(6).tolist()))
+    return pair_set, timeit.default_timer() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that the similarity index keeps its pairs when it is updated '
+                                                 'with unchanged, deleted and changed songs')
+    parser.add_argument('directory', type=Path, help='Directory to load song files from, recursively')
+    parser.add_argument('--songs', type=int, default=5000, help='How many songs are loaded at most')
+    parser.add_argument('--changed', type=int, default=100, help='How many songs are changed in the last update')
+    parser.add_argument('--threshold', type=float, default=0.3, help='Similarity threshold')
+    args = parser.parse_args()
+
+    song_list = SongLoader().load(sorted(args.directory.rglob('*.sng'))[:args.songs])
+    key_list = [str(song) for song in song_list]
+    text_list = [song.get_text_as_line() for song in song_list]
+    is_consistent: bool = True
+    with tempfile.TemporaryDirectory() as temp_directory:
+        similarity_index = SimilarityIndex(Path(temp_directory) / SimilarityIndex.default_file_name)
+        full_pair_set, seconds = update_index(similarity_index, key_list, text_list, args.threshold)
+        print('full fit:', len(full_pair_set), 'pairs in', round(seconds, 3), 's')
+
+        # Nothing changed, the stored pairs are the result
+        pair_set, seconds = update_index(similarity_index, key_list, text_list, args.threshold)
+        print('unchanged:', len(pair_set), 'pairs in', round(seconds, 3), 's')
+        is_consistent = is_consistent and pair_set == full_pair_set
+
+        # Only deleted songs, their pairs are dropped
+        kept_key_set = set(key_list[args.changed:])
+        pair_set, seconds = update_index(similarity_index, key_list[args.changed:], text_list[args.changed:],
+                                         args.threshold)
+        print('deleted:', len(pair_set), 'pairs in', round(seconds, 3), 's')
+        is_consistent = is_consistent and pair_set == {pair for pair in full_pair_set
+                                                       if pair[0] in kept_key_set and pair[1] in kept_key_set}
+
+        # Changed songs are scored again
+        changed_text_list = [text + ' ' + text_list[-1] for text in text_list[:args.changed]] + \
+            text_list[args.changed:]
+        pair_set, seconds = update_index(similarity_index, key_list, changed_text_list, args.threshold)
+        print('changed:', len(pair_set), 'pairs in', round(seconds, 3), 's')
+        is_consistent = is_consistent and 0 < len(pair_set) and pair_set != full_pair_set
+
+        # Two near identical new songs in words the stored vocabulary doesn't contain are still paired
+        unseen_text = ' '.join('unseen' + 'abcdefghij'[i % 10] + 'abcdefghij'[i // 10] for i in range(100))
+        unseen_key_list = key_list + ['unseen_a', 'unseen_b']
+        pair_set, seconds = update_index(similarity_index, unseen_key_list,
+                                         changed_text_list + [unseen_text, unseen_text + ' ' + unseen_text[:40]],
+                                         args.threshold)
+        print('unseen words:', len(pair_set), 'pairs in', round(seconds, 3), 's, unseen word share',
+              round(similarity_index.last_unseen_word_share, 3), ', full refit', similarity_index.last_update_was_full)
+        is_consistent = is_consistent and any({key_a, key_b} == {'unseen_a', 'unseen_b'}
+                                              for key_a, key_b, _ in pair_set)
+
+    if not is_consistent:
+        print('The index lost or invented pairs', file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,57 @@
+import argparse
+import random
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from Song import Song
+
+
+def build_song_text_list_list(song_count, lines_per_song=24, words_per_line=6, seed=0):
+    """Build random song lines for in memory songs
+    :type song_count: int
+    :param song_count: How many songs to build
+    :type lines_per_song: int
+    :param lines_per_song: How many lines each song has
+    :type words_per_line: int
+    :param words_per_line: How many words each line has
+    :type seed: int
+    :param seed: Seed for the random generator
+    :return list[list[str]]: The song lines of each song"""
+    random_generator = random.Random(seed)
+    word_list = ["Herr", "Gott", "Gnade", "Liebe", "Licht", "Himmel", "Erde", "Frieden", "Freude", "singen", "loben",
+                 "preisen", "Herz", "Seele", "ewig", "heilig", "Jesus", "Christus", "Kreuz", "Leben", "Hoffnung"]
+    return [[' '.join(random_generator.choice(word_list) for _ in range(words_per_line))
+             for _ in range(lines_per_song)] for _ in range(song_count)]
+
+
+def measure_songs(song_text_list_list):
+    """Measure memory and text access time of song objects
+    :type song_text_list_list: list[list[str]]
+    :param song_text_list_list: The song lines of each song
+    :return dict[str, float]: The measured values"""
+    tracemalloc.start()
+    # Decode the song lines like reading them from a file would, so each song owns its lines
+    song_list = [Song(Path('song' + str(i) + '.sng'), [line.encode().decode() for line in song_text_list])
+                 for i, song_text_list in enumerate(song_text_list_list)]
+    song_memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    text_time: float = timeit.timeit(lambda: [song.get_text_as_line() for song in song_list], number=3) / 3
+    return {
+        'songs': len(song_list),
+        'bytes_per_song': song_memory / len(song_list),
+        'total_mib': song_memory / 1024 / 1024,
+        'get_text_as_line_ms': text_time * 1000,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the memory used by song objects')
+    parser.add_argument('--songs', type=int, default=20000, help='How many songs to create')
+    parser.add_argument('--lines', type=int, default=24, help='How many lines each song has')
+    args = parser.parse_args()
+
+    result = measure_songs(build_song_text_list_list(args.songs, args.lines))
+    for key, value in result.items():
+        print(key + ':', round(value, 2))
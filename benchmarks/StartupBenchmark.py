@@ -0,0 +1,32 @@
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Measures the import time and the heavy libraries an import pulls in, run in a fresh interpreter
+_measure_code = '''
+import sys, timeit
+timer_start = timeit.default_timer()
+import {module}
+print(timeit.default_timer() - timer_start)
+print(' '.join(name for name in ('PySide6', 'numpy', 'scipy', 'sklearn', 'networkx', 'pandas') if name in sys.modules))
+'''
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure how long importing the entry points takes')
+    parser.add_argument('--modules', nargs='+', default=['gui.SimilaritiesWindow', 'SimilarityFinder', 'Scanner'],
+                        help='Modules to import')
+    parser.add_argument('--repeat', type=int, default=5, help='How often each import is measured')
+    args = parser.parse_args()
+
+    repository_dir = Path(__file__).resolve().parent.parent
+    for module in args.modules:
+        seconds_list: list[float] = []
+        loaded_libraries: str = ''
+        for _ in range(args.repeat):
+            output = subprocess.run([sys.executable, '-c', _measure_code.format(module=module)], cwd=repository_dir,
+                                    capture_output=True, text=True, check=True).stdout.splitlines()
+            seconds_list.append(float(output[0]))
+            loaded_libraries = output[1] if 1 < len(output) else ''
+        print(module + ':', round(statistics.median(seconds_list), 3), 's, loads', loaded_libraries or 'nothing heavy')
@@ -0,0 +1,99 @@
+import argparse
+import gc
+import random
+import sys
+import timeit
+from functools import partial
+from pathlib import Path
+
+from Song import Song
+from Subscribable import Subscribable
+
+
+class ReviewWindow:
+    def __init__(self, song_list, unsubscribe_on_close):
+        """Stand in for a song similarity window, which follows the marks of its songs like the real one does
+        :type song_list: list[Song]
+        :param song_list: The songs shown in the window
+        :type unsubscribe_on_close: bool
+        :param unsubscribe_on_close: Whether closing the window unsubscribes, otherwise the window is only dropped"""
+        self._unsubscribe_on_close: bool = unsubscribe_on_close
+        self.update_count: int = 0
+        self._subscription_list = [song.subscribe(Song.UPDATED, partial(self._song_updated, song_num))
+                                   for song_num, song in enumerate(song_list)]
+
+    def _song_updated(self, song_num, song):
+        """Count the updates, like recoloring a button"""
+        self.update_count += 1
+
+    def close(self):
+        """Close the window"""
+        if self._unsubscribe_on_close:
+            for subscription in self._subscription_list:
+                subscription.unsubscribe()
+
+
+def run_session(song_count, window_count, group_size, unsubscribe_on_close, seed=0):
+    """Simulate a long review session, windows of similar songs are opened, songs are marked and windows are closed
+    :type song_count: int
+    :param song_count: How many songs are loaded
+    :type window_count: int
+    :param window_count: How many windows are opened during the session
+    :type group_size: int
+    :param group_size: How many songs each window shows
+    :type unsubscribe_on_close: bool
+    :param unsubscribe_on_close: Whether windows unsubscribe when they are closed
+    :type seed: int
+    :param seed: Seed for the random generator
+    :return dict[str, float]: The measured values"""
+    random_generator = random.Random(seed)
+    song_list = [Song(Path('song' + str(i) + '.sng'), ['Herr Gott']) for i in range(song_count)]
+    # Review the most similar groups over and over, like a user going back and forth
+    group_list = [song_list[group_num * group_size:(group_num + 1) * group_size] for group_num in range(10)]
+    max_subscription_count: int = 0
+    update_count: int = 0
+    start: float = timeit.default_timer()
+    for _ in range(window_count):
+        similar_songs_list = random_generator.choice(group_list)
+        window = ReviewWindow(similar_songs_list, unsubscribe_on_close)
+        max_subscription_count = max(max_subscription_count, max(song.get_subscription_count(Song.UPDATED)
+                                                                 for song in similar_songs_list))
+        # Delete all but the first song, which changes its mark twice but is only updated once
+        with Subscribable.coalesced(Song.UPDATED):
+            for song in similar_songs_list:
+                song.mark_for_deleting()
+            similar_songs_list[0].mark_for_keeping()
+        update_count += window.update_count
+        window.close()
+        del window
+    duration: float = timeit.default_timer() - start
+    gc.collect()
+    return {
+        'windows': window_count,
+        'max_callbacks_per_song': max_subscription_count,
+        'callbacks_left': sum(song.get_subscription_count(Song.UPDATED) for song in song_list),
+        'updates_per_window': update_count / window_count,
+        'ms_per_window': duration / window_count * 1000,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Check that song subscriptions stay bounded over a long review '
+                                                 'session')
+    parser.add_argument('--songs', type=int, default=1000, help='How many songs are loaded')
+    parser.add_argument('--windows', type=int, default=20000, help='How many windows are opened')
+    parser.add_argument('--group-size', type=int, default=5, help='How many songs each window shows')
+    args = parser.parse_args()
+
+    is_bounded: bool = True
+    for unsubscribe in (True, False):
+        result = run_session(args.songs, args.windows, args.group_size, unsubscribe)
+        print('unsubscribe on close' if unsubscribe else 'only dropped')
+        for key, value in result.items():
+            print('  ' + key + ':', round(value, 3))
+        # Each song may only hold the callback of the window currently open
+        is_bounded = (is_bounded and result['max_callbacks_per_song'] <= 1 and 0 == result['callbacks_left'] and
+                      args.group_size == result['updates_per_window'])
+    if not is_bounded:
+        print('Subscriptions are not bounded', file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,33 @@
+import argparse
+import timeit
+import tracemalloc
+from pathlib import Path
+
+from SongLoader import SongLoader
+from SongVectorizer import SongVectorizer
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time the vectorizer backends and measure their peak memory')
+    parser.add_argument('directory', type=Path, help='Directory to load song files from, recursively')
+    parser.add_argument('--backends', nargs='+', default=list(SongVectorizer.BACKENDS), help='Backends to try')
+    args = parser.parse_args()
+
+    song_list = SongLoader().load(sorted(args.directory.rglob('*.sng')))
+    text_list = [song.get_text_as_line() for song in song_list]
+    for backend in args.backends:
+        vectorizer = SongVectorizer(backend)
+        timer_start = timeit.default_timer()
+        vectorizer.fit(text_list)
+        fit_seconds = timeit.default_timer() - timer_start
+        timer_start = timeit.default_timer()
+        matrix = vectorizer.transform(text_list)
+        transform_seconds = timeit.default_timer() - timer_start
+        # Tracing allocations slows everything down, so memory is measured in a separate run
+        tracemalloc.start()
+        SongVectorizer(backend).fit_transform(text_list)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(backend + ':', 'fit', round(fit_seconds, 3), 's,',
+              'transform', round(len(text_list) / max(transform_seconds, 1e-9)), 'songs/s,',
+              'peak memory', round(peak_memory / 2 ** 20, 1), 'MiB,',
+              'features', matrix.shape[1], 'non zeros', matrix.nnz)
@@ -2,7 +2,10 @@ from pathlib import Path
 
 from PySide6.QtWidgets import QWidget, QFileDialog
 
+from ProgressTracker import ProgressTracker
 from Song import Song
+from SongCache import SongCache
+from SongLoader import SongLoader
 from gui.ProgressBar import ProgressBar
 
 
@@ -16,10 +19,13 @@ class LoadSongsDialog(QFileDialog):
         # Setup dialog
         super().__init__(parent, 'SongBeamer Files', filter='SongBeamer Files (*.sng)')
         self._progress_bar: ProgressBar = progress_bar
+        self._song_loader: SongLoader = SongLoader()
         #self.setWindowModality(Qt.ApplicationModal)
 
-    def get_songs_by_dir(self):
+    def get_songs_by_dir(self, progress_tracker=None):
         """Let the user select a directory to load songs from, recursively
+        :type progress_tracker: ProgressTracker | None
+        :param progress_tracker: Tracks the loading as its 'load' stage, None reports to the progress bar directly
         :return List[Song]: All selected song files"""
         self.setFileMode(QFileDialog.Directory)
         self.setOption(QFileDialog.DontUseNativeDialog, True)
@@ -29,55 +35,46 @@ class LoadSongsDialog(QFileDialog):
             return []
         working_dir = Path(self.selectedFiles()[0])
         song_file_list = list(working_dir.rglob("*.sng"))
-        return self._load_song_file_list(song_file_list)
+        return self._load_song_file_list(song_file_list, working_dir, progress_tracker, True)
 
-    def get_songs_by_file(self):
+    def get_songs_by_file(self, progress_tracker=None):
         """Let the user select specific song files to load
+        :type progress_tracker: ProgressTracker | None
+        :param progress_tracker: Tracks the loading as its 'load' stage, None reports to the progress bar directly
         :return List[Song]: All selected song files"""
         self.setFileMode(QFileDialog.ExistingFiles)
         # Make sure files have been selected
         if not self.exec_():
             return []
         song_file_list = self.selectedFiles()
-        return self._load_song_file_list(song_file_list)
+        return self._load_song_file_list(song_file_list, Path(song_file_list[0]).parent, progress_tracker)
 
-    def _load_song_file_list(self, song_file_list):
+    def _load_song_file_list(self, song_file_list, library_dir, progress_tracker, is_whole_library=False):
         """Load song objects for the given list of song files
         :type song_file_list: List[str | Path]
         :param song_file_list: The list of song files to load
+        :type library_dir: Path
+        :param library_dir: The directory the song cache is stored in
+        :type progress_tracker: ProgressTracker | None
+        :param progress_tracker: Tracks the loading as its 'load' stage
+        :type is_whole_library: bool
+        :param is_whole_library: Whether these are all song files of the library, cached song files missing from it
+            are removed from the cache
         :return List[Song]: The list of loaded song objects"""
-        song_object_list = []
-        song_file: str
-        song_count: int = len(song_file_list)
-        songs_loaded: int = 0
-        prev_percentage_done: float = 0
-        self._progress_bar.set_progress.emit(prev_percentage_done)
+        is_own_tracker: bool = progress_tracker is None
+        if is_own_tracker:
+            progress_tracker = ProgressTracker({'load': 1}, self._progress_bar.set_progress.emit)
+        progress_tracker.start_stage('load', len(song_file_list))
 
-        for song_file in song_file_list:
-            songs_loaded += 1
-            # Convert the song file to a path object if necessary
-            if type(song_file) == str:
-                song_path = Path(song_file)
-            else:
-                song_path = song_file
-            # Load song objects from song files
-            song = Song(song_path)
-            # Only keep valid song objects
-            if not song.valid:
-                continue
-            song_object_list.append(song)
-
-            # Calculate progress
-            percentage_done: float = songs_loaded / song_count
-            percentage_done_nice: float = round(percentage_done * 100, 2)
-            if prev_percentage_done != percentage_done_nice:
-                prev_percentage_done = percentage_done_nice
-                # Command line output
-                if self._progress_bar is None:
-                    print(percentage_done_nice, '%')
-                # Gui progress bar
-                else:
-                    self._progress_bar.set_progress.emit(percentage_done_nice)
-        self._progress_bar.set_progress.emit(100)
+        # Load song objects from song files
+        song_cache: SongCache = SongCache(library_dir / SongCache.default_file_name)
+        try:
+            song_object_list = self._song_loader.load(song_file_list, progress_tracker.update, song_cache)
+            if is_whole_library:
+                song_cache.remove_others(song_file_list)
+        finally:
+            song_cache.close()
+        if is_own_tracker:
+            progress_tracker.finish()
         # Return collected song objects
         return song_object_list
@@ -1,7 +1,5 @@
 import sys
-from math import floor
 from threading import Thread
-from time import sleep
 from typing import List
 
 from PySide6.QtCore import Signal
@@ -9,15 +7,19 @@ from PySide6.QtGui import QAction
 from PySide6.QtWidgets import (QWidget, QPushButton, QMainWindow, QScrollArea, QVBoxLayout, QApplication)
 
 from LoadedSongs import LoadedSongs
+from ProgressTracker import ProgressTracker
 from Song import Song
 from gui.LoadSongsDialog import LoadSongsDialog
-from gui.OrderableListItem import LoadedSongListItem
-from gui.OrderableListWidget import OrderableListWidget
+from gui.OrderableListModel import LoadedSongListModel
+from gui.OrderableListView import OrderableListView
 from gui.ProgressBar import ProgressBar
 from gui.SongDetailsDialog import SongDetailsDialog
 
 
 class LoadedSongsWindow(QMainWindow):
+    """How much of loading songs is spent reading the files and adding them to the list"""
+    _load_stage_weights = {'load': 0.5, 'add': 0.5}
+
     def __init__(self, loaded_songs_list):
         """Show and modify the list of all loaded songs
         :type loaded_songs_list: LoadedSongs
@@ -27,18 +29,22 @@ class LoadedSongsWindow(QMainWindow):
         # Main layout
         self.resize(450, 600)
         self.setWindowTitle("Loaded Songs")
-        self._list_widget = OrderableListWidget()
-        self.setCentralWidget(self._list_widget)
+        self._list_model: LoadedSongListModel = LoadedSongListModel()
+        self._list_view: OrderableListView = OrderableListView(self._list_model)
+        self._list_view.item_clicked.connect(self._show_details_dialog)
+        self.setCentralWidget(self._list_view)
 
         # Setup parameters
         self._song_list: LoadedSongs = loaded_songs_list
         self._song_list.subscribe(LoadedSongs.ADDED, self._song_added)
+        self._song_list.subscribe(LoadedSongs.ADDED_BATCH, self._songs_added)
         self._song_list.subscribe(LoadedSongs.DELETED, self._song_deleted)
-        self._song_gui_list: dict[Song: QWidget] = {}
+        self._song_list.subscribe(LoadedSongs.DELETED_BATCH, self._songs_deleted)
         self._progress_bar = ProgressBar()
         self._load_songs_dialog = LoadSongsDialog(self, self._progress_bar)
 
-        self._signal_song_added.connect(self._song_added_function)
+        self._signal_songs_added.connect(self._songs_added_function)
+        self._signal_songs_deleted.connect(self._songs_deleted_function)
 
         # Setup gui
         self._create_menu_bar()
@@ -64,62 +70,65 @@ class LoadedSongsWindow(QMainWindow):
 
     def _do_load_songs_gui_action(self):
         """Show a popup dialog to select songs to load"""
-        song_list = self._load_songs_dialog.get_songs_by_file()
-        thread: Thread = Thread(target=self._add_song_list, args=(song_list,))
+        progress_tracker = ProgressTracker(self._load_stage_weights, self._progress_bar.set_progress.emit)
+        song_list = self._load_songs_dialog.get_songs_by_file(progress_tracker)
+        thread: Thread = Thread(target=self._add_song_list, args=(song_list, progress_tracker))
         thread.start()
 
     def _do_load_song_dir_gui_action(self):
         """Show a popup dialog to select songs to load"""
-        song_list = self._load_songs_dialog.get_songs_by_dir()
-        thread: Thread = Thread(target=self._add_song_list, args=(song_list,))
+        progress_tracker = ProgressTracker(self._load_stage_weights, self._progress_bar.set_progress.emit)
+        song_list = self._load_songs_dialog.get_songs_by_dir(progress_tracker)
+        thread: Thread = Thread(target=self._add_song_list, args=(song_list, progress_tracker))
         thread.start()
 
-    def _add_song_list(self, song_list):
+    def _add_song_list(self, song_list, progress_tracker):
         """Add a list of new songs to the list
         :type song_list: list[Song]
-        :param song_list: The list of songs to add"""
-        # Setup parameters
-        song: Song
-        total_song_count: int = len(song_list)
-        song_num: int = 0
-        prev_percentage_done: float = 0
-        self._progress_bar.startTimer()
-        self._progress_bar.set_progress.emit(prev_percentage_done)
-        # Load songs
-        for song in song_list:
-            self._song_list.add(song)
-            song_num += 1
-            percentage_done = floor(song_num / total_song_count * 100)
-            if prev_percentage_done != percentage_done:
-                prev_percentage_done = percentage_done
-                self._progress_bar.set_progress.emit(percentage_done)
-            # Take a break here and there to let the gui catch up
-            if 0 == song_num % 100:
-                sleep(1)
-        self._progress_bar.set_progress.emit(100)
+        :param song_list: The list of songs to add
+        :type progress_tracker: ProgressTracker
+        :param progress_tracker: Tracks adding the songs as its 'add' stage"""
+        progress_tracker.start_stage('add', len(song_list))
+        # The gui gets the songs in batches, so it keeps up without slowing down loading
+        self._song_list.add_many(song_list, progress_tracker.update)
+        progress_tracker.finish()
 
     def _song_added(self, song):
-        self._signal_song_added.emit(song)
+        self._signal_songs_added.emit([song])
 
-    _signal_song_added: Signal = Signal(Song)
+    def _songs_added(self, song_list):
+        self._signal_songs_added.emit(song_list)
 
-    def _song_added_function(self, song):
-        """Add a new song was added to the list
-        :type song: Song
-        :param song: The song that was added"""
-        # Add to gui
-        list_item: LoadedSongListItem = LoadedSongListItem(song)
-        self._list_widget.add(list_item)
-        self._song_gui_list[song] = list_item
+    _signal_songs_added: Signal = Signal(list)
+
+    def _songs_added_function(self, song_list):
+        """New songs were added to the list
+        :type song_list: list[Song]
+        :param song_list: The songs that were added"""
+        # Add to gui, songs may have been unloaded again before the signal arrived
+        self._list_model.add_items([song for song in song_list if song.valid])
 
     def _song_deleted(self, song):
-        """A song was deleted from the list
-        :type song: Song
-        :param song: The song that was deleted"""
+        self._signal_songs_deleted.emit([song])
+
+    def _songs_deleted(self, song_dict):
+        self._signal_songs_deleted.emit(list(song_dict.values()))
+
+    _signal_songs_deleted: Signal = Signal(list)
+
+    def _songs_deleted_function(self, song_list):
+        """Songs were deleted from the list
+        :type song_list: list[Song]
+        :param song_list: The songs that were deleted"""
         # Remove from gui
-        list_item: LoadedSongListItem = self._song_gui_list[song]
-        self._song_gui_list.pop(song)
-        self._list_widget.delete_item(list_item)
+        self._list_model.remove_items(song_list)
+
+    def _show_details_dialog(self, song):
+        """Show a songs details
+        :type song: Song
+        :param song: The clicked song"""
+        details_gui = SongDetailsDialog(song, self, song.unload)
+        details_gui.show()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,310 @@
+from abc import abstractmethod
+from bisect import bisect_left
+from itertools import count
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+from PySide6.QtGui import QColor
+
+from SimilarityPairs import SimilarityPairs
+from Song import Song
+from Subscribable import Subscription
+
+
+class OrderableListModel(QAbstractListModel):
+    """Hands out tie breakers, so items with the same order string keep the order they were added in"""
+    _tie_breaker_counter = count()
+
+    def __init__(self, order_asc=True):
+        """Sorted list of items for a list view, which only creates what is visible
+        :type order_asc: bool
+        :param order_asc: Whether to order the list ascending"""
+        super().__init__()
+        self._order_asc: bool = order_asc
+        # Sort keys and items by row, the sort key of each item by the items object id
+        self._key_list: list[tuple[str, int]] = []
+        self._item_list: list = []
+        self._key_dict: dict[int, tuple[str, int]] = {}
+
+    @abstractmethod
+    def _get_order_string(self, item):
+        """Get the string an item is ordered by
+        :param item: The item to order
+        :return str: The string to order the item by"""
+        return ''
+
+    @abstractmethod
+    def _get_text(self, item):
+        """Get the text shown for an item
+        :param item: The item to show
+        :return str: The items text"""
+        return ''
+
+    def _get_color(self, item):
+        """Get the background color of an item
+        :param item: The item to show
+        :return QColor | None: The items background color, None for the default color"""
+        return None
+
+    def _get_key(self, item):
+        """Get the key an item is sorted by
+        :param item: The item to sort
+        :return tuple[str, int]: The items sort key"""
+        order_string: str = self._get_order_string(item)
+        tie_breaker: int = next(self._tie_breaker_counter)
+        if self._order_asc:
+            return order_string, tie_breaker
+        # Invert each character, so descending order is ascending order of the inverted strings
+        return ''.join(chr(0x10FFFF - ord(character)) for character in order_string) + chr(0x10FFFF), tie_breaker
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._item_list)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._item_list):
+            return None
+        item = self._item_list[index.row()]
+        # Songs may have been unloaded since they were added
+        try:
+            if Qt.DisplayRole == role:
+                return self._get_text(item)
+            elif Qt.BackgroundRole == role:
+                return self._get_color(item)
+        except ReferenceError:
+            return None
+        return None
+
+    def get_item(self, row):
+        """Get the item shown in a row
+        :type row: int
+        :param row: The row
+        :return: The rows item"""
+        return self._item_list[row]
+
+    def get_row(self, item):
+        """Get the row an item is shown in
+        :param item: The item to look up
+        :return int | None: The items row, None if the item is not in the list"""
+        key = self._key_dict.get(id(item))
+        if key is None:
+            return None
+        return bisect_left(self._key_list, key)
+
+    def add(self, item):
+        """Add a new item at its sorted position, items are only added once
+        :param item: The item to add"""
+        if id(item) in self._key_dict:
+            return
+        key = self._get_key(item)
+        row: int = bisect_left(self._key_list, key)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._key_list.insert(row, key)
+        self._item_list.insert(row, item)
+        self._key_dict[id(item)] = key
+        self.endInsertRows()
+
+    def add_items(self, item_list):
+        """Add new items at their sorted positions, neighbouring new items are inserted as one block of rows
+        :type item_list: list
+        :param item_list: The items to add, items already in the list are skipped"""
+        keyed_item_list: list[tuple[tuple[str, int], object]] = []
+        for item in item_list:
+            if id(item) not in self._key_dict:
+                self._key_dict[id(item)] = None
+                keyed_item_list.append((self._get_key(item), item))
+        keyed_item_list.sort(key=lambda entry: entry[0])
+        # New items sorted in between the same two old items are inserted as one block
+        row: int = 0
+        block_start: int = 0
+        while block_start < len(keyed_item_list):
+            row = bisect_left(self._key_list, keyed_item_list[block_start][0], row)
+            next_old_key = self._key_list[row] if row < len(self._key_list) else None
+            block_end: int = block_start + 1
+            while block_end < len(keyed_item_list) and (next_old_key is None or
+                                                         keyed_item_list[block_end][0] < next_old_key):
+                block_end += 1
+            block = keyed_item_list[block_start:block_end]
+            self.beginInsertRows(QModelIndex(), row, row + len(block) - 1)
+            self._key_list[row:row] = [key for key, _ in block]
+            self._item_list[row:row] = [item for _, item in block]
+            for key, item in block:
+                self._key_dict[id(item)] = key
+            self.endInsertRows()
+            row += len(block)
+            block_start = block_end
+
+    def set_items(self, item_list):
+        """Replace all items at once, which is much faster than adding them one by one
+        :type item_list: list
+        :param item_list: The new items"""
+        self.beginResetModel()
+        keyed_item_list = sorted(((self._get_key(item), item) for item in item_list), key=lambda entry: entry[0])
+        self._key_list = [key for key, _ in keyed_item_list]
+        self._item_list = [item for _, item in keyed_item_list]
+        self._key_dict = {id(item): key for key, item in keyed_item_list}
+        self.endResetModel()
+
+    def remove(self, item):
+        """Remove an item
+        :param item: The item to remove"""
+        row = self.get_row(item)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._key_list[row]
+        del self._item_list[row]
+        del self._key_dict[id(item)]
+        self.endRemoveRows()
+
+    def remove_items(self, item_list):
+        """Remove items, neighbouring rows are removed as one block
+        :type item_list: list
+        :param item_list: The items to remove, items not in the list are skipped"""
+        row_list: list[int] = sorted({row for row in map(self.get_row, item_list) if row is not None}, reverse=True)
+        block_start: int = 0
+        while block_start < len(row_list):
+            # Rows are sorted descending, so a block ends where the next row is not directly above
+            block_end: int = block_start + 1
+            while block_end < len(row_list) and row_list[block_end] == row_list[block_end - 1] - 1:
+                block_end += 1
+            first_row: int = row_list[block_end - 1]
+            last_row: int = row_list[block_start]
+            self.beginRemoveRows(QModelIndex(), first_row, last_row)
+            for item in self._item_list[first_row:last_row + 1]:
+                del self._key_dict[id(item)]
+            del self._key_list[first_row:last_row + 1]
+            del self._item_list[first_row:last_row + 1]
+            self.endRemoveRows()
+            block_start = block_end
+
+    def update(self, item):
+        """Show the items current text and color
+        :param item: The item that changed"""
+        row = self.get_row(item)
+        if row is not None:
+            model_index = self.index(row)
+            self.dataChanged.emit(model_index, model_index, [Qt.DisplayRole, Qt.BackgroundRole])
+
+
+class LoadedSongListModel(OrderableListModel):
+    def _get_order_string(self, song):
+        """Get the song title the song is ordered by
+        :type song: Song
+        :param song: The song to order
+        :return str: The song title"""
+        return song.get_name().lower()
+
+    def _get_text(self, song):
+        """Get the text shown for a song
+        :type song: Song
+        :param song: The song to show
+        :return str: The songs name"""
+        return song.get_name()
+
+
+class SongSimilarityListModel(OrderableListModel):
+    """Background colors of groups with all songs marked and with unmarked songs"""
+    _marked_color = QColor('green')
+    _unmarked_color = QColor('gray')
+
+    def __init__(self, order_asc=True):
+        """Sorted list of groups of similar songs
+        :type order_asc: bool
+        :param order_asc: Whether to order the list ascending"""
+        super().__init__(order_asc)
+        self._similarity_scores: SimilarityPairs = SimilarityPairs([], [], [], [])
+        # The groups of each song by the songs object id, to recolor them when a song is marked
+        self._song_group_dict: dict[int, list[list[Song]]] = {}
+        self._subscription_dict: dict[int, Subscription] = {}
+        # Provisional groups by the id their stream gave them
+        self._streamed_group_dict: dict[int, list[Song]] = {}
+
+    def set_similarities(self, similarities, similarity_scores):
+        """Show new groups of similar songs
+        :type similarities: list[list[Song]]
+        :param similarities: All groups of similar songs
+        :type similarity_scores: SimilarityPairs
+        :param similarity_scores: The similarity scores for each song pair"""
+        self._similarity_scores = similarity_scores
+        self._song_group_dict = {}
+        self._streamed_group_dict = {}
+        song_dict: dict[int, Song] = {}
+        for similar_songs_list in similarities:
+            for song in similar_songs_list:
+                self._song_group_dict.setdefault(id(song), []).append(similar_songs_list)
+                song_dict[id(song)] = song
+        # Songs no longer shown are unsubscribed, shown ones are only subscribed to once
+        for song_id in [song_id for song_id in self._subscription_dict if song_id not in song_dict]:
+            self._subscription_dict.pop(song_id).unsubscribe()
+        for song_id, song in song_dict.items():
+            if song_id not in self._subscription_dict:
+                self._subscription_dict[song_id] = song.subscribe(Song.UPDATED, self._song_updated)
+        self.set_items(similarities)
+
+    def merge_streamed_groups(self, removed_group_ids, changed_group_dict, similarity_scores):
+        """Show the changes of provisional groups, while the similarities are still being calculated
+        :type removed_group_ids: list[int]
+        :param removed_group_ids: Ids of groups that are not shown anymore
+        :type changed_group_dict: dict[int, list[Song]]
+        :param changed_group_dict: The songs of each new or changed group by its id
+        :type similarity_scores: SimilarityPairs
+        :param similarity_scores: The similarity scores for each song pair found so far"""
+        self._similarity_scores = similarity_scores
+        old_group_list: list[list[Song]] = [self._streamed_group_dict.pop(group_id) for group_id in
+                                            (*removed_group_ids, *changed_group_dict.keys())
+                                            if group_id in self._streamed_group_dict]
+        old_group_id_set: set[int] = {id(similar_songs_list) for similar_songs_list in old_group_list}
+        for similar_songs_list in old_group_list:
+            for song in similar_songs_list:
+                song_group_list: list[list[Song]] = [group for group in self._song_group_dict.pop(id(song), [])
+                                                     if id(group) not in old_group_id_set]
+                if song_group_list:
+                    self._song_group_dict[id(song)] = song_group_list
+                elif id(song) in self._subscription_dict:
+                    self._subscription_dict.pop(id(song)).unsubscribe()
+        self.remove_items(old_group_list)
+        # Changed groups are shown as new lists, so their rows are sorted again
+        for group_id, similar_songs_list in changed_group_dict.items():
+            self._streamed_group_dict[group_id] = similar_songs_list
+            for song in similar_songs_list:
+                self._song_group_dict.setdefault(id(song), []).append(similar_songs_list)
+                if id(song) not in self._subscription_dict:
+                    self._subscription_dict[id(song)] = song.subscribe(Song.UPDATED, self._song_updated)
+        self.add_items(list(changed_group_dict.values()))
+
+    def _song_updated(self, song):
+        """Recolor all groups of a song that was marked
+        :type song: Song
+        :param song: The song that changed"""
+        for similar_songs_list in self._song_group_dict.get(id(song), []):
+            self.update(similar_songs_list)
+
+    def get_similarity_scores(self):
+        """Get the similarity scores of the shown groups
+        :return SimilarityPairs: The similarity scores for each song pair"""
+        return self._similarity_scores
+
+    def _get_order_string(self, similar_songs_list):
+        """Get the song title the group is ordered by
+        :type similar_songs_list: list[Song]
+        :param similar_songs_list: A group of similar songs
+        :return str: The first songs title"""
+        return similar_songs_list[0].get_name().lower()
+
+    def _get_text(self, similar_songs_list):
+        """Get the text shown for a group
+        :type similar_songs_list: list[Song]
+        :param similar_songs_list: A group of similar songs
+        :return str: The first songs name and the groups size"""
+        return similar_songs_list[0].get_name() + '(' + str(len(similar_songs_list)) + ')'
+
+    def _get_color(self, similar_songs_list):
+        """Get the background color of a group
+        :type similar_songs_list: list[Song]
+        :param similar_songs_list: A group of similar songs
+        :return QColor: Green if all songs are marked for keeping or deleting, gray otherwise"""
+        for song in similar_songs_list:
+            if not song.is_marked_for_keeping() and not song.is_marked_for_deleting():
+                return self._unmarked_color
+        return self._marked_color
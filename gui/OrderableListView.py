@@ -0,0 +1,59 @@
+from PySide6.QtCore import Qt, Signal, QSize
+from PySide6.QtWidgets import QListView, QStyledItemDelegate, QStyleOptionButton, QStyle, QApplication, QAbstractItemView
+
+from gui.OrderableListModel import OrderableListModel
+
+
+class ButtonItemDelegate(QStyledItemDelegate):
+    """Space around each button"""
+    _margin = 2
+
+    def paint(self, painter, option, index):
+        """Paint a row as a push button, colored by the models background color"""
+        button_option = QStyleOptionButton()
+        button_option.rect = option.rect.adjusted(self._margin, self._margin, -self._margin, -self._margin)
+        button_option.text = index.data(Qt.DisplayRole) or ''
+        button_option.state = option.state | QStyle.State_Enabled | QStyle.State_Raised
+        background_color = index.data(Qt.BackgroundRole)
+        if background_color is not None:
+            painter.fillRect(button_option.rect, background_color)
+            button_option.state |= QStyle.State_On
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        style.drawControl(QStyle.CE_PushButtonLabel if background_color is not None else QStyle.CE_PushButton,
+                          button_option, painter, option.widget)
+
+    def sizeHint(self, option, index):
+        """All rows have the size of a push button"""
+        button_option = QStyleOptionButton()
+        button_option.text = index.data(Qt.DisplayRole) or ''
+        style = option.widget.style() if option.widget is not None else QApplication.style()
+        text_size: QSize = option.fontMetrics.size(Qt.TextSingleLine, button_option.text)
+        size: QSize = style.sizeFromContents(QStyle.CT_PushButton, button_option, text_size, option.widget)
+        return QSize(size.width(), size.height() + 2 * self._margin)
+
+
+class OrderableListView(QListView):
+    """An item was clicked"""
+    item_clicked: Signal = Signal(object)
+
+    def __init__(self, model):
+        """Show an orderable list model as a list of buttons. Only the visible rows are painted, so even very long
+        lists stay fast
+        :type model: OrderableListModel
+        :param model: The items to show"""
+        super().__init__()
+        self._item_delegate: ButtonItemDelegate = ButtonItemDelegate(self)
+        self.setItemDelegate(self._item_delegate)
+        # All rows have the same height, so the view does not have to measure every row
+        self.setUniformItemSizes(True)
+        self.setSelectionMode(QAbstractItemView.NoSelection)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setModel(model)
+        self.clicked.connect(self._row_clicked)
+
+    def _row_clicked(self, index):
+        """Pass the clicked item on
+        :type index: QModelIndex
+        :param index: The clicked rows index"""
+        model: OrderableListModel = self.model()
+        self.item_clicked.emit(model.get_item(index.row()))
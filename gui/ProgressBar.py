@@ -1,5 +1,4 @@
 import math
-import timeit
 
 from PySide6.QtWidgets import (QLabel, QProgressBar, QHBoxLayout, QWidget, QVBoxLayout, QSizePolicy)
 from PySide6.QtCore import Signal
@@ -7,8 +6,8 @@ from time import sleep
 
 
 class ProgressBar(QWidget):
-    # Incoming progress updates
-    set_progress = Signal(int)
+    # Incoming progress updates with the percentage done, seconds elapsed and estimated seconds remaining
+    set_progress = Signal(float, float, object)
 
     def __init__(self, show_time=True):
         """Opens a progress bar widget
@@ -17,7 +16,6 @@ class ProgressBar(QWidget):
         super().__init__()
         # Setup parameters
         self._show_time: bool = show_time
-        self._timer_start: float = 0
 
         # General layout
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
@@ -44,31 +42,21 @@ class ProgressBar(QWidget):
         # noinspection PyUnresolvedReferences
         self.set_progress.connect(self._set_progress)
 
-    def startTimer(self):
-        """Start the internal timer"""
-        self._timer_start = timeit.default_timer()
-
-    def _set_progress(self, percentage_done):
+    def _set_progress(self, percentage_done, seconds_elapsed, seconds_remaining):
         """Handle incoming progress updates
-        :type percentage_done: int
+        :type percentage_done: float
         :param percentage_done: The progress to set, from 0 to 100
-        """
-        self._progress_bar.setValue(percentage_done)
+        :type seconds_elapsed: float
+        :param seconds_elapsed: How long the work has been running
+        :type seconds_remaining: float | None
+        :param seconds_remaining: The estimated time until the work is done, None if there is no estimate yet"""
+        self._progress_bar.setValue(math.floor(percentage_done))
         if self._show_time:
-            time_elapsed, time_remaining = self._get_progress_times(percentage_done)
-            self._time_expired_label.setText("Time elapsed: " + str(time_elapsed) + "s")
-            self._time_left_label.setText("Time remaining: " + str(time_remaining) + "s")
-
-    def _get_progress_times(self, percentage_done):
-        """Get the elapsed and remaining time
-        :type percentage_done: float
-        :param percentage_done: How much progress has been made
-        :return float, float: Time elapsed, Time remaining"""
-        time_elapsed = math.floor(timeit.default_timer() - self._timer_start)
-        if 0 == percentage_done:
-            percentage_done = 1
-        time_remaining = math.floor(time_elapsed * (100 / percentage_done)) - time_elapsed
-        return time_elapsed, time_remaining
+            self._time_expired_label.setText("Time elapsed: " + str(math.floor(seconds_elapsed)) + "s")
+            if seconds_remaining is None:
+                self._time_left_label.setText("Time remaining: unknown")
+            else:
+                self._time_left_label.setText("Time remaining: " + str(math.ceil(seconds_remaining)) + "s")
 
     def close_with_delay(self):
         """Close the progress bar widget with a short delay"""
@@ -1,17 +1,24 @@
+import os
 from functools import partial
-from time import sleep
+from itertools import islice
+from pathlib import Path
 from typing import List
 
 from PySide6.QtCore import Signal
 from PySide6.QtGui import QAction
-from PySide6.QtWidgets import (QWidget, QVBoxLayout, QScrollArea, QMainWindow, QPushButton)
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QScrollArea, QMainWindow, QPushButton, QInputDialog,
+                               QMessageBox)
 
 from LoadedSongs import LoadedSongs
-from SimilarityFinder import SimilarityFinder
+from SimilarityJob import SimilarityJob
+from SimilarityPairs import SimilarityPairs
+from SimilarityStream import SimilarityStream
 from Song import Song
+from SongDiffCache import SongDiffCache
+from Subscribable import Subscription
 from gui.LoadedSongsWindow import LoadedSongsWindow
-from gui.OrderableListItem import SongSimilarityListItem
-from gui.OrderableListWidget import OrderableListWidget
+from gui.OrderableListModel import SongSimilarityListModel
+from gui.OrderableListView import OrderableListView
 from gui.ProgressBar import ProgressBar
 from gui.SongSimilarityWindow import SongSimilarityWindow
 
@@ -19,62 +26,130 @@ from gui.SongSimilarityWindow import SongSimilarityWindow
 class SimilaritiesWindow(QMainWindow):
     """Incoming progress updates"""
     _calculating_similarities_done: Signal = Signal()
+    """A cancelled calculation has stopped"""
+    _calculating_similarities_cancelled: Signal = Signal()
+    """A calculation stopped with an error, with the error message"""
+    _calculating_similarities_failed: Signal = Signal(str)
+    """Incoming batches of similar pairs, while the calculation is still running"""
+    _similarities_found: Signal = Signal()
     """All loaded songs"""
     _loaded_song_list: LoadedSongs
     """Central widget"""
-    centralWidget: OrderableListWidget
+    centralWidget: OrderableListView
+    """How many of the most similar pairs get their diffs calculated in the background"""
+    _precomputed_diff_count = 200
 
     def __init__(self):
         """The main window displaying all song similarities"""
         super().__init__()
 
         # Setup parameters
-        self._similarity_finder: SimilarityFinder
+        # The finder of the shown results, a running calculation only replaces it once it is done
+        self._similarity_finder: SimilarityFinder | None = None
+        self._running_similarity_finder: SimilarityFinder | None = None
+        self._similarity_job: SimilarityJob = SimilarityJob(self._calculating_similarities_cancelled.emit,
+                                                            self._calculating_similarities_failed.emit)
         self._song_similarity_gui_list: List[SongSimilarityWindow] = []
         self._song_gui_list: dict[Song, QPushButton] = {}
         self._loaded_song_list = LoadedSongs()
+        # The similarity index is created with the first calculation, it needs the scientific libraries
+        self._similarity_index: SimilarityIndex | None = None
+        self._similarity_index_subscription_list: list[Subscription] = []
+        self._diff_cache: SongDiffCache = SongDiffCache()
+        self._similarity_model: SongSimilarityListModel = SongSimilarityListModel()
+        # Results of the running calculation, shown before it is done
+        self._similarity_stream: SimilarityStream | None = None
+        self._progress_bar: ProgressBar | None = None
 
         # Setup signal callbacks
         self._calculating_similarities_done.connect(self._do_calculating_similarities_done)
+        self._calculating_similarities_cancelled.connect(self._do_calculating_similarities_cancelled)
+        self._calculating_similarities_failed.connect(self._do_calculating_similarities_failed)
+        self._similarities_found.connect(self._do_similarities_found)
 
         # Setup gui
         self.resize(450, 600)
         self.setWindowTitle("SongBeamer Song Similarity Finder")
         self._create_menu_bar()
-        self._build_similarities_gui([], {})
+        self.centralWidget = OrderableListView(self._similarity_model)
+        self.centralWidget.item_clicked.connect(self._show_similarity_details)
+        self.setCentralWidget(self.centralWidget)
+        self._build_similarities_gui([], SimilarityPairs([], [], [], []))
 
         # Show the page with all loaded songs on startup
         self._loaded_songs_window = LoadedSongsWindow(self._loaded_song_list)
 
     def _do_calculating_similarities_done(self):
         """Handle similarities calculation is done"""
-        if self._similarity_finder is None:
+        if self._running_similarity_finder is None:
             return
+        self._similarity_finder = self._running_similarity_finder
+        # The final groups replace the provisional ones
+        self._stop_calculating_gui()
         # Get the calculated similarities
         similarities, similarity_scores = self._similarity_finder.get_similarities()
         # Display them
         self._build_similarities_gui(similarities, similarity_scores)
+        self._change_threshold_action.setEnabled(True)
+        # Diff windows of the most similar pairs open instantly
+        self._diff_cache.precompute([(song_a, song_b) for song_a, song_b, _ in
+                                     islice(similarity_scores.iter_sorted(), self._precomputed_diff_count)])
+
+    def _do_calculating_similarities_cancelled(self):
+        """Handle a cancelled similarities calculation has stopped, the results shown before are restored"""
+        self._stop_calculating_gui()
+        if self._similarity_finder is None:
+            self._build_similarities_gui([], SimilarityPairs([], [], [], []))
+            return
+        similarities, similarity_scores = self._similarity_finder.get_similarities()
+        self._build_similarities_gui(similarities, similarity_scores)
+        self._change_threshold_action.setEnabled(True)
+
+    def _do_calculating_similarities_failed(self, message):
+        """Handle a similarities calculation stopped with an error, the results shown before are restored
+        :type message: str
+        :param message: The error message"""
+        self._do_calculating_similarities_cancelled()
+        QMessageBox.critical(self, 'Finding similarities failed', message)
+
+    def _stop_calculating_gui(self):
+        """Remove the gui of the running calculation"""
+        self._running_similarity_finder = None
+        self._similarity_stream = None
+        if self._progress_bar is not None:
+            self.statusBar().removeWidget(self._progress_bar)
+            self._progress_bar.deleteLater()
+            self._progress_bar = None
+        self._find_similarities_action.setEnabled(True)
+        self._cancel_similarities_action.setEnabled(False)
 
     def _build_similarities_gui(self, similarities, similarity_scores):
         """Build a gui for a list of similarities
         :type similarities: list[list[Song]]
-        :type similarity_scores: dict[tuple[Song, Song], int]"""
-        # Setup gui
-        self.centralWidget = OrderableListWidget()
-        self.setCentralWidget(self.centralWidget)
+        :type similarity_scores: SimilarityPairs"""
+        # Add all songs to gui at once
+        self._similarity_model.set_similarities(similarities, similarity_scores)
 
-        # Add all songs to gui
-        song: Song
-        similar_songs: list
-        song_num: int = 0
-        for similarity_group in similarities:
-            song_similarity_list_item: SongSimilarityListItem = SongSimilarityListItem(similarity_group,
-                                                                                       similarity_scores)
-            self.centralWidget.add(song_similarity_list_item)
-            song_num += 1
-            # Take a break here and there to let the gui catch up
-            if 0 == song_num % 100:
-                sleep(1)
+    def _do_similarities_found(self):
+        """Show the provisional groups of the pairs found since the last batch"""
+        if self._similarity_stream is None:
+            return
+        removed_group_ids, changed_group_dict = self._similarity_stream.get_update()
+        if removed_group_ids or changed_group_dict:
+            self._similarity_model.merge_streamed_groups(removed_group_ids, changed_group_dict,
+                                                         self._similarity_stream.get_similarity_scores())
+
+    def _show_similarity_details(self, similarity_group):
+        """Show the songs of a group of similar songs
+        :type similarity_group: list[Song]
+        :param similarity_group: The clicked group"""
+        song_similarity_gui: SongSimilarityWindow = SongSimilarityWindow(
+            similarity_group, self._similarity_model.get_similarity_scores(), self._diff_cache)
+        song_similarity_gui.show()
+        song_similarity_gui.activateWindow()
+        # Keep the window open, closed ones can go
+        self._song_similarity_gui_list = [window for window in self._song_similarity_gui_list if window.isVisible()]
+        self._song_similarity_gui_list.append(song_similarity_gui)
 
     def _create_menu_bar(self):
         """Build the windows menu bar"""
@@ -84,13 +159,21 @@ class SimilaritiesWindow(QMainWindow):
         self._show_loaded_songs_action.triggered.connect(self.do_show_loaded_songs_gui_action)
         self._find_similarities_action: QAction = QAction("&Find similarities", self)
         self._find_similarities_action.triggered.connect(self._do_find_similarities_gui_action)
+        self._cancel_similarities_action: QAction = QAction("&Cancel finding", self)
+        self._cancel_similarities_action.triggered.connect(self._do_cancel_similarities_action)
+        self._cancel_similarities_action.setEnabled(False)
         self._apply_marked_song_deleting_action: QAction = QAction("Apply keep or delete", self)
         self._apply_marked_song_deleting_action.triggered.connect(self._do_apply_marked_song_deleting_action)
+        self._change_threshold_action: QAction = QAction("Change &threshold", self)
+        self._change_threshold_action.triggered.connect(self._do_change_threshold_action)
+        self._change_threshold_action.setEnabled(False)
         # Song menu
         songs_menu = menu_bar.addMenu("&Songs")
         songs_menu.addActions([
             self._show_loaded_songs_action,
             self._find_similarities_action,
+            self._cancel_similarities_action,
+            self._change_threshold_action,
             self._apply_marked_song_deleting_action,
         ])
 
@@ -101,21 +184,88 @@ class SimilaritiesWindow(QMainWindow):
 
     def _do_find_similarities_gui_action(self):
         """Calculate the similarities between all currently loaded songs and display them"""
-        progress_bar = ProgressBar()
-        self.setCentralWidget(progress_bar)
-        self._similarity_finder = SimilarityFinder(self._loaded_song_list, progress_bar,
-                                                   self._calculating_similarities_done)
+        # Importing the calculations takes a while, so they are only imported when needed the first time
+        from SimilarityCheckpoint import SimilarityCheckpoint
+        from SimilarityFinder import SimilarityFinder
+        from SimilarityIndex import SimilarityIndex
+
+        # Only one calculation runs at a time, it has to be cancelled to start another one
+        if self._similarity_job.is_running():
+            return
+        # Each library keeps its own index next to its songs, like the song cache
+        index_file: Path = self._get_library_dir() / SimilarityIndex.default_file_name
+        if self._similarity_index is None or self._similarity_index.index_file != index_file:
+            for subscription in self._similarity_index_subscription_list:
+                subscription.unsubscribe()
+            self._similarity_index = SimilarityIndex(index_file)
+            self._similarity_index_subscription_list = [
+                self._loaded_song_list.subscribe(LoadedSongs.DELETED, self._similarity_index.song_deleted),
+                self._loaded_song_list.subscribe(LoadedSongs.DELETED_BATCH, self._similarity_index.songs_deleted)]
+        if self._progress_bar is None:
+            self._progress_bar = ProgressBar()
+            self.statusBar().addPermanentWidget(self._progress_bar)
+        self._change_threshold_action.setEnabled(False)
+        self._find_similarities_action.setEnabled(False)
+        self._cancel_similarities_action.setEnabled(True)
+        # Groups are shown while they are found, the final ones replace them once the calculation is done
+        self._build_similarities_gui([], SimilarityPairs([], [], [], []))
+        self._similarity_stream = SimilarityStream(self._similarities_found.emit)
+        # Qt signals are thread safe, so the calculation thread reports through them. A cancelled or interrupted
+        # calculation continues from its checkpoint next time
+        self._running_similarity_finder = SimilarityFinder(
+            self._loaded_song_list, self._progress_bar.set_progress.emit, self._calculating_similarities_done.emit,
+            workers=None, similarity_index=self._similarity_index, run_in_thread=False,
+            result_stream=self._similarity_stream,
+            checkpoint_directory=Path.home() / SimilarityCheckpoint.default_directory_name)
+        self._similarity_job.start(self._running_similarity_finder)
+
+    def _get_library_dir(self):
+        """Get the directory all loaded songs are in
+        :return Path: The deepest directory containing all loaded song files, the home directory if there is none"""
+        try:
+            return Path(os.path.commonpath([Path(str(song)).parent for song in self._loaded_song_list]))
+        except ValueError:
+            # No songs are loaded or they are on different drives
+            return Path.home()
+
+    def _do_cancel_similarities_action(self):
+        """Stop the running similarities calculation, the gui is restored once it has stopped"""
+        if self._similarity_job.cancel():
+            self._cancel_similarities_action.setEnabled(False)
+
+    def _do_change_threshold_action(self):
+        """Show the similarities for another threshold without calculating them again"""
+        if self._similarity_finder is None:
+            return
+        score_floor: float = self._similarity_finder.get_score_floor()
+        # Show how many pairs each threshold would find
+        histogram, edges = self._similarity_finder.get_score_histogram()
+        histogram_lines: list[str] = [str(round(edges[bin_num], 2)) + ' - ' + str(round(edges[bin_num + 1], 2)) +
+                                      ': ' + str(histogram[bin_num]) + ' pairs'
+                                      for bin_num in range(len(histogram)) if edges[bin_num + 1] > score_floor]
+        threshold, accepted = QInputDialog.getDouble(self, 'Change threshold',
+                                                     '\n'.join(histogram_lines + ['', 'Similarity threshold:']),
+                                                     self._similarity_finder.get_threshold(), score_floor, 1, 2)
+        if not accepted:
+            return
+        self._similarity_finder.set_threshold(threshold)
+        similarities, similarity_scores = self._similarity_finder.get_similarities()
+        self._build_similarities_gui(similarities, similarity_scores)
 
     def _do_apply_marked_song_deleting_action(self):
         """Delete all songs marked for deleting"""
         song: Song
-        for song in list(self._loaded_song_list):
-            song.do_keep_or_delete()
+        # Deleted songs are announced in batches instead of one by one
+        with self._loaded_song_list.batch():
+            for song in list(self._loaded_song_list):
+                song.do_keep_or_delete()
 
     def closeEvent(self, event):
         """Handle close event
         :type event: QCloseEvent
         :param event: The triggered event"""
+        # A running calculation is not needed anymore
+        self._similarity_job.cancel()
         # Close any other open windows first
         self._loaded_songs_window.close()
         for window in self._song_similarity_gui_list:
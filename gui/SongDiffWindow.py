@@ -1,26 +1,33 @@
+import html
 import webbrowser
-from typing import List
 from functools import partial
-from PySide6.QtWidgets import QMainWindow, QWidget, QHBoxLayout, QMessageBox, QScrollArea, QGridLayout, QLabel,\
-    QPushButton
-import xml.etree.ElementTree as Xml
-from difflib import HtmlDiff
-import re
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QMainWindow, QWidget, QMessageBox, QScrollArea, QGridLayout, QLabel, QPushButton
 
 from Song import Song
+from SongDiff import SongDiff
+from SongDiffCache import SongDiffCache
+from Subscribable import Subscription
 
 
 class SongDiffWindow(QMainWindow):
-    def __init__(self, song_orig, song_similar):
+    """Background color of each kind of changed text"""
+    _part_color_dict = {SongDiff.SUB: 'red', SongDiff.CHG: 'orange', SongDiff.ADD: 'green'}
+
+    def __init__(self, song_orig, song_similar, diff_cache=None):
         """Displays the difference between two songs
         :type song_orig: Song.Song
         :param song_orig: The original song
         :type song_similar: Song.Song
         :param song_similar: The similar song
+        :type diff_cache: SongDiffCache | None
+        :param diff_cache: Cache with already calculated diffs, None always calculates the diff
         """
         super().__init__()
         self._song_orig = song_orig
         self._song_similar = song_similar
+        self._diff_cache: SongDiffCache | None = diff_cache
+        self._subscription_list: list[Subscription] = []
 
         # Setup gui
         self.resize(800, 550)
@@ -45,16 +52,12 @@ class SongDiffWindow(QMainWindow):
         self._show_diff()
 
     def _show_diff(self):
-        """Calculate the diff between the two songs
-        :return: list[str]"""
-        song_orig_line_str_list: List[str] = [str(line) for line in self._song_orig.get_line_list()]
-        song_similar_line_str_list: List[str] = [str(line) for line in self._song_similar.get_line_list()]
-
-        # Compare
-        html_diff: HtmlDiff = HtmlDiff()
-        html_diff._file_template = "<table>%(table)s</table>"
-        html_diff._table_template = "%(data_rows)s"
-        diff_file: str = html_diff.make_file(song_orig_line_str_list, song_similar_line_str_list)
+        """Show the diff between the two songs"""
+        song_diff: SongDiff
+        if self._diff_cache is None:
+            song_diff = SongDiff.from_songs(self._song_orig, self._song_similar)
+        else:
+            song_diff = self._diff_cache.get_diff(self._song_orig, self._song_similar)
 
         # Add column header
         col_num: int
@@ -72,53 +75,22 @@ class SongDiffWindow(QMainWindow):
             # Subscribe to changes
             if 1 == col_num:
                 self._song_updated(label, self._song_orig)
-                self._song_orig.subscribe(Song.UPDATED, partial(self._song_updated, label))
+                self._subscription_list.append(
+                    self._song_orig.subscribe(Song.UPDATED, partial(self._song_updated, label)))
             else:
                 self._song_updated(label, self._song_similar)
-                self._song_similar.subscribe(Song.UPDATED, partial(self._song_updated, label))
+                self._subscription_list.append(
+                    self._song_similar.subscribe(Song.UPDATED, partial(self._song_updated, label)))
 
-        # Prepare for xml parse
-        diff_file = diff_file.replace('&nbsp;', ' '). \
-            replace('<span class="diff_sub">', '{diff sub}'). \
-            replace('<span class="diff_chg">', '{diff chg}'). \
-            replace('<span class="diff_add">', '{diff add}'). \
-            replace('</span>', '{/diff}')
-
-        # Parse diff file
-        tree: Xml = Xml.fromstring(diff_file)
+        # Create the actual diff, line numbers and text of the original and the similar song side by side
         row_count: int = 0
-        row: Xml.Element
-
-        for row in tree:
+        for orig_num, orig_part_list, similar_num, similar_part_list in song_diff.rows:
             row_count += 1
-            cell_count = 0
-            cell: Xml.Element
-
-            # Create the actual diff
-            for cell in row:
-                cell_count += 1
-                column_start: int
-                # Original
-                if 3 >= cell_count:
-                    column_start = 0
-                # Similarity
-                else:
-                    column_start = 2
-
-                # Parse cell type
-                if 'class' not in cell.attrib.keys():
-                    # Text
-                    cell_widget = self._parse_xml_cell(cell.text)
-                    self.centralLayout.addWidget(cell_widget, row_count, column_start + 1)
-                elif 'diff_next' == cell.attrib['class']:
-                    # Link to next edited line
-                    # Not shown in view
-                    pass
-                elif 'diff_header' == cell.attrib['class']:
-                    # Line number
-                    self.centralLayout.addWidget(QLabel(cell.text), row_count, column_start)
-                else:
-                    raise KeyError('Unknown element type')
+            for column_start, line_num, part_list in ((0, orig_num, orig_part_list),
+                                                      (2, similar_num, similar_part_list)):
+                if line_num is not None:
+                    self.centralLayout.addWidget(QLabel(str(line_num)), row_count, column_start)
+                self.centralLayout.addWidget(self._build_line_widget(part_list), row_count, column_start + 1)
         # Add footer
         row_count += 1
         for col_num in (1, 3):
@@ -142,8 +114,7 @@ class SongDiffWindow(QMainWindow):
             button_edit.clicked.connect(partial(webbrowser.open, str(song)))
             self.centralLayout.addWidget(button_edit, row_count + 2, col_num)
 
-    @staticmethod
-    def _song_updated(label, song):
+    def _song_updated(self, label, song):
         """The given song was updated
         :type label: QLabel
         :param label: The label associated with this song
@@ -168,74 +139,31 @@ class SongDiffWindow(QMainWindow):
         :param song: The song to mark"""
         song.mark_for_deleting()
 
-    @staticmethod
-    def _parse_xml_cell(text):
-        """Convert a cells text into a gui element
-        :type text: str
-        :param text: The cells text to parse
-        :return QWidget: The parsed cell
-        """
-        return_widget = QWidget()
-        if None is text:
-            return return_widget
-        # Parse text
-        text_as_list: List[tuple[str, str]] = SongDiffWindow.__extract_diff_tag(text)
-        # Convert to gui
-        layout: QHBoxLayout = QHBoxLayout(return_widget)
-        layout.setSpacing(0)
-        layout.setContentsMargins(0, 0, 0, 0)
-        for part in text_as_list:
-            if 'default' == part[0]:
-                change_widget = QLabel(part[1])
-                layout.addWidget(change_widget)
-            elif 'sub' == part[0]:
-                change_widget = QLabel(part[1])
-                change_widget.setStyleSheet('background-color: red')
-                layout.addWidget(change_widget)
-            elif 'chg' == part[0]:
-                change_widget = QLabel(part[1])
-                change_widget.setStyleSheet('background-color: orange')
-                layout.addWidget(change_widget)
-            elif 'add' == part[0]:
-                change_widget = QLabel(part[1])
-                change_widget.setStyleSheet('background-color: green')
-                layout.addWidget(change_widget)
-            else:
-                raise KeyError('Unknown change key')
-        layout.addStretch()
-        return return_widget
+    def closeEvent(self, event):
+        """Stop following song changes once the window is closed
+        :type event: QCloseEvent
+        :param event: The triggered event"""
+        for subscription in self._subscription_list:
+            subscription.unsubscribe()
+        self._subscription_list = []
+        super().closeEvent(event)
 
     @staticmethod
-    def __extract_diff_tag(string):
-        """Extract the diff tags from a string
-        :type string: str
-        :param string: The string to parse
-        :return list[tuple[str, str]]: Extracted parts of the string"""
-        return_list = []
-        regex_string = r"(?P<prefix>[^{]*){diff ?(?P<diff_type>[^}]*)}(?P<diff_content>[^{]*){\/diff}(?P<postfix>[^{]*)"
-        matches = re.finditer(regex_string, string)
-        match_count = 0
-        for match in matches:
-            match_count += 1
-            # Prefix
-            if '' != match.group('prefix'):
-                return_list.append(('default', match.group('prefix')))
-            # Diff
-            if '' != match.group('diff_content'):
-                diff_type: str
-                if '' == match.group('diff_type'):
-                    diff_type = 'default'
-                else:
-                    diff_type = match.group('diff_type')
-                return_list.append((diff_type, match.group('diff_content')))
-            # Postfix
-            if '' != match.group('postfix'):
-                return_list.append(('default', match.group('postfix')))
-        # No match found
-        if 1 > match_count:
-            return [('default', string)]
-        else:
-            return return_list
+    def _build_line_widget(part_list):
+        """Convert the text parts of a line into a single label, changed parts are highlighted
+        :type part_list: list[tuple[str, str]]
+        :param part_list: The kind and text of each part of the line
+        :return QLabel: The line"""
+        html_part_list: list[str] = []
+        for kind, text in part_list:
+            if SongDiff.DEFAULT == kind:
+                html_part_list.append(html.escape(text))
+            else:
+                html_part_list.append('<span style="background-color: ' + SongDiffWindow._part_color_dict[kind] +
+                                      '">' + html.escape(text) + '</span>')
+        label: QLabel = QLabel('<span style="white-space: pre">' + ''.join(html_part_list) + '</span>')
+        label.setTextFormat(Qt.RichText)
+        return label
 
 
 if __name__ == '__main__':
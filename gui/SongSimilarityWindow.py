@@ -4,7 +4,10 @@ from typing import List
 from PySide6.QtWidgets import (QLabel, QPushButton, QHBoxLayout, QWidget, QMainWindow, QScrollArea, QVBoxLayout,
                                QGridLayout, QLayout)
 
+from SimilarityPairs import SimilarityPairs
 from Song import Song
+from SongDiffCache import SongDiffCache
+from Subscribable import Subscription
 from gui.SongDiffWindow import SongDiffWindow
 
 
@@ -12,20 +15,26 @@ class SongSimilarityWindow(QMainWindow):
     """A list of similar songs in this group"""
     _song_similarity_list: List[Song]
     """The similarity scores for each song pair"""
-    _similarity_scores: dict[tuple[Song, Song], int]
+    _similarity_scores: SimilarityPairs
     """Parking space for all song diff guis"""
     _diff_window_list: List[SongDiffWindow]
 
-    def __init__(self, song_similarity_list, similarity_scores):
+    def __init__(self, song_similarity_list, similarity_scores, diff_cache=None):
         """Display all songs similar to one song
         :type song_similarity_list: list[Song]
         :param song_similarity_list: A list of similar songs
-        :type similarity_scores: dict[tuple[Song, Song], int]
-        :param similarity_scores: The similarity scores for each song pair"""
+        :type similarity_scores: SimilarityPairs
+        :param similarity_scores: The similarity scores for each song pair
+        :type diff_cache: SongDiffCache | None
+        :param diff_cache: Cache with already calculated song diffs"""
         super().__init__()
         self._song_similarity_list = song_similarity_list
         self._similarity_scores = similarity_scores
+        self._diff_cache: SongDiffCache | None = diff_cache
         self._diff_window_list = []
+        # Song subscriptions of the first column and of the other songs column, which is rebuilt on every click
+        self._subscription_list: list[Subscription] = []
+        self._other_song_subscription_list: list[Subscription] = []
 
         # Main layout
         self.resize(450, 600)
@@ -45,13 +54,12 @@ class SongSimilarityWindow(QMainWindow):
         for song in self._song_similarity_list:
             button: QPushButton = QPushButton(song.get_name(), self)
             button.clicked.connect(partial(self.show_other_songs, song))
-            song.subscribe(Song.UPDATED, partial(self._song_updated, button))
+            self._subscription_list.append(song.subscribe(Song.UPDATED, partial(self._song_updated, button)))
             self._song_updated(button, song)
             self.centralLayout.addWidget(button, row_num, 0)
             row_num += 1
 
-    @staticmethod
-    def _song_updated(button, song):
+    def _song_updated(self, button, song):
         """The given song was updated
         :type button: QPushButton
         :param button: The button associated with this song
@@ -78,6 +86,9 @@ class SongSimilarityWindow(QMainWindow):
         :param song: The song to compare to"""
         # Clear old gui
         self._clear_column(1)
+        for subscription in self._other_song_subscription_list:
+            subscription.unsubscribe()
+        self._other_song_subscription_list = []
 
         # Add new gui elements
         row_num: int = -1
@@ -87,15 +98,12 @@ class SongSimilarityWindow(QMainWindow):
                 self.centralLayout.addWidget(QWidget(), row_num, 1)
                 continue
 
-            similarity_score: float
-            if (song, similar_song) in self._similarity_scores.keys():
-                similarity_score = self._similarity_scores[(song, similar_song)]
-            else:
-                similarity_score = self._similarity_scores[(similar_song, song)]
+            similarity_score: float = self._similarity_scores.get_score(song, similar_song)
             button: QPushButton = QPushButton(similar_song.get_name() + ' (' + str(similarity_score) + ')', self)
             button.clicked.connect(partial(self._show_song_diff, song, similar_song))
             self._song_updated(button, similar_song)
-            similar_song.subscribe(Song.UPDATED, partial(self._song_updated, button))
+            self._other_song_subscription_list.append(
+                similar_song.subscribe(Song.UPDATED, partial(self._song_updated, button)))
             self.centralLayout.addWidget(button, row_num, 1)
 
     def _show_song_diff(self, orig_song, similar_song):
@@ -104,8 +112,19 @@ class SongSimilarityWindow(QMainWindow):
         :param orig_song: First song to compare with
         :type similar_song: Song
         :param similar_song: Second song to compare with"""
-        diff_gui = SongDiffWindow(orig_song, similar_song)
+        diff_gui = SongDiffWindow(orig_song, similar_song, self._diff_cache)
         diff_gui.show()
         diff_gui.activateWindow()
-        # Keep the window open
+        # Keep the window open, closed ones can go
+        self._diff_window_list = [diff_window for diff_window in self._diff_window_list if diff_window.isVisible()]
         self._diff_window_list.append(diff_gui)
+
+    def closeEvent(self, event):
+        """Stop following song changes once the window is closed
+        :type event: QCloseEvent
+        :param event: The triggered event"""
+        for subscription in self._subscription_list + self._other_song_subscription_list:
+            subscription.unsubscribe()
+        self._subscription_list = []
+        self._other_song_subscription_list = []
+        super().closeEvent(event)